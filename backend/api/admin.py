@@ -1,7 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 import sys
 import os
-import sqlite3
 from datetime import datetime, timedelta
 import hashlib
 import secrets
@@ -11,12 +10,21 @@ from functools import wraps
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.config import get_db_connection, add_faq
+from database.config import get_read_connection, add_faq, get_pool_stats, get_chat_log_stats
 from database.models import FAQ, UnknownQuestion
+from database import rollups, queries
+from database.search import search_faqs, search_terms
 from nlp.matcher import matcher
+from nlp.popular import popular_questions
+from api.pagination import (
+    DEFAULT_LIMIT, InvalidCursor, CountCache, encode_cursor, decode_cursor, page_limit, split_page
+)
 
 admin_bp = Blueprint('admin', __name__)
 
+# Totals for the paginated admin lists
+list_counts = CountCache()
+
 # JWT Configuration
 JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', secrets.token_hex(32))
 JWT_EXPIRY_HOURS = 24
@@ -237,69 +245,52 @@ def generate_hash():
 def get_stats():
     """Get comprehensive dashboard statistics"""
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
 
         # Total FAQs
-        total_faqs = conn.execute("SELECT COUNT(*) as count FROM faqs").fetchone()
+        total_faqs = queries.fetch_value('faqs.count', conn=conn, default=0)
 
-        # Unknown questions stats
-        unknown_total = conn.execute("SELECT COUNT(*) as count FROM unknown_questions").fetchone()
-        unknown_unanswered = conn.execute(
-            "SELECT COUNT(*) as count FROM unknown_questions WHERE answered = 0").fetchone()
+        # Unknown questions stats (unanswered is a covering-index count of the review queue)
+        unknown_total = queries.fetch_value('rollups.total', ('unknowns',), conn, default=0)
+        unknown_unanswered = queries.fetch_value('unknown.count.unanswered', conn=conn, default=0)
 
         # Total chats
-        total_chats = conn.execute("SELECT COUNT(*) as count FROM chat_history").fetchone()
+        total_chats = queries.fetch_value('rollups.total', ('chats',), conn, default=0)
 
         # Chats today
-        today = datetime.now().date()
-        chats_today = conn.execute(
-            "SELECT COUNT(*) as count FROM chat_history WHERE date(timestamp) = ?",
-            (today.isoformat(),)
-        ).fetchone()
+        today = rollups.today()
+        chats_today = queries.fetch_value('rollups.on_day', (today, 'chats'), conn, default=0)
 
         # Popular questions (top 10)
-        popular = conn.execute("""
-            SELECT user_message, COUNT(*) as frequency 
-            FROM chat_history 
-            GROUP BY user_message 
-            ORDER BY frequency DESC 
-            LIMIT 10
-        """).fetchall()
+        popular = popular_questions.top(10)
 
         # Unknown questions trend (last 7 days)
-        trend = []
-        for i in range(6, -1, -1):
-            date = (today - timedelta(days=i)).isoformat()
-            count = conn.execute(
-                "SELECT COUNT(*) as count FROM unknown_questions WHERE date(asked_at) = ?",
-                (date,)
-            ).fetchone()
-            trend.append({
-                'date': date,
-                'count': count['count'] if count else 0
-            })
+        trend_rows = queries.fetch_all('rollups.daily_since', ('unknowns', rollups.days_ago(6)), conn)
+        trend = rollups.fill_days(trend_rows, rollups.days_ago(6), today)
 
         # Category distribution
-        categories = conn.execute("""
-            SELECT category, COUNT(*) as count 
-            FROM faqs 
-            GROUP BY category 
-            ORDER BY count DESC
-        """).fetchall()
+        categories = queries.fetch_all('faqs.category_counts', conn=conn)
 
         conn.close()
 
         return jsonify({
             'success': True,
             'stats': {
-                'total_faqs': total_faqs['count'] if total_faqs else 0,
-                'unknown_total': unknown_total['count'] if unknown_total else 0,
-                'unknown_unanswered': unknown_unanswered['count'] if unknown_unanswered else 0,
-                'total_chats': total_chats['count'] if total_chats else 0,
-                'chats_today': chats_today['count'] if chats_today else 0,
-                'popular_questions': [dict(p) for p in popular],
+                'total_faqs': total_faqs,
+                'unknown_total': unknown_total,
+                'unknown_unanswered': unknown_unanswered,
+                'total_chats': total_chats,
+                'chats_today': chats_today,
+                'popular_questions': popular,
                 'unknown_trend': trend,
-                'categories': [dict(c) for c in categories]
+                'categories': categories,
+                'paraphrases': matcher.paraphrases.stats(),
+                'query_cache': matcher.query_cache.stats(),
+                'negative_cache': matcher.negative_cache.stats(),
+                'db_pool': get_pool_stats(),
+                'chat_log': get_chat_log_stats(),
+                'popular_tracker': popular_questions.stats(),
+                'queries': queries.query_stats()
             }
         })
 
@@ -311,49 +302,52 @@ def get_stats():
 @admin_bp.route('/unknown', methods=['GET'])
 @token_required
 def get_unknown():
-    """Get all unknown questions with filtering and pagination"""
+    """Get unknown questions, newest first, a keyset page at a time"""
     try:
         # Get query parameters
         filter_by = request.args.get('filter', 'all')
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
-        offset = (page - 1) * limit
-
-        conn = get_db_connection()
-
-        # Build query based on filter
-        if filter_by == 'unanswered':
-            query = "SELECT * FROM unknown_questions WHERE answered = 0 ORDER BY asked_at DESC LIMIT ? OFFSET ?"
-            count_query = "SELECT COUNT(*) as count FROM unknown_questions WHERE answered = 0"
-            params = [limit, offset]
-        elif filter_by == 'answered':
-            query = "SELECT * FROM unknown_questions WHERE answered = 1 ORDER BY asked_at DESC LIMIT ? OFFSET ?"
-            count_query = "SELECT COUNT(*) as count FROM unknown_questions WHERE answered = 1"
-            params = [limit, offset]
+        limit = page_limit(request.args.get('limit', DEFAULT_LIMIT))
+        cursor = request.args.get('cursor')
+
+        # Named query variant for the filter and cursor
+        name = 'unknown.page'
+        params = []
+        if filter_by in ('unanswered', 'answered'):
+            name += '.by_status'
+            params.append(filter_by == 'answered')
         else:
-            query = "SELECT * FROM unknown_questions ORDER BY asked_at DESC LIMIT ? OFFSET ?"
-            count_query = "SELECT COUNT(*) as count FROM unknown_questions"
-            params = [limit, offset]
+            filter_by = 'all'
+        count_name, count_params = name.replace('page', 'count'), list(params)
+
+        # Continue after the last row of the previous page
+        if cursor:
+            name += '.after'
+            params.extend(decode_cursor(cursor, 2))
+        params.append(limit + 1)
 
-        # Get total count
-        total = conn.execute(count_query).fetchone()
-        total_count = total['count'] if total else 0
+        conn = get_read_connection()
 
-        # Get paginated results
-        questions = conn.execute(query, params).fetchall()
+        # Get total count (cached briefly, not recounted per page)
+        total_count = list_counts.get(
+            ('unknown', filter_by), lambda: queries.fetch_value(count_name, count_params, conn, default=0))
+
+        # Get this page plus one row to tell whether another follows
+        questions, has_more = split_page(queries.fetch_all(name, params, conn), limit)
         conn.close()
 
         return jsonify({
             'success': True,
-            'questions': [dict(q) for q in questions],
+            'questions': questions,
             'pagination': {
-                'page': page,
                 'limit': limit,
                 'total': total_count,
-                'pages': (total_count + limit - 1) // limit
+                'has_more': has_more,
+                'next_cursor': encode_cursor(questions[-1]['asked_at'], questions[-1]['id']) if has_more else None
             }
         })
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error getting unknown questions: {e}")
         return jsonify({'error': str(e)}), 500
@@ -364,19 +358,14 @@ def get_unknown():
 def get_unknown_detail(question_id):
     """Get details of a specific unknown question"""
     try:
-        conn = get_db_connection()
-        question = conn.execute(
-            "SELECT * FROM unknown_questions WHERE id = ?",
-            (question_id,)
-        ).fetchone()
-        conn.close()
+        question = queries.fetch_one('unknown.get', (question_id,))
 
         if not question:
             return jsonify({'error': 'Question not found'}), 404
 
         return jsonify({
             'success': True,
-            'question': dict(question)
+            'question': question
         })
 
     except Exception as e:
@@ -398,29 +387,26 @@ def answer_unknown():
             return jsonify({'error': 'Missing required fields'}), 400
 
         # Get the unknown question
-        conn = get_db_connection()
-        unknown = conn.execute(
-            "SELECT question FROM unknown_questions WHERE id = ?",
-            (question_id,)
-        ).fetchone()
+        unknown = queries.fetch_one('unknown.get', (question_id,))
 
         if not unknown:
-            conn.close()
             return jsonify({'error': 'Question not found'}), 404
 
         # Add to FAQs
         new_faq_id = add_faq(unknown['question'], answer, category)
 
         # Mark unknown as answered
-        conn.execute(
-            "UPDATE unknown_questions SET answered = 1 WHERE id = ?",
-            (question_id,)
-        )
-        conn.commit()
-        conn.close()
+        UnknownQuestion.mark_as_answered(question_id)
 
-        # Refresh matcher index
-        matcher.load_faqs()
+        # Refresh matcher index; a hashed index takes the FAQ without a refit
+        if matcher.supports_append:
+            matcher.add_faq_to_index(new_faq_id, unknown['question'], answer, category)
+        else:
+            matcher.request_rebuild(categories=[category])
+
+        # The asked phrasing now answers straight from this FAQ
+        matcher.paraphrases.remember(unknown['question'], new_faq_id, source='admin')
+        list_counts.clear()
 
         return jsonify({
             'success': True,
@@ -442,6 +428,7 @@ def bulk_answer_unknown():
         answers = data.get('answers', [])
 
         results = []
+        changed_categories = set()
         for item in answers:
             question_id = item.get('question_id')
             answer = item.get('answer')
@@ -449,27 +436,19 @@ def bulk_answer_unknown():
 
             if question_id and answer:
                 try:
-                    conn = get_db_connection()
-                    unknown = conn.execute(
-                        "SELECT question FROM unknown_questions WHERE id = ?",
-                        (question_id,)
-                    ).fetchone()
+                    unknown = queries.fetch_one('unknown.get', (question_id,))
 
                     if unknown:
                         new_faq_id = add_faq(unknown['question'], answer, category)
+                        UnknownQuestion.mark_as_answered(question_id)
 
-                        conn.execute(
-                            "UPDATE unknown_questions SET answered = 1 WHERE id = ?",
-                            (question_id,)
-                        )
-                        conn.commit()
-
+                        matcher.paraphrases.remember(unknown['question'], new_faq_id, source='admin')
+                        changed_categories.add(category)
                         results.append({
                             'question_id': question_id,
                             'success': True,
                             'faq_id': new_faq_id
                         })
-                    conn.close()
                 except Exception as e:
                     results.append({
                         'question_id': question_id,
@@ -478,7 +457,8 @@ def bulk_answer_unknown():
                     })
 
         # Refresh matcher index
-        matcher.load_faqs()
+        matcher.request_rebuild(categories=changed_categories)
+        list_counts.clear()
 
         return jsonify({
             'success': True,
@@ -497,57 +477,59 @@ def get_faqs():
         # Get query parameters
         category = request.args.get('category', '')
         search = request.args.get('search', '')
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
-        offset = (page - 1) * limit
-
-        conn = get_db_connection()
-
-        # Build query with filters
-        query = "SELECT * FROM faqs WHERE 1=1"
-        count_query = "SELECT COUNT(*) as count FROM faqs WHERE 1=1"
-        params = []
-
-        if category:
-            query += " AND category = ?"
-            count_query += " AND category = ?"
-            params.append(category)
-
-        if search:
-            query += " AND (question LIKE ? OR answer LIKE ?)"
-            count_query += " AND (question LIKE ? OR answer LIKE ?)"
-            search_term = f"%{search}%"
-            params.extend([search_term, search_term])
-
-        # Get total count
-        total = conn.execute(count_query, params[:len(params)]).fetchone()
-        total_count = total['count'] if total else 0
-
-        # Add pagination
-        query += " ORDER BY id DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-
-        # Get paginated results
-        faqs = conn.execute(query, params).fetchall()
-        conn.close()
+        limit = page_limit(request.args.get('limit', DEFAULT_LIMIT))
+        cursor = request.args.get('cursor')
+
+        if search and search_terms(search):
+            # Ranked full-text search, paged on (rank, id); no total, which
+            # would cost a second full-text query per search term
+            after = decode_cursor(cursor, 2) if cursor else None
+            faqs, has_more = split_page(search_faqs(search, category, limit + 1, after), limit)
+            total_count = None
+            next_cursor = encode_cursor(faqs[-1]['rank'], faqs[-1]['id']) if has_more else None
+        else:
+            # Named query variant for the filter and cursor
+            name = 'faqs.page'
+            params = []
+            if category:
+                name += '.category'
+                params.append(category)
+            count_name, count_params = 'faqs.count' + ('.category' if category else ''), list(params)
+
+            # Continue after the last row of the previous page
+            if cursor:
+                name += '.after'
+                params.extend(decode_cursor(cursor, 1))
+            params.append(limit + 1)
+
+            conn = get_read_connection()
+
+            # Get total count (cached briefly, not recounted per page)
+            total_count = list_counts.get(
+                ('faqs', category, ''), lambda: queries.fetch_value(count_name, count_params, conn, default=0))
+
+            # Get this page plus one row to tell whether another follows
+            faqs, has_more = split_page(queries.fetch_all(name, params, conn), limit)
+            conn.close()
+            next_cursor = encode_cursor(faqs[-1]['id']) if has_more else None
 
         # Get all categories for filter dropdown
-        conn = get_db_connection()
-        categories = conn.execute("SELECT DISTINCT category FROM faqs ORDER BY category").fetchall()
-        conn.close()
+        categories = queries.fetch_all('faqs.categories')
 
         return jsonify({
             'success': True,
-            'faqs': [dict(f) for f in faqs],
+            'faqs': faqs,
             'categories': [c['category'] for c in categories],
             'pagination': {
-                'page': page,
                 'limit': limit,
                 'total': total_count,
-                'pages': (total_count + limit - 1) // limit
+                'has_more': has_more,
+                'next_cursor': next_cursor
             }
         })
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error getting FAQs: {e}")
         return jsonify({'error': str(e)}), 500
@@ -558,19 +540,14 @@ def get_faqs():
 def get_faq(faq_id):
     """Get a single FAQ by ID"""
     try:
-        conn = get_db_connection()
-        faq = conn.execute(
-            "SELECT * FROM faqs WHERE id = ?",
-            (faq_id,)
-        ).fetchone()
-        conn.close()
+        faq = FAQ.get_by_id(faq_id)
 
         if not faq:
             return jsonify({'error': 'FAQ not found'}), 404
 
         return jsonify({
             'success': True,
-            'faq': dict(faq)
+            'faq': faq
         })
 
     except Exception as e:
@@ -592,23 +569,18 @@ def create_faq():
             return jsonify({'error': 'Question and answer are required'}), 400
 
         # Check if question already exists
-        conn = get_db_connection()
-        existing = conn.execute(
-            "SELECT id FROM faqs WHERE question = ?",
-            (question,)
-        ).fetchone()
-
-        if existing:
-            conn.close()
+        if queries.fetch_one('faqs.id_by_question', (question,)):
             return jsonify({'error': 'A FAQ with this question already exists'}), 400
 
-        conn.close()
-
         # Add to database
         faq_id = add_faq(question, answer, category)
 
-        # Refresh matcher index
-        matcher.load_faqs()
+        # Refresh matcher index; a hashed index takes the FAQ without a refit
+        if matcher.supports_append:
+            matcher.add_faq_to_index(faq_id, question, answer, category)
+        else:
+            matcher.request_rebuild(categories=[category])
+        list_counts.clear()
 
         return jsonify({
             'success': True,
@@ -632,46 +604,26 @@ def update_faq(faq_id):
         answer = data.get('answer')
         category = data.get('category')
 
-        conn = get_db_connection()
-
         # Check if FAQ exists
-        existing = conn.execute(
-            "SELECT id FROM faqs WHERE id = ?",
-            (faq_id,)
-        ).fetchone()
+        existing = queries.fetch_one('faqs.get_category', (faq_id,))
 
         if not existing:
-            conn.close()
             return jsonify({'error': 'FAQ not found'}), 404
 
-        # Build update query dynamically
-        updates = []
-        params = []
+        # Fields left out (None) keep their value
+        if question is not None or answer is not None or category is not None:
+            queries.execute('faqs.update', (question, answer, category, faq_id))
 
+        # Phrasings learned from matches may not fit a reworded question
         if question is not None:
-            updates.append("question = ?")
-            params.append(question)
-
-        if answer is not None:
-            updates.append("answer = ?")
-            params.append(answer)
+            matcher.paraphrases.forget_faq(faq_id, learned_only=True)
 
+        # Refresh matcher index; a category change touches both shards
+        changed_categories = {existing['category']}
         if category is not None:
-            updates.append("category = ?")
-            params.append(category)
-
-        if updates:
-            updates.append("updated_at = CURRENT_TIMESTAMP")
-            query = f"UPDATE faqs SET {', '.join(updates)} WHERE id = ?"
-            params.append(faq_id)
-
-            conn.execute(query, params)
-            conn.commit()
-
-        conn.close()
-
-        # Refresh matcher index
-        matcher.load_faqs()
+            changed_categories.add(category)
+        matcher.request_rebuild(categories=changed_categories)
+        list_counts.clear()
 
         return jsonify({
             'success': True,
@@ -688,25 +640,19 @@ def update_faq(faq_id):
 def delete_faq(faq_id):
     """Delete FAQ"""
     try:
-        conn = get_db_connection()
-
         # Check if FAQ exists
-        existing = conn.execute(
-            "SELECT id FROM faqs WHERE id = ?",
-            (faq_id,)
-        ).fetchone()
+        existing = queries.fetch_one('faqs.get_category', (faq_id,))
 
         if not existing:
-            conn.close()
             return jsonify({'error': 'FAQ not found'}), 404
 
         # Delete the FAQ
-        conn.execute("DELETE FROM faqs WHERE id = ?", (faq_id,))
-        conn.commit()
-        conn.close()
+        FAQ.delete(faq_id)
 
-        # Refresh matcher index
-        matcher.load_faqs()
+        # Refresh matcher index and drop the phrasings that pointed here
+        matcher.request_rebuild(categories=[existing['category']])
+        matcher.paraphrases.forget_faq(faq_id)
+        list_counts.clear()
 
         return jsonify({
             'success': True,
@@ -727,6 +673,7 @@ def bulk_import_faqs():
         faqs = data.get('faqs', [])
 
         results = []
+        changed_categories = set()
         for faq in faqs:
             question = faq.get('question', '').strip()
             answer = faq.get('answer', '').strip()
@@ -735,6 +682,7 @@ def bulk_import_faqs():
             if question and answer:
                 try:
                     faq_id = add_faq(question, answer, category)
+                    changed_categories.add(category)
                     results.append({
                         'question': question[:50],
                         'success': True,
@@ -748,7 +696,8 @@ def bulk_import_faqs():
                     })
 
         # Refresh matcher index
-        matcher.load_faqs()
+        matcher.request_rebuild(categories=changed_categories)
+        list_counts.clear()
 
         return jsonify({
             'success': True,
@@ -766,38 +715,22 @@ def bulk_import_faqs():
 def get_analytics():
     """Get detailed analytics"""
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
 
         # Time range (default: last 30 days)
         days = int(request.args.get('days', 30))
-        start_date = (datetime.now() - timedelta(days=days)).date()
-
-        # Daily chat counts
-        daily_chats = conn.execute("""
-            SELECT date(timestamp) as date, COUNT(*) as count
-            FROM chat_history
-            WHERE date(timestamp) >= ?
-            GROUP BY date(timestamp)
-            ORDER BY date
-        """, (start_date.isoformat(),)).fetchall()
-
-        # Unknown questions by day
-        daily_unknown = conn.execute("""
-            SELECT date(asked_at) as date, COUNT(*) as count
-            FROM unknown_questions
-            WHERE date(asked_at) >= ?
-            GROUP BY date(asked_at)
-            ORDER BY date
-        """, (start_date.isoformat(),)).fetchall()
+        start_date = rollups.days_ago(days)
 
-        # Response rate (matched vs unknown)
-        total_queries = conn.execute(
-            "SELECT COUNT(*) as count FROM chat_history"
-        ).fetchone()['count']
+        # Daily chat and unknown question counts
+        daily_chats = queries.fetch_all('rollups.daily_since', ('chats', start_date), conn)
+        daily_unknown = queries.fetch_all('rollups.daily_since', ('unknowns', start_date), conn)
 
-        unknown_count = conn.execute(
-            "SELECT COUNT(*) as count FROM unknown_questions WHERE answered = 0"
-        ).fetchone()['count']
+        # Chats by match type and by matched FAQ category over the range
+        breakdown = queries.fetch_all('rollups.breakdown_since', (start_date,), conn)
+
+        # Response rate (matched vs unknown)
+        total_queries = queries.fetch_value('rollups.total', ('chats',), conn, default=0)
+        unknown_count = queries.fetch_value('unknown.count.unanswered', conn=conn, default=0)
 
         response_rate = ((total_queries - unknown_count) / total_queries * 100) if total_queries > 0 else 0
 
@@ -806,8 +739,10 @@ def get_analytics():
         return jsonify({
             'success': True,
             'analytics': {
-                'daily_chats': [dict(d) for d in daily_chats],
-                'daily_unknown': [dict(d) for d in daily_unknown],
+                'daily_chats': daily_chats,
+                'daily_unknown': daily_unknown,
+                'match_types': {b['dimension']: b['count'] for b in breakdown if b['metric'] == 'match_type'},
+                'matched_categories': {b['dimension']: b['count'] for b in breakdown if b['metric'] == 'category'},
                 'response_rate': round(response_rate, 2),
                 'total_queries': total_queries,
                 'pending_unknown': unknown_count
@@ -853,6 +788,10 @@ def update_settings():
         if 'exact_threshold' in data:
             matcher.thresholds['exact'] = float(data['exact_threshold'])
 
+        # Cached results were graded with the old thresholds
+        matcher.query_cache.clear()
+        matcher.negative_cache.clear()
+
         return jsonify({
             'success': True,
             'message': 'Settings updated successfully'
@@ -7,22 +7,48 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import database modules - ADD THE NEW FUNCTIONS
-from database.config import (
-    get_db_connection,
-    add_unknown_question,
-    add_chat_history,
-    execute_query,  # NEW: For SELECT queries that return multiple rows
-    execute_query_one,  # NEW: For SELECT queries that return one row
-    IN_PRODUCTION  # NEW: To check environment
-)
-from database.models import FAQ
+# Import database modules
+from database.config import add_unknown_question, add_chat_history
+from database.models import FAQ, ChatHistory
+from database import queries
 
 # Import NLP modules
 from nlp.matcher import matcher, handle_greetings, handle_common_questions
+from nlp.popular import popular_questions
 
 chat_bp = Blueprint('chat', __name__)
 
+UNKNOWN_ANSWER = "I'm not sure about this yet, but I've saved your question for review. I'll update you soon!"
+
+
+def log_unknown(question, session_id, index_version, confidence, match_type, matched_by):
+    """Log an unanswered question and return its response fields, remembered for repeats"""
+    miss = {
+        'answer': UNKNOWN_ANSWER,
+        'confidence': confidence,
+        'matched': False,
+        'match_type': match_type,
+        'matched_by': matched_by,
+        'unknown_id': add_unknown_question(question, session_id)
+    }
+    matcher.remember_unknown(question, miss, index_version)
+    return miss
+
+
+def save_chat(session_id, question, response, category=None):
+    """Log a chat turn and count the question for the popular-questions tracker"""
+    try:
+        add_chat_history(
+            session_id=session_id,
+            user_message=question,
+            bot_response=response['answer'],
+            match_type=response['match_type'],
+            category=category
+        )
+        popular_questions.record([question])
+    except Exception as e:
+        print(f"⚠️ Could not save chat history: {e}")
+
 
 @chat_bp.route('/chat', methods=['POST'])
 def chat():
@@ -60,14 +86,7 @@ def chat():
             }
 
             # Save to chat history
-            try:
-                add_chat_history(
-                    session_id=session_id,
-                    user_message=question,
-                    bot_response=response['answer']
-                )
-            except Exception as e:
-                print(f"⚠️ Could not save chat history: {e}")
+            save_chat(session_id, question, response)
 
             return jsonify(response)
 
@@ -87,20 +106,10 @@ def chat():
             }
 
             # Save to chat history
-            try:
-                add_chat_history(
-                    session_id=session_id,
-                    user_message=question,
-                    bot_response=response['answer']
-                )
-            except Exception as e:
-                print(f"⚠️ Could not save chat history: {e}")
+            save_chat(session_id, question, response)
 
             return jsonify(response)
 
-        # ===== STEP 3: Find best match using advanced NLP =====
-        best_match = matcher.find_best_match(question)
-
         # Prepare base response
         response = {
             'question': question,
@@ -108,7 +117,22 @@ def chat():
             'session_id': session_id
         }
 
-        # ===== STEP 4: Handle based on match type and confidence =====
+        # ===== STEP 3: Skip questions this index already failed to answer =====
+        index_version = matcher.index.version
+        known_unknown = matcher.known_unknown(question)
+        if known_unknown is not None:
+            # Same reply as the first miss, without matching or logging again
+            response.update(known_unknown)
+            print(f"🚫 Known unknown: already logged as #{known_unknown['unknown_id']}")
+
+            save_chat(session_id, question, response)
+
+            return jsonify(response)
+
+        # ===== STEP 4: Find best match using advanced NLP =====
+        best_match = matcher.find_best_match(question)
+
+        # ===== STEP 5: Handle based on match type and confidence =====
         if best_match:
             confidence = best_match['confidence']
             match_type = best_match.get('match_type', 'unknown')
@@ -127,7 +151,7 @@ def chat():
 
             elif match_type == 'similar' or confidence >= 0.6:
                 # Medium confidence - return with suggestions
-                suggestions = matcher.get_suggestions(question, n=2)
+                suggestions = matcher.get_related(best_match, n=2)
                 response.update({
                     'answer': f"I found a possible answer:\n\n{best_match['answer']}\n\n" +
                               (f"Did you mean: {suggestions[0]['question']}?" if suggestions else ""),
@@ -142,7 +166,7 @@ def chat():
 
             elif match_type == 'low' or confidence >= 0.4:
                 # Low confidence - ask for clarification
-                suggestions = matcher.get_suggestions(question, n=3)
+                suggestions = matcher.get_related(best_match, n=3)
                 suggestions_text = "\n".join(
                     [f"• {s['question']}" for s in suggestions]) if suggestions else "No related questions found."
 
@@ -160,39 +184,18 @@ def chat():
 
             else:
                 # Too low - log as unknown
-                unknown_id = add_unknown_question(question, session_id)
-                response.update({
-                    'answer': "I'm not sure about this yet, but I've saved your question for review. I'll update you soon!",
-                    'confidence': confidence,
-                    'matched': False,
-                    'match_type': 'unknown',
-                    'matched_by': best_match.get('matched_by', 'tfidf'),
-                    'unknown_id': unknown_id
-                })
-                print(f"❌ No match: logged as #{unknown_id}")
+                response.update(log_unknown(question, session_id, index_version, confidence,
+                                            'unknown', best_match.get('matched_by', 'tfidf')))
+                print(f"❌ No match: logged as #{response['unknown_id']}")
 
         else:
             # No match at all
-            unknown_id = add_unknown_question(question, session_id)
-            response.update({
-                'answer': "I'm not sure about this yet, but I've saved your question for review. I'll update you soon!",
-                'confidence': 0,
-                'matched': False,
-                'match_type': 'none',
-                'matched_by': 'none',
-                'unknown_id': unknown_id
-            })
-            print(f"❌ No match found: logged as #{unknown_id}")
-
-        # ===== STEP 5: Save to chat history =====
-        try:
-            add_chat_history(
-                session_id=session_id,
-                user_message=question,
-                bot_response=response['answer']
-            )
-        except Exception as e:
-            print(f"⚠️ Could not save chat history: {e}")
+            response.update(log_unknown(question, session_id, index_version, 0, 'none', 'none'))
+            print(f"❌ No match found: logged as #{response['unknown_id']}")
+
+        # ===== STEP 6: Save to chat history =====
+        save_chat(session_id, question, response,
+                  category=best_match.get('category') if response['matched'] else None)
 
         return jsonify(response)
 
@@ -212,31 +215,9 @@ def chat():
 def get_history(session_id):
     """Get chat history for a session"""
     try:
-        from database.config import get_db_connection, IN_PRODUCTION
-
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            from psycopg2.extras import RealDictCursor
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(
-                "SELECT * FROM chat_history WHERE session_id = %s ORDER BY timestamp DESC LIMIT 50",
-                (session_id,)
-            )
-            history = cur.fetchall()
-        else:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT * FROM chat_history WHERE session_id = ? ORDER BY timestamp DESC LIMIT 50",
-                (session_id,)
-            )
-            history = cur.fetchall()
-
-        conn.close()
-
         return jsonify({
             'session_id': session_id,
-            'history': [dict(row) for row in history]
+            'history': ChatHistory.get_session_history(session_id)
         })
 
     except Exception as e:
@@ -248,59 +229,13 @@ def get_history(session_id):
 def get_suggestions():
     """Get popular questions for suggestions"""
     try:
-        from database.config import get_db_connection, IN_PRODUCTION
-
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            from psycopg2.extras import RealDictCursor
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-
-            # Get most frequently asked questions
-            cur.execute("""
-                SELECT user_message, COUNT(*) as count 
-                FROM chat_history 
-                GROUP BY user_message 
-                ORDER BY count DESC 
-                LIMIT 6
-            """)
-            suggestions = cur.fetchall()
-
-            # If not enough history, get random FAQs
-            if len(suggestions) < 6:
-                cur.execute(
-                    "SELECT question FROM faqs ORDER BY RANDOM() LIMIT %s",
-                    (6 - len(suggestions),)
-                )
-                faqs = cur.fetchall()
-
-                all_suggestions = [s['user_message'] for s in suggestions] + [f['question'] for f in faqs]
-            else:
-                all_suggestions = [s['user_message'] for s in suggestions]
-        else:
-            # SQLite version
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT user_message, COUNT(*) as count 
-                FROM chat_history 
-                GROUP BY user_message 
-                ORDER BY count DESC 
-                LIMIT 6
-            """)
-            suggestions = cur.fetchall()
-
-            if len(suggestions) < 6:
-                cur.execute(
-                    "SELECT question FROM faqs ORDER BY RANDOM() LIMIT ?",
-                    (6 - len(suggestions),)
-                )
-                faqs = cur.fetchall()
-
-                all_suggestions = [s[0] for s in suggestions] + [f[0] for f in faqs]
-            else:
-                all_suggestions = [s[0] for s in suggestions]
+        # Most frequently asked questions, from the heavy-hitter tracker
+        all_suggestions = [s['user_message'] for s in popular_questions.top(6)]
 
-        conn.close()
+        # If not enough history, get random FAQs
+        if len(all_suggestions) < 6:
+            all_suggestions += [f['question'] for f in
+                                queries.fetch_all('faqs.random_questions', (6 - len(all_suggestions),))]
 
         return jsonify({
             'suggestions': all_suggestions[:6]
@@ -18,6 +18,10 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
     app.config['JSON_SORT_KEYS'] = False
 
+    # A fresh database gets its schema before the blueprints' modules query it
+    from database.config import ensure_schema
+    ensure_schema()
+
     # Import and register blueprints
     try:
         from api.chat import chat_bp
@@ -28,10 +32,19 @@ def create_app():
         app.register_blueprint(admin_bp, url_prefix='/api/admin')
         app.register_blueprint(unknown_bp, url_prefix='/api')
         print("✅ Blueprints registered successfully")
+
+        # Each request checks out one pooled connection, returned here
+        from database.config import close_request_connection
+        app.teardown_appcontext(close_request_connection)
     except Exception as e:
         print(f"❌ Error registering blueprints: {e}")
         raise
 
+    # Warm the matcher before serving, so no real request pays for lazy loading
+    from nlp.matcher import matcher, warmup_questions
+    if matcher.warmup_enabled:
+        matcher.warm_up(warmup_questions())
+
     @app.route('/')
     def home():
         return {
@@ -45,6 +58,12 @@ def create_app():
     def health():
         return {'status': 'healthy', 'timestamp': __import__('datetime').datetime.now().isoformat()}
 
+    @app.route('/api/ready')
+    def ready():
+        """Readiness: 503 until the index is loaded and the pipeline is warm"""
+        status = matcher.readiness()
+        return jsonify(status), 200 if status['ready'] else 503
+
     return app
 
 
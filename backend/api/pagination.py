@@ -0,0 +1,109 @@
+"""
+Keyset pagination for the admin list endpoints
+
+A page is requested with the cursor of the previous page's last row
+instead of an OFFSET, so every page is one index range read however deep
+it is. Cursors are opaque to clients: url-safe base64 of the sort key.
+Totals come from a small, short-lived cache instead of a COUNT(*) per page.
+"""
+
+import json
+import time
+import base64
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+# Page size bounds
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Seconds a cached total is served before it is counted again
+COUNT_TTL_SECONDS = 30
+
+# Most totals kept at once (lists x filters); the least recently used go first
+COUNT_CACHE_SIZE = 64
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not produced by encode_cursor for this list"""
+
+
+def _encode_value(value):
+    # PostgreSQL returns timestamps as datetimes (SQLite as strings)
+    if isinstance(value, datetime):
+        return {'datetime': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and list(value) == ['datetime'] and isinstance(value['datetime'], str):
+        try:
+            return datetime.fromisoformat(value['datetime'])
+        except ValueError:
+            raise InvalidCursor('Malformed cursor')
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+        raise InvalidCursor('Malformed cursor')
+    return value
+
+
+def encode_cursor(*values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token, size):
+    """The sort key of a cursor, checked to have `size` scalar (or datetime) values"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise InvalidCursor('Malformed cursor')
+
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Malformed cursor')
+    return [_decode_value(v) for v in values]
+
+
+def page_limit(value):
+    """Requested page size, clamped to 1..MAX_LIMIT"""
+    try:
+        return max(1, min(int(value), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def split_page(rows, limit):
+    """(rows of this page, whether another page follows) from a LIMIT limit + 1 read"""
+    return rows[:limit], len(rows) > limit
+
+
+class CountCache:
+    """Totals by key, recounted at most every `ttl` seconds, at most `size` of them"""
+
+    def __init__(self, ttl=COUNT_TTL_SECONDS, size=COUNT_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()    # key -> (count, counted at), least recently used first
+
+    def get(self, key, count):
+        """Cached total for key, calling count() when missing or stale"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None and now - cached[1] < self.ttl:
+                self._counts.move_to_end(key)
+                return cached[0]
+
+        value = count()
+        with self._lock:
+            self._counts[key] = (value, now)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.size:
+                self._counts.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
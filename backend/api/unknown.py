@@ -4,8 +4,9 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.config import get_db_connection, add_unknown_question
+from database.config import add_unknown_question
 from database.models import UnknownQuestion
+from database import queries
 
 unknown_bp = Blueprint('unknown', __name__)
 
@@ -24,29 +25,13 @@ def mark_as_answered(question_id):
 def get_unknown_stats():
     """Get statistics about unknown questions"""
     try:
-        conn = get_db_connection()
-
-        # Total unknown questions
-        total = conn.execute("SELECT COUNT(*) as count FROM unknown_questions").fetchone()
-
-        # Unanswered count
-        unanswered = conn.execute("SELECT COUNT(*) as count FROM unknown_questions WHERE answered = 0").fetchone()
-
-        # Most common unknown questions
-        common = conn.execute("""
-            SELECT question, COUNT(*) as frequency 
-            FROM unknown_questions 
-            GROUP BY question 
-            ORDER BY frequency DESC 
-            LIMIT 10
-        """).fetchall()
-
-        conn.close()
-
         return jsonify({
-            'total': total['count'] if total else 0,
-            'unanswered': unanswered['count'] if unanswered else 0,
-            'common': [dict(q) for q in common]
+            # Total unknown questions
+            'total': queries.fetch_value('rollups.total', ('unknowns',), default=0),
+            # Unanswered count
+            'unanswered': UnknownQuestion.get_unanswered_count(),
+            # Most common unknown questions
+            'common': queries.fetch_all('unknown.most_common')
         })
 
     except Exception as e:
@@ -0,0 +1,127 @@
+"""
+Regression checks for the HTTP API
+
+Each check drives the Flask app through its test client and asserts one
+behaviour that has broken before. The app is imported against a temporary
+copy of the database (via SQLITE_DB_PATH), so nothing is written to the
+live one. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_api.py
+"""
+
+import os
+import sys
+import shutil
+from datetime import datetime
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.check_matching import use_database_copy
+
+
+def ask(client, question, session_id='check-api'):
+    response = client.post('/api/chat', json={'question': question, 'session_id': session_id})
+    return response.get_json()
+
+
+def check_known_unknown_same_reply(client):
+    """A repeated unknown question gets the same reply from the negative cache as it first did"""
+    question = "zorblat quindle vexmorph"
+    first = ask(client, question)
+    repeat = ask(client, question)
+    for reply in (first, repeat):
+        reply.pop('timestamp', None)
+    return first == repeat and not first['matched'], f"first {first}, repeat {repeat}"
+
+
+def check_datetime_cursor(client):
+    """A cursor over a datetime sort key (PostgreSQL's asked_at) round-trips as a datetime"""
+    from api.pagination import encode_cursor, decode_cursor
+
+    asked_at = datetime(2026, 10, 19, 4, 50, 42, 123456)
+    decoded = decode_cursor(encode_cursor(asked_at, 7), 2)
+    return decoded == [asked_at, 7], f"decoded {decoded!r}"
+
+
+def check_unknown_pages(client):
+    """Paging unknown questions two at a time visits every row once, newest first"""
+    from api.admin import create_token
+
+    headers = {'Authorization': f"Bearer {create_token('admin')}"}
+    for i in range(5):
+        ask(client, f"blorptastic question number {i} quazzle")
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/admin/unknown?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers=headers).get_json()
+        seen.extend((row['asked_at'], row['id']) for row in page['questions'])
+        cursor = page['pagination']['next_cursor']
+        if not cursor:
+            break
+
+    total = page['pagination']['total']
+    ordered = seen == sorted(seen, reverse=True) and len(set(seen)) == len(seen)
+    return ordered and len(seen) == total, f"{len(seen)} rows paged, total {total}"
+
+
+def check_search_pages(client):
+    """FAQ search pages by cursor without a total, and visits every match once"""
+    from api.admin import create_token
+
+    headers = {'Authorization': f"Bearer {create_token('admin')}"}
+    seen, totals, cursor = [], set(), None
+    while True:
+        url = '/api/admin/faqs?search=admission&limit=2' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers=headers).get_json()
+        seen.extend(faq['id'] for faq in page['faqs'])
+        totals.add(page['pagination']['total'])
+        cursor = page['pagination']['next_cursor']
+        if not cursor:
+            break
+
+    ok = len(seen) > 2 and len(set(seen)) == len(seen) and totals == {None}
+    return ok, f"{len(seen)} matches paged, totals {totals}"
+
+
+CHECKS = [
+    check_known_unknown_same_reply,
+    check_datetime_cursor,
+    check_unknown_pages,
+    check_search_pages,
+]
+
+
+def main():
+    directory = use_database_copy()
+    from api.index import app
+
+    client = app.test_client()
+    failures = 0
+
+    print("🧪 API regression checks")
+    print("=" * 72)
+    for check in CHECKS:
+        try:
+            ok, detail = check(client)
+        except Exception as e:
+            ok, detail = False, f"raised {e!r}"
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {check.__doc__}")
+        print(f"     {detail}")
+
+    print("=" * 72)
+    # Flush queued chat history into the copy before it is deleted
+    from database.config import chat_history_queue
+    chat_history_queue.close()
+    shutil.rmtree(directory, ignore_errors=True)
+    if failures:
+        print(f"❌ {failures} of {len(CHECKS)} checks failed")
+        sys.exit(1)
+    print(f"✅ All {len(CHECKS)} checks passed")
+
+
+if __name__ == "__main__":
+    main()
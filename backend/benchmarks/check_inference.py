@@ -0,0 +1,118 @@
+"""
+Check the sklearn-free serving path against scikit-learn
+
+1. Every query vector produced by TextVectorizer must match the fitted
+   sklearn vectorizer's transform() within float tolerance, for the TF-IDF
+   and the BM25 (count) vectorizers.
+2. The cosine scores must match sklearn's cosine_similarity.
+3. A snapshot loaded in a fresh interpreter must answer queries with
+   scikit-learn made unimportable. (nltk imports sklearn opportunistically
+   when it is installed, so "not in sys.modules" would prove nothing.)
+
+Usage (from backend/):
+    python benchmarks/check_inference.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.compare_engines import load_faqs, build_queries
+from nlp.preprocess import preprocessor
+from nlp.inference import TextVectorizer
+from nlp.scoring import create_vectorizer, vectorizer_params
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOLERANCE = 1e-9
+
+SERVE_CHECK = """
+import sys, time
+sys.modules['sklearn'] = None   # any 'import sklearn' now raises ImportError
+start = time.perf_counter()
+from nlp.index_builder import load_snapshot
+from nlp.preprocess import preprocessor
+snapshot = load_snapshot(sys.argv[1])
+shard = next(iter(snapshot.shards.values()))
+scores = shard.scorer.score(preprocessor.process("how much are the school fees"))
+elapsed = time.perf_counter() - start
+print(int(scores.argmax()), round(elapsed, 3))
+"""
+
+
+def max_difference(exported, fitted, texts):
+    """Largest absolute difference between the two vectorizers' outputs"""
+    ours = exported.transform(texts).toarray()
+    theirs = fitted.transform(texts).toarray()
+    return float(np.abs(ours - theirs).max())
+
+
+def main():
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    faqs = load_faqs()
+    processed_docs = preprocessor.process_batch([faq['question'] for faq in faqs])
+
+    texts = []
+    for queries in build_queries(faqs).values():
+        texts.extend(query for query, _ in queries)
+    processed = [preprocessor.process(text) for text in texts]
+    print(f"📋 {len(texts)} queries, {len(faqs)} FAQs")
+
+    failed = False
+
+    # Query vectors, on preprocessed and raw text
+    for name, fitted in [
+        ('tfidf', create_vectorizer(len(processed_docs))),
+        ('count', CountVectorizer(**vectorizer_params(len(processed_docs)))),
+    ]:
+        matrix = fitted.fit_transform(processed_docs)
+        exported = TextVectorizer.from_sklearn(fitted)
+        diff = max(max_difference(exported, fitted, processed), max_difference(exported, fitted, texts))
+        ok = diff <= TOLERANCE
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {name:<6} vectors   max |diff| = {diff:.2e}")
+
+        if name == 'tfidf':
+            ours = matrix @ exported.transform(processed).toarray().T
+            theirs = cosine_similarity(fitted.transform(processed), matrix).T
+            diff = float(np.abs(ours - theirs).max())
+            ok = diff <= TOLERANCE
+            failed |= not ok
+            print(f"{'✅' if ok else '❌'} {name:<6} cosine    max |diff| = {diff:.2e}")
+
+    # Serving from a pickled snapshot in a fresh interpreter
+    from nlp.index_builder import build_snapshot, save_snapshot
+
+    fd, path = tempfile.mkstemp(suffix='.pkl')
+    os.close(fd)
+    try:
+        save_snapshot(build_snapshot(faqs), path)
+        result = subprocess.run([sys.executable, '-c', SERVE_CHECK, path],
+                                cwd=BACKEND_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            failed = True
+            print(f"❌ serving   failed without sklearn: {result.stderr.strip()[-300:]}")
+        else:
+            best, seconds = result.stdout.split()[-2:]
+            print(f"✅ serving   without sklearn, load + first query {float(seconds) * 1000:.0f}ms, "
+                  f"best = {faqs[int(best)]['question'][:40]}")
+    finally:
+        os.remove(path)
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import sklearn.feature_extraction.text'], check=True)
+    print(f"ℹ️ importing sklearn alone takes {(time.perf_counter() - start) * 1000:.0f}ms (incl. interpreter start)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
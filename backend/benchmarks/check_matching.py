@@ -0,0 +1,144 @@
+"""
+Regression checks for question matching
+
+Each check builds the index it needs from data/faqs.json and asserts one
+behaviour that has broken before. The matcher is imported against a
+temporary copy of the database (via SQLITE_DB_PATH), so nothing is
+written to the live one. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_matching.py
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.compare_engines import load_faqs
+from nlp.preprocess import preprocessor
+
+LIVE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            'data', 'lautech.db')
+
+
+def use_database_copy():
+    """Point database.config at a temporary copy of the live database; returns its directory"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'check_matching.db')
+    target = sqlite3.connect(path)
+    if os.path.exists(LIVE_DB_PATH):
+        source = sqlite3.connect(LIVE_DB_PATH)
+        source.backup(target)
+        source.close()
+    target.close()
+    os.environ['SQLITE_DB_PATH'] = path
+    return directory
+
+
+def match(index, question):
+    """Full uncached matching pipeline for one question against a given index"""
+    from nlp.matcher import matcher
+    return matcher._match_uncached(index, question, preprocessor.process(question))
+
+
+def check_stopwords_not_corrections(faqs):
+    """Spelling never rewrites a word into a stopword ("cost" -> "most")"""
+    from nlp.spelling import SpellingIndex
+
+    speller = SpellingIndex.from_texts([faq['question'] for faq in faqs], extra_words=preprocessor.stop_words)
+    corrected = speller.correct("how much does it cost")
+    offered = sorted(set(speller.words) & set(preprocessor.stop_words))
+    return corrected == "how much does it cost" and not offered, f"{corrected!r}, stopwords in vocabulary: {offered[:5]}"
+
+
+def check_bm25_exact_question(faqs):
+    """Under BM25 every FAQ's own question is an 'exact' match to itself"""
+    from nlp.index_builder import build_snapshot
+
+    index = build_snapshot(faqs, engine='bm25')
+    missed = []
+    for position, faq in enumerate(faqs):
+        if len(preprocessor.process(faq['question']).split()) < 2:
+            continue    # one-word questions take the short-query path
+        result = match(index, faq['question'])
+        if not result or result['match_type'] != 'exact':
+            missed.append((faq['question'][:40], result and result['match_type'], result and result['confidence']))
+    return not missed, f"{len(missed)} not exact" + (f", e.g. {missed[:3]}" if missed else "")
+
+
+# A freshers' question mixed into every topic, so a low-rank basis ties
+# "freshers" to "hostel room" while the one hostel FAQ never says "freshers"
+PARAPHRASE_FAQS = [
+    "How is a hostel room allocated?",
+    "Do freshers in a hostel room pay school fees online?",
+    "Can freshers in a hostel room see the exam timetable?",
+    "Do freshers in a hostel room reset their portal password?",
+    "How do I pay school fees online?",
+    "When are school fees paid?",
+    "When is the exam timetable released?",
+    "Where do I check my exam results?",
+    "How do I reset my portal password?",
+    "Who can reset a portal password?",
+    "What documents are needed for clearance?",
+    "Is there a library on campus?",
+]
+
+
+def check_semantic_paraphrase(faqs):
+    """LSA rescues a paraphrase that shares no words with the FAQ it means"""
+    from nlp.index_builder import build_snapshot
+    from nlp.matcher import matcher
+    from nlp.scoring import LSAScorer
+
+    faqs = [{'id': i + 1, 'question': question, 'answer': question, 'category': 'general'}
+            for i, question in enumerate(PARAPHRASE_FAQS)]
+    index = build_snapshot(faqs, engine='tfidf')
+    for shard in index.shards.values():
+        shard.semantic = LSAScorer(n_components=3).fit(
+            preprocessor.process_batch(shard.faqs.questions))
+
+    processed = preprocessor.process("where do freshers stay")
+    shared = set(processed.split()) & set(preprocessor.process(PARAPHRASE_FAQS[0]).split())
+    result = matcher._semantic_match(index, processed)
+    found = result and result['id']
+    return not shared and found == 1, f"matched FAQ {found}, shared words {sorted(shared)}"
+
+
+CHECKS = [
+    check_stopwords_not_corrections,
+    check_bm25_exact_question,
+    check_semantic_paraphrase,
+]
+
+
+def main():
+    directory = use_database_copy()
+    faqs = load_faqs()
+    failures = 0
+
+    print(f"🧪 Matching regression checks over {len(faqs)} FAQs")
+    print("=" * 72)
+    for check in CHECKS:
+        try:
+            ok, detail = check(faqs)
+        except Exception as e:
+            ok, detail = False, f"raised {e!r}"
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {check.__doc__}")
+        print(f"     {detail}")
+
+    print("=" * 72)
+    shutil.rmtree(directory, ignore_errors=True)
+    if failures:
+        print(f"❌ {failures} of {len(CHECKS)} checks failed")
+        sys.exit(1)
+    print(f"✅ All {len(CHECKS)} checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Check that the hot queries are served by an index
+
+Copies the SQLite database into memory, runs the migrations on the copy,
+and asks EXPLAIN QUERY PLAN about each hot named query. A query fails the check
+if the plan scans its table without an index or sorts in a temp B-tree
+the index was meant to avoid. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_query_plans.py
+"""
+
+import os
+import sys
+import sqlite3
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import DB_PATH
+from database.migrations import apply_migrations
+from database.queries import QUERIES
+
+# (named query from database/queries.py, params, index the plan must use)
+HOT_QUERIES = [
+    ('chat.session', ('session', 50), 'idx_chat_history_session_time'),
+    ('unknown.page.by_status', (False, 21), 'idx_unknown_answered_asked'),
+    ('unknown.page.by_status.after', (False, '2024-01-01 00:00:00', 10, 21), 'idx_unknown_answered_asked'),
+    ('unknown.page.after', ('2024-01-01 00:00:00', 10, 21), 'idx_unknown_asked'),
+    ('unknown.count.unanswered', (), 'idx_unknown_answered_asked'),
+    ('rollups.daily_since', ('chats', '2024-01-01'), 'idx_daily_stats_metric_day'),
+    ('popular.top', (500,), 'idx_popular_questions_count'),
+    ('faqs.count.category', ('Admissions',), 'idx_faqs_category'),
+    ('faqs.categories', (), 'idx_faqs_category'),
+    ('faqs.id_by_question', ('What is the school fee?',), 'idx_faqs_question'),
+]
+
+
+def load_database():
+    """In-memory copy of the live database, migrated to the latest schema"""
+    conn = sqlite3.connect(':memory:')
+    if os.path.exists(DB_PATH):
+        source = sqlite3.connect(DB_PATH)
+        source.backup(conn)
+        source.close()
+    apply_migrations(conn, 'sqlite')
+    conn.execute("ANALYZE")
+    return conn
+
+
+def check_plan(conn, query, params, index):
+    """Returns (ok, plan lines)"""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()]
+    uses_index = any(index in line for line in plan)
+    full_scan = any(line.startswith('SCAN') and 'INDEX' not in line for line in plan)
+    temp_sort = any('USE TEMP B-TREE' in line for line in plan)
+    return uses_index and not full_scan and not temp_sort, plan
+
+
+if __name__ == "__main__":
+    conn = load_database()
+    failures = 0
+
+    print("🧪 Query plans for the hot queries")
+    print("=" * 72)
+    for name, params, index in HOT_QUERIES:
+        ok, plan = check_plan(conn, QUERIES[name].sqlite, params, index)
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}")
+        for line in plan:
+            print(f"     {line}")
+
+    print("=" * 72)
+    if failures:
+        print(f"❌ {failures} of {len(HOT_QUERIES)} queries are not index-backed")
+        sys.exit(1)
+    print(f"✅ All {len(HOT_QUERIES)} hot queries use an index")
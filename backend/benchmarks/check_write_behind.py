@@ -0,0 +1,67 @@
+"""
+Regression checks for the write-behind queue
+
+Each check drives a WriteBehindQueue with a fake writer (no database) and
+asserts one behaviour that has broken before. Exits non-zero on any
+failure.
+
+Usage (from backend/):
+    python benchmarks/check_write_behind.py
+"""
+
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.write_behind import WriteBehindQueue
+
+
+def check_close_flushes_everything():
+    """close() writes every queued row in full batches, within its timeout"""
+    batches = []
+
+    def slow_writer(rows):
+        time.sleep(0.002)
+        batches.append(len(rows))
+
+    writer = WriteBehindQueue('check', slow_writer, batch_size=50, max_age=60, max_queue=10000)
+    for i in range(3000):
+        writer.put((i,))
+    writer.close()
+
+    stats = writer.stats()
+    ok = stats['written'] == stats['enqueued'] == 3000 and len(batches) <= 3000 // 50 + 1
+    return ok, f"enqueued {stats['enqueued']}, written {stats['written']}, {len(batches)} batches"
+
+
+CHECKS = [
+    check_close_flushes_everything,
+]
+
+
+def main():
+    failures = 0
+
+    print("🧪 Write-behind regression checks")
+    print("=" * 72)
+    for check in CHECKS:
+        try:
+            ok, detail = check()
+        except Exception as e:
+            ok, detail = False, f"raised {e!r}"
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {check.__doc__}")
+        print(f"     {detail}")
+
+    print("=" * 72)
+    if failures:
+        print(f"❌ {failures} of {len(CHECKS)} checks failed")
+        sys.exit(1)
+    print(f"✅ All {len(CHECKS)} checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Accuracy and latency comparison of the matcher scoring engines
+
+Evaluation queries come from three places:
+  faqs      - every FAQ question in data/faqs.json (should match itself)
+  mappings  - the hand-written paraphrases in nlp/custom_mappings.py
+  history   - logged chat history whose bot response contains an FAQ answer
+
+conf is the share answered correctly with a score of at least 0.4 (the
+matcher's 'similar' threshold); wrong is the share answered incorrectly
+with such a score.
+
+Usage (from backend/):
+    python benchmarks/compare_engines.py
+    python benchmarks/compare_engines.py --engines tfidf bm25 --no-history
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp.preprocess import preprocessor
+from nlp.scoring import create_scorer
+from nlp.custom_mappings import CUSTOM_MAPPINGS
+
+FAQS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                         'data', 'faqs.json')
+
+
+def load_faqs():
+    """FAQs in import order; ids match a fresh import_faqs.py run"""
+    with open(FAQS_PATH, 'r', encoding='utf-8') as f:
+        faqs = json.load(f)
+    for i, faq in enumerate(faqs):
+        faq['id'] = i + 1
+    return faqs
+
+
+def history_queries(faqs):
+    """Label logged user messages by the FAQ answer the bot gave back"""
+    from database.config import get_db_connection
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT user_message, bot_response FROM chat_history")
+    rows = cur.fetchall()
+    conn.close()
+
+    queries = []
+    for user_message, bot_response in rows:
+        hits = [faq['id'] for faq in faqs if faq['answer'] in bot_response]
+        if len(hits) == 1:
+            queries.append((user_message, hits[0]))
+    return queries
+
+
+def build_queries(faqs, include_history=True):
+    ids = {faq['id'] for faq in faqs}
+    queries = {
+        'faqs': [(faq['question'], faq['id']) for faq in faqs],
+        'mappings': [(pattern, faq_id) for pattern, faq_id in CUSTOM_MAPPINGS.items() if faq_id in ids],
+    }
+    if include_history:
+        try:
+            queries['history'] = history_queries(faqs)
+        except Exception as e:
+            print(f"⚠️ Skipping chat history: {e}")
+    return queries
+
+
+def evaluate(engine, faqs, queries):
+    """Fit one engine and score every query set"""
+    processed_docs = preprocessor.process_batch([faq['question'] for faq in faqs])
+    ids = np.array([faq['id'] for faq in faqs])
+
+    start = time.perf_counter()
+    scorer = create_scorer(engine).fit(processed_docs)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    results = {}
+    for name, items in queries.items():
+        if not items:
+            continue
+
+        processed = [preprocessor.process(q) for q, _ in items]
+        latencies = []
+        ranks = []
+        confident = 0
+        wrong_confident = 0
+
+        for processed_query, (_, expected) in zip(processed, items):
+            start = time.perf_counter()
+            scores = scorer.score(processed_query)
+            order = np.argsort(scores)[::-1]
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            position = np.nonzero(ids[order] == expected)[0]
+            rank = int(position[0]) + 1 if len(position) and scores[order[position[0]]] > 0 else None
+            ranks.append(rank)
+            if scores[order[0]] >= 0.4:
+                if rank == 1:
+                    confident += 1
+                else:
+                    wrong_confident += 1
+
+        reciprocal = [1.0 / r if r else 0.0 for r in ranks]
+        results[name] = {
+            'n': len(items),
+            'top1': sum(1 for r in ranks if r == 1) / len(items),
+            'top3': sum(1 for r in ranks if r and r <= 3) / len(items),
+            'mrr': float(np.mean(reciprocal)),
+            'confident': confident / len(items),
+            'wrong': wrong_confident / len(items),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+        }
+
+    return build_ms, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=['tfidf', 'bm25', 'bm25+'])
+    parser.add_argument('--no-history', action='store_true', help='Skip logged chat history')
+    args = parser.parse_args()
+
+    faqs = load_faqs()
+    queries = build_queries(faqs, include_history=not args.no_history)
+
+    print("🧪 Matcher engine comparison")
+    print("=" * 80)
+    print(f"{'engine':<8} {'set':<9} {'n':>5} {'top1':>6} {'top3':>6} {'mrr':>6} "
+          f"{'conf':>6} {'wrong':>6} {'p50ms':>7} {'p99ms':>7}")
+
+    for engine in args.engines:
+        build_ms, results = evaluate(engine, faqs, queries)
+        for name, r in results.items():
+            print(f"{engine:<8} {name:<9} {r['n']:>5} {r['top1']:>6.3f} {r['top3']:>6.3f} {r['mrr']:>6.3f} "
+                  f"{r['confident']:>6.3f} {r['wrong']:>6.3f} {r['p50_ms']:>7.3f} {r['p99_ms']:>7.3f}")
+        print(f"{engine:<8} build {build_ms:.1f}ms")
+        print("-" * 80)
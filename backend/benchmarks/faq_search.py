@@ -0,0 +1,106 @@
+"""
+FAQ search: leading-wildcard LIKE vs the FTS5 index, as the table grows
+
+Builds in-memory FAQ tables of increasing size: the real FAQs plus
+synthetic ones drawn from a Zipf-distributed vocabulary, so a search term
+matches a handful of rows however big the table gets. Runs the migrations
+so the FTS5 table and triggers exist, then times the old admin search
+(LIKE '%term%' page plus its COUNT) against the ranked full-text page
+used by database/search.py (search results carry no total).
+
+Usage (from backend/):
+    python benchmarks/faq_search.py --sizes 1000 10000 100000
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.migrations import apply_migrations
+from database.search import QUESTION_WEIGHT, ANSWER_WEIGHT, search_terms, fts5_query
+
+FAQS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                         'data', 'faqs.json')
+
+TERMS = ['fee', 'hostel', 'admission', 'cut off mark', 'electricity', 'second choice']
+
+LIKE_QUERIES = [
+    "SELECT COUNT(*) FROM faqs WHERE (question LIKE ? OR answer LIKE ?)",
+    "SELECT * FROM faqs WHERE (question LIKE ? OR answer LIKE ?) ORDER BY id DESC LIMIT 21",
+]
+FTS_QUERIES = [
+    f"""SELECT faqs.*, bm25(faqs_fts, {QUESTION_WEIGHT}, {ANSWER_WEIGHT}) AS rank
+        FROM faqs_fts JOIN faqs ON faqs.id = faqs_fts.rowid
+        WHERE faqs_fts MATCH ? ORDER BY rank, id LIMIT 21""",
+]
+
+
+def synthetic_words(rng, vocabulary, n):
+    ranks = np.minimum(rng.zipf(1.3, n), len(vocabulary)) - 1
+    return ' '.join(vocabulary[r] for r in ranks)
+
+
+def build_table(faqs, size, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = [f'w{i}x' for i in range(50000)]
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE faqs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL, answer TEXT NOT NULL, category TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for table in ('unknown_questions (id INTEGER PRIMARY KEY, question TEXT, asked_at TIMESTAMP, '
+                  'answered BOOLEAN, session_id TEXT)',
+                  'chat_history (id INTEGER PRIMARY KEY, session_id TEXT, user_message TEXT, '
+                  'bot_response TEXT, timestamp TIMESTAMP)'):
+        conn.execute(f"CREATE TABLE {table}")
+    apply_migrations(conn, 'sqlite')
+
+    rows = [(f['question'], f['answer'], f.get('category')) for f in faqs]
+    while len(rows) < size:
+        rows.append((synthetic_words(rng, vocabulary, 10) + '?', synthetic_words(rng, vocabulary, 80), 'Synthetic'))
+    conn.executemany("INSERT INTO faqs (question, answer, category) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+def time_search(conn, queries, params_for, repeats=5):
+    """Latency of one search request's queries (first page, plus a count for LIKE) per term"""
+    latencies = []
+    for term in TERMS:
+        params = params_for(term)
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for query in queries:
+                conn.execute(query, params).fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+    return np.array(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='FAQ table sizes')
+    args = parser.parse_args()
+
+    with open(FAQS_PATH, 'r', encoding='utf-8') as f:
+        faqs = json.load(f)
+    print(f"🧪 FAQ search over {len(TERMS)} terms")
+    print("=" * 72)
+    for size in args.sizes:
+        conn = build_table(faqs, size)
+        like = time_search(conn, LIKE_QUERIES, lambda t: (f'%{t}%', f'%{t}%'))
+        fts = time_search(conn, FTS_QUERIES, lambda t: (fts5_query(search_terms(t)),))
+        print(f"{size:>8} FAQs  LIKE p50={np.percentile(like, 50):8.2f}ms p99={np.percentile(like, 99):8.2f}ms"
+              f"   FTS5 p50={np.percentile(fts, 50):7.2f}ms p99={np.percentile(fts, 99):7.2f}ms")
+        conn.close()
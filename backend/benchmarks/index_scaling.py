@@ -0,0 +1,132 @@
+"""
+Memory and per-query cost of the TF-IDF index as the FAQ count grows
+
+Compares the old layout (float64 CSR straight from fit_transform, scored
+with a freshly allocated float64 query vector) with the float32 CSR and
+per-thread query buffer now used by TfidfCosineScorer, for full scans and
+for re-ranking posting-list candidates as the matcher does.
+
+The corpora are synthetic: questions are drawn from the real FAQ
+vocabulary plus generated filler terms with a Zipf-like distribution,
+so the term statistics look like a much larger FAQ set.
+
+Usage (from backend/):
+    python benchmarks/index_scaling.py
+    python benchmarks/index_scaling.py --sizes 1000 10000 --queries 500
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.compare_engines import load_faqs
+from nlp.preprocess import preprocessor
+from nlp.candidates import CandidateIndex
+from nlp.scoring import TfidfCosineScorer
+
+
+def synthetic_corpus(n_docs, seed=42):
+    """Preprocessed questions with a realistic long-tailed vocabulary"""
+    rng = np.random.default_rng(seed)
+
+    words = sorted({word for doc in preprocessor.process_batch([faq['question'] for faq in load_faqs()])
+                    for word in doc.split()})
+    words += [f"term{i}" for i in range(max(2000, n_docs // 5))]
+
+    # Zipf-like term popularity
+    weights = 1.0 / np.arange(1, len(words) + 1) ** 1.1
+    weights /= weights.sum()
+
+    lengths = rng.integers(4, 11, size=n_docs)
+    picks = rng.choice(len(words), size=int(lengths.sum()), p=weights)
+
+    docs = []
+    start = 0
+    for length in lengths:
+        docs.append(' '.join(words[i] for i in picks[start:start + length]))
+        start += length
+    return docs
+
+
+def nbytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q)) * 1000
+
+
+def run(n_docs, n_queries, candidate_limit):
+    docs = synthetic_corpus(n_docs)
+
+    start = time.perf_counter()
+    scorer = TfidfCosineScorer().fit(docs)
+    fit_seconds = time.perf_counter() - start
+
+    candidates = CandidateIndex.from_processed(docs)
+    legacy = scorer.matrix.astype(np.float64)
+    legacy.sort_indices()
+
+    # Queries: FAQ questions with one word dropped
+    rng = np.random.default_rng(7)
+    queries = []
+    for i in rng.choice(n_docs, size=n_queries, replace=False):
+        tokens = docs[i].split()
+        del tokens[rng.integers(len(tokens))]
+        queries.append(' '.join(tokens))
+    candidate_sets = [candidates.lookup(query, candidate_limit) for query in queries]
+
+    def legacy_score(query, cands):
+        columns, values = scorer.vectorizer.transform_one(query)
+        query_vector = np.zeros(scorer.vectorizer.n_features)
+        query_vector[columns] = values
+        matrix = legacy if cands is None else legacy[cands]
+        return matrix @ query_vector
+
+    def timed(score, use_candidates):
+        timings = []
+        for query, cands in zip(queries, candidate_sets):
+            started = time.perf_counter()
+            score(query, cands if use_candidates else None)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    results = {
+        'float64 full': timed(legacy_score, False),
+        'float32 full': timed(scorer.score, False),
+        'float64 cands': timed(legacy_score, True),
+        'float32 cands': timed(scorer.score, True),
+    }
+
+    # Same answers either way
+    for query in queries[:50]:
+        assert np.allclose(legacy_score(query, None), scorer.score(query), atol=1e-5)
+
+    print(f"{n_docs:>7}  fit {fit_seconds:6.2f}s  nnz {scorer.matrix.nnz:>8}  "
+          f"float64 CSR {nbytes(legacy) / 1024:9.1f}KB  float32 CSR {nbytes(scorer.matrix) / 1024:9.1f}KB")
+    for name, timings in results.items():
+        print(f"         {name:<15} p50 {percentile_ms(timings, 50):8.3f}ms  p99 {percentile_ms(timings, 99):8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the TF-IDF index layout at scale')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--candidates', type=int, default=50)
+    args = parser.parse_args()
+
+    print("📏 TF-IDF index scaling (synthetic corpora)")
+    print("=" * 96)
+    for n_docs in args.sizes:
+        run(n_docs, min(args.queries, n_docs), args.candidates)
+        print("-" * 96)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Chat latency while the FAQ index is continuously rebuilt
+
+Runs three phases against /api/chat and reports latency percentiles:
+  baseline - no rebuilds
+  inline   - a background thread rebuilds in-process (holds the GIL)
+  process  - rebuilds happen in a child process and are attached
+
+Chat history, unknown questions and rebuilds go to a temporary copy of
+the database (via SQLITE_DB_PATH), never the live one.
+
+Usage (from backend/):
+    python benchmarks/rebuild_latency.py --seconds 20 --clients 4
+"""
+
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LIVE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            'data', 'lautech.db')
+
+QUESTIONS = [
+    "What is the cut off mark for medicine?",
+    "How much is school fees?",
+    "Where can I live near campus?",
+    "Does LAUTECH accept second choice?",
+    "What's the best place to read?",
+    "Tell me about hostel accommodation",
+    "When is post UTME form coming out?",
+    "Are there cultists in LAUTECH?",
+    "Which area has stable electricity?",
+    "How do I apply for the post utme screening?",
+]
+
+
+def run_clients(seconds, clients):
+    """Fire chat requests from several threads, returning latencies in ms"""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(worker_id):
+        test_client = app.test_client()
+        local = []
+        i = worker_id
+        while time.perf_counter() < deadline:
+            question = QUESTIONS[i % len(QUESTIONS)]
+            i += 1
+            start = time.perf_counter()
+            test_client.post('/api/chat', json={'question': question, 'session_id': 'bench'})
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies)
+
+
+def run_phase(name, seconds, clients, rebuild=None):
+    """Run one phase with an optional continuous rebuild loop"""
+    stop = threading.Event()
+    rebuilds = [0]
+
+    def rebuild_loop():
+        while not stop.is_set():
+            rebuild()
+            rebuilds[0] += 1
+
+    rebuilder = None
+    if rebuild:
+        rebuilder = threading.Thread(target=rebuild_loop, daemon=True)
+        rebuilder.start()
+
+    latencies = run_clients(seconds, clients)
+
+    stop.set()
+    if rebuilder:
+        rebuilder.join()
+
+    print(f"{name:<10} requests={len(latencies):<6} rebuilds={rebuilds[0]:<4} "
+          f"p50={np.percentile(latencies, 50):7.2f}ms "
+          f"p99={np.percentile(latencies, 99):7.2f}ms "
+          f"max={latencies.max():7.2f}ms")
+
+
+def copy_database(path):
+    """Copy the live database so the benchmark never writes to it"""
+    target = sqlite3.connect(path)
+    if os.path.exists(LIVE_DB_PATH):
+        source = sqlite3.connect(LIVE_DB_PATH)
+        source.backup(target)
+        source.close()
+    target.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10, help='Duration of each phase')
+    parser.add_argument('--clients', type=int, default=4, help='Concurrent chat threads')
+    args = parser.parse_args()
+
+    # Point the app at the copy before anything imports database.config
+    directory = tempfile.mkdtemp()
+    os.environ['SQLITE_DB_PATH'] = os.path.join(directory, 'rebuild_latency.db')
+    copy_database(os.environ['SQLITE_DB_PATH'])
+
+    from api.index import app
+    from nlp.matcher import matcher
+
+    print("🧪 Chat latency during continuous index rebuilds")
+    print("=" * 60)
+
+    run_phase('baseline', args.seconds, args.clients)
+    run_phase('inline', args.seconds, args.clients,
+              rebuild=lambda: matcher.rebuild_now(out_of_process=False))
+    run_phase('process', args.seconds, args.clients,
+              rebuild=lambda: matcher.rebuild_now(out_of_process=True))
+
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,134 @@
+"""
+SQLite contention: concurrent chat-history writers and analytics readers
+
+Runs N writer threads (add_chat_history-style INSERT + commit) and M
+reader threads (the admin stats/analytics queries) against a copy of the
+database, once per engine profile:
+  default - what get_db_connection() used to open: rollback journal,
+            synchronous=FULL, readers on ordinary connections
+  tuned   - SQLITE_PRAGMAS from database/config.py (WAL, synchronous=NORMAL,
+            busy timeout, cache/mmap) and read-only reader connections
+
+Each thread keeps its own connection, as the thread-local pool does.
+
+Usage (from backend/):
+    python benchmarks/sqlite_contention.py --writers 4 --readers 4 --seconds 10
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import DB_PATH, SQLITE_PRAGMAS, SQLITE_BUSY_TIMEOUT_MS, configure_sqlite
+
+READ_QUERIES = [
+    "SELECT COUNT(*) FROM chat_history",
+    "SELECT COUNT(*) FROM chat_history WHERE date(timestamp) = date('now')",
+    """SELECT user_message, COUNT(*) AS frequency FROM chat_history
+       GROUP BY user_message ORDER BY frequency DESC LIMIT 10""",
+    "SELECT category, COUNT(*) FROM faqs GROUP BY category",
+]
+
+
+def copy_database(path):
+    """Copy the live database so the benchmark never writes to it"""
+    source = sqlite3.connect(DB_PATH)
+    target = sqlite3.connect(path)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def connect(path, profile, read_only=False):
+    timeout = SQLITE_BUSY_TIMEOUT_MS / 1000
+    if profile == 'default':
+        return sqlite3.connect(path, timeout=timeout)
+    if read_only:
+        return configure_sqlite(sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=timeout), read_only=True)
+    return configure_sqlite(sqlite3.connect(path, timeout=timeout))
+
+
+def run_profile(profile, writers, readers, seconds):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'contention.db')
+    copy_database(path)
+
+    setup = sqlite3.connect(path)
+    setup.execute(f"PRAGMA journal_mode = {'DELETE' if profile == 'default' else SQLITE_PRAGMAS['journal_mode']}")
+    setup.close()
+
+    results = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+    deadline = [0.0]
+    start_barrier = threading.Barrier(
+        writers + readers, action=lambda: deadline.__setitem__(0, time.perf_counter() + seconds))
+
+    def worker(role, worker_id):
+        conn = connect(path, profile, read_only=(role == 'read'))
+        local = []
+        failed = 0
+        i = 0
+        start_barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            started = time.perf_counter()
+            try:
+                if role == 'write':
+                    conn.execute(
+                        "INSERT INTO chat_history (session_id, user_message, bot_response) VALUES (?, ?, ?)",
+                        (f'bench-{worker_id}', f'question {i % 50}', 'answer ' * 20)
+                    )
+                    conn.commit()
+                else:
+                    conn.execute(READ_QUERIES[i % len(READ_QUERIES)]).fetchall()
+                local.append((time.perf_counter() - started) * 1000)
+            except sqlite3.OperationalError:
+                # 'database is locked' once the busy timeout runs out
+                failed += 1
+                if role == 'write':
+                    conn.rollback()
+            i += 1
+        conn.close()
+        with lock:
+            results[role].extend(local)
+            errors[role] += failed
+
+    threads = [threading.Thread(target=worker, args=('write', n)) for n in range(writers)]
+    threads += [threading.Thread(target=worker, args=('read', n)) for n in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for role in ('write', 'read'):
+        latencies = np.array(results[role]) if results[role] else np.zeros(1)
+        print(f"{profile:<8} {role:<5} ops/s={len(results[role]) / seconds:9.1f} "
+              f"p50={np.percentile(latencies, 50):7.2f}ms p99={np.percentile(latencies, 99):8.2f}ms "
+              f"locked={errors[role]}")
+
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4, help='Concurrent chat-history writer threads')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent analytics reader threads')
+    parser.add_argument('--seconds', type=float, default=10, help='Duration of each profile')
+    args = parser.parse_args()
+
+    print(f"🧪 SQLite contention: {args.writers} writers, {args.readers} readers")
+    print("=" * 72)
+    for profile in ('default', 'tuned'):
+        run_profile(profile, args.writers, args.readers, args.seconds)
@@ -4,6 +4,12 @@ Database configuration - automatically switches between SQLite and PostgreSQL
 
 import os
 import sys
+from datetime import datetime
+
+from database.pool import PostgresPool, SQLitePool, request_connection, release_request_connection
+from database.write_behind import WriteBehindQueue
+from database import rollups, queries
+from database.migrations import LATEST_VERSION, apply_migrations, current_version
 
 # Check if we're in production (Vercel)
 IN_PRODUCTION = os.environ.get('VERCEL_ENV') is not None
@@ -11,45 +17,28 @@ IN_PRODUCTION = os.environ.get('VERCEL_ENV') is not None
 if IN_PRODUCTION:
     # Use production database (PostgreSQL)
     import psycopg2
-    from psycopg2.extras import RealDictCursor
 
     DATABASE_URL = os.environ.get('DATABASE_URL')
 
+    _pool = PostgresPool(
+        lambda: psycopg2.connect(DATABASE_URL),
+        max_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+        timeout=float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    )
+
     def get_db_connection():
-        """Create and return a PostgreSQL database connection"""
+        """Check out a PostgreSQL connection (the request's own inside a request)"""
         if not DATABASE_URL:
             raise Exception("DATABASE_URL environment variable not set")
 
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        return request_connection(_pool) or _pool.connect()
 
-    def execute_query(conn, query, params=None):
-        """Execute a SELECT query and return all results"""
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        if params:
-            cur.execute(query, params)
-        else:
-            cur.execute(query)
-        return cur.fetchall()
-
-    def execute_query_one(conn, query, params=None):
-        """Execute a SELECT query and return one result"""
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        if params:
-            cur.execute(query, params)
-        else:
-            cur.execute(query)
-        return cur.fetchone()
-
-    def execute_write(conn, query, params=None):
-        """Execute an INSERT/UPDATE/DELETE query"""
-        cur = conn.cursor()
-        if params:
-            cur.execute(query, params)
-        else:
-            cur.execute(query)
-        conn.commit()
-        return cur.rowcount
+    def get_read_connection():
+        """Connection for read-only work; MVCC readers never block writers here"""
+        return get_db_connection()
+
+    def _release_read_connection():
+        pass
 
     def init_database():
         """Initialize PostgreSQL database and create tables"""
@@ -91,51 +80,88 @@ if IN_PRODUCTION:
         ''')
 
         conn.commit()
+        apply_migrations(conn, 'postgresql')
         conn.close()
         print("✅ PostgreSQL database initialized")
 
+    def schema_version():
+        """Applied schema version: one query, 0 if the schema was never created"""
+        conn = get_db_connection()
+        try:
+            return current_version(conn)
+        except Exception:
+            return 0
+        finally:
+            conn.close()
+
 else:
     # Use development SQLite
     import sqlite3
     import os
 
-    DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'lautech.db')
+    # SQLITE_DB_PATH points benchmarks and scripts at a copy of the database
+    DB_PATH = os.environ.get('SQLITE_DB_PATH') or \
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'lautech.db')
+
+    # Engine profile for concurrent use: WAL lets readers run alongside the
+    # writer, NORMAL sync fsyncs at checkpoints instead of every commit, and
+    # a busy timeout waits out short write locks instead of failing
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+        'cache_size': -16000,           # KiB, i.e. 16MB of page cache
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+    # Compiled statements kept per connection; covers every named query in database/queries.py
+    SQLITE_STATEMENT_CACHE = int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+
+    def configure_sqlite(conn, read_only=False, pragmas=None):
+        """Apply the engine profile to a new connection"""
+        pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+        for name, value in pragmas.items():
+            # journal_mode is a property of the database file; readers cannot change it
+            if read_only and name == 'journal_mode':
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
 
-    def get_db_connection():
-        """Create and return a SQLite database connection"""
+    def _connect():
         # Ensure directory exists
         os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                               cached_statements=SQLITE_STATEMENT_CACHE)
         conn.row_factory = sqlite3.Row
-        return conn
+        return configure_sqlite(conn)
 
-    def execute_query(conn, query, params=None):
-        """Execute a SELECT query and return all results"""
-        cur = conn.cursor()
-        if params:
-            cur.execute(query, params)
-        else:
-            cur.execute(query)
-        return cur.fetchall()
-
-    def execute_query_one(conn, query, params=None):
-        """Execute a SELECT query and return one result"""
-        cur = conn.cursor()
-        if params:
-            cur.execute(query, params)
-        else:
-            cur.execute(query)
-        return cur.fetchone()
-
-    def execute_write(conn, query, params=None):
-        """Execute an INSERT/UPDATE/DELETE query"""
-        cur = conn.cursor()
-        if params:
-            cur.execute(query, params)
-        else:
-            cur.execute(query)
-        conn.commit()
-        return cur.rowcount
+    def _connect_read_only():
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                               cached_statements=SQLITE_STATEMENT_CACHE)
+        conn.row_factory = sqlite3.Row
+        return configure_sqlite(conn, read_only=True)
+
+    _pool = SQLitePool(_connect)
+    _read_pool = SQLitePool(_connect_read_only)
+
+    def get_db_connection():
+        """Check out this thread's SQLite connection (the request's own inside a request)"""
+        return request_connection(_pool) or _pool.connect()
+
+    def get_read_connection():
+        """
+        Check out this thread's read-only SQLite connection
+
+        Under WAL it reads the last committed state without waiting for, or
+        blocking, the writer. Writes through it raise.
+        """
+        return request_connection(_read_pool, 'db_read_connection') or _read_pool.connect()
+
+    def _release_read_connection():
+        release_request_connection(_read_pool, 'db_read_connection')
 
     def init_database():
         """Initialize SQLite database and create tables"""
@@ -174,115 +200,124 @@ else:
         ''')
 
         conn.commit()
+        apply_migrations(conn, 'sqlite')
+        version = current_version(conn)
         conn.close()
+        _write_schema_marker(version)
         print("✅ SQLite database initialized")
 
-# Initialize database on module import
-init_database()
+    # Records the schema version next to the database so startup can skip
+    # init_database() without opening a connection
+    SCHEMA_MARKER = DB_PATH + '.schema'
+
+    def _write_schema_marker(version):
+        temp_path = SCHEMA_MARKER + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(str(version))
+        os.replace(temp_path, SCHEMA_MARKER)
+
+    def schema_version():
+        """Schema version from the marker file, 0 if it or the database is missing"""
+        if not os.path.exists(DB_PATH):
+            return 0
+        try:
+            with open(SCHEMA_MARKER) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+
+def ensure_schema():
+    """
+    Create the schema only when none has been recorded yet
+
+    Called at app startup, so a cold start with an existing schema costs
+    one version check instead of the CREATE TABLE statements. A schema that
+    is merely behind is left alone: run `python migrate.py` to migrate.
+    """
+    version = schema_version()
+    if version == 0:
+        init_database()
+        return True
+    if version < LATEST_VERSION:
+        print(f"⚠️ Schema version {version} of {LATEST_VERSION}: run `python migrate.py`")
+    return False
+
+
+def close_request_connection(exception=None):
+    """Flask teardown hook: return the request's connections to their pools"""
+    release_request_connection(_pool)
+    _release_read_connection()
+
+
+def get_pool_stats():
+    """Connection pool size and usage counters"""
+    stats = _pool.stats()
+    if not IN_PRODUCTION:
+        stats['read_only'] = _read_pool.stats()
+    return stats
 
 # Common functions that work with both databases
 def add_faq(question, answer, category=None):
     """Add a new FAQ to the database"""
-    conn = get_db_connection()
-
-    if IN_PRODUCTION:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO faqs (question, answer, category) VALUES (%s, %s, %s) RETURNING id",
-            (question, answer, category)
-        )
-        faq_id = cur.fetchone()[0]
-        conn.commit()
-    else:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO faqs (question, answer, category) VALUES (?, ?, ?)",
-            (question, answer, category)
-        )
-        faq_id = cur.lastrowid
-        conn.commit()
-
-    conn.close()
-    return faq_id
+    return queries.insert('faqs.insert', (question, answer, category))
 
 def get_all_faqs():
     """Retrieve all FAQs from database"""
-    conn = get_db_connection()
-
-    if IN_PRODUCTION:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT * FROM faqs ORDER BY id")
-        faqs = cur.fetchall()
-    else:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM faqs ORDER BY id")
-        faqs = cur.fetchall()
-
-    conn.close()
-    return [dict(faq) for faq in faqs]
+    return queries.fetch_all('faqs.all')
 
 def add_unknown_question(question, session_id=None):
     """Log an unknown question"""
     conn = get_db_connection()
-
-    if IN_PRODUCTION:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO unknown_questions (question, session_id) VALUES (%s, %s) RETURNING id",
-            (question, session_id)
-        )
-        question_id = cur.fetchone()[0]
-        conn.commit()
-    else:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO unknown_questions (question, session_id) VALUES (?, ?)",
-            (question, session_id)
-        )
-        question_id = cur.lastrowid
-        conn.commit()
-
+    question_id = queries.insert('unknown.insert', (question, session_id), conn)
+    rollups.increment(conn, {(rollups.today(), 'unknowns', ''): 1})
+    conn.commit()
     conn.close()
     return question_id
 
 def get_unknown_questions(answered=False):
     """Get all unknown questions"""
-    conn = get_db_connection()
+    return queries.fetch_all('unknown.by_status', (bool(answered),))
+
+def add_chat_history(session_id, user_message, bot_response, match_type=None, category=None):
+    """
+    Save chat history (queued for a batched insert unless CHAT_LOG_MODE=sync)
 
-    if IN_PRODUCTION:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute(
-            "SELECT * FROM unknown_questions WHERE answered = %s ORDER BY asked_at DESC",
-            (answered,)
-        )
-        questions = cur.fetchall()
+    match_type and category only feed the daily rollups.
+    """
+    # Stamped now, so a row written a moment later still has the request's time
+    row = (session_id, user_message, bot_response, datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+           match_type, category)
+
+    if chat_history_queue is not None:
+        chat_history_queue.put(row)
     else:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM unknown_questions WHERE answered = ? ORDER BY asked_at DESC",
-            (1 if answered else 0,)
-        )
-        questions = cur.fetchall()
+        _insert_chat_history_rows([row])
 
-    conn.close()
-    return [dict(q) for q in questions]
 
-def add_chat_history(session_id, user_message, bot_response):
-    """Save chat history"""
+def _insert_chat_history_rows(rows):
+    """Insert chat history rows and their rollup counts with one commit"""
     conn = get_db_connection()
+    queries.execute_many('chat.insert', [row[:4] for row in rows], conn)
+    rollups.increment(conn, rollups.chat_counts(rows))
+    conn.commit()
+    conn.close()
 
-    if IN_PRODUCTION:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO chat_history (session_id, user_message, bot_response) VALUES (%s, %s, %s)",
-            (session_id, user_message, bot_response)
-        )
-    else:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO chat_history (session_id, user_message, bot_response) VALUES (?, ?, ?)",
-            (session_id, user_message, bot_response)
-        )
 
-    conn.commit()
-    conn.close()
\ No newline at end of file
+# Serverless instances may be frozen right after the response, so write
+# chat history synchronously there unless told otherwise
+CHAT_LOG_MODE = os.environ.get('CHAT_LOG_MODE', 'sync' if IN_PRODUCTION else 'queue')
+
+chat_history_queue = WriteBehindQueue(
+    'chat_history',
+    _insert_chat_history_rows,
+    batch_size=int(os.environ.get('CHAT_LOG_BATCH_SIZE', 50)),
+    max_age=float(os.environ.get('CHAT_LOG_MAX_AGE_MS', 1000)) / 1000,
+    max_queue=int(os.environ.get('CHAT_LOG_MAX_QUEUE', 10000)),
+    drop=os.environ.get('CHAT_LOG_DROP', 'newest')
+) if CHAT_LOG_MODE == 'queue' else None
+
+
+def get_chat_log_stats():
+    """Write-behind queue counters, or None when chat history is written inline"""
+    return chat_history_queue.stats() if chat_history_queue is not None else None
\ No newline at end of file
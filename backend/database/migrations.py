@@ -0,0 +1,189 @@
+"""
+Versioned schema migrations for both database backends
+
+init_database() creates the base tables; everything after that is a
+numbered migration. Applied versions are recorded in schema_version, so
+each migration runs once per database and a new one is just another
+entry at the end of MIGRATIONS.
+
+A migration is (version, description, statements) where statements is a
+list of SQL strings shared by both backends, or a dict with separate
+'sqlite' and 'postgresql' lists when the dialects differ.
+"""
+
+MIGRATIONS = [
+    (1, 'Secondary indexes for the hot queries', [
+        # /api/chat/history/<session_id>: WHERE session_id = ? ORDER BY timestamp DESC
+        "CREATE INDEX IF NOT EXISTS idx_chat_history_session_time ON chat_history (session_id, timestamp)",
+        # /api/admin/unknown: WHERE answered = ? ORDER BY asked_at DESC
+        "CREATE INDEX IF NOT EXISTS idx_unknown_answered_asked ON unknown_questions (answered, asked_at)",
+        # /api/admin/faqs?category=...
+        "CREATE INDEX IF NOT EXISTS idx_faqs_category ON faqs (category)",
+        # /api/admin/create_faq duplicate check
+        "CREATE INDEX IF NOT EXISTS idx_faqs_question ON faqs (question)",
+    ]),
+    (2, 'Daily rollups for dashboard statistics', {
+        'sqlite': [
+            '''CREATE TABLE IF NOT EXISTS daily_stats (
+                day TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                dimension TEXT NOT NULL DEFAULT '',
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, metric, dimension)
+            )''',
+            "CREATE INDEX IF NOT EXISTS idx_daily_stats_metric_day ON daily_stats (metric, day)",
+            # Backfill from the rows logged so far (match types were never stored)
+            '''INSERT OR IGNORE INTO daily_stats (day, metric, dimension, count)
+               SELECT date(timestamp), 'chats', '', COUNT(*) FROM chat_history GROUP BY date(timestamp)''',
+            '''INSERT OR IGNORE INTO daily_stats (day, metric, dimension, count)
+               SELECT date(asked_at), 'unknowns', '', COUNT(*) FROM unknown_questions GROUP BY date(asked_at)''',
+        ],
+        'postgresql': [
+            '''CREATE TABLE IF NOT EXISTS daily_stats (
+                day TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                dimension TEXT NOT NULL DEFAULT '',
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, metric, dimension)
+            )''',
+            "CREATE INDEX IF NOT EXISTS idx_daily_stats_metric_day ON daily_stats (metric, day)",
+            '''INSERT INTO daily_stats (day, metric, dimension, count)
+               SELECT to_char(timestamp, 'YYYY-MM-DD'), 'chats', '', COUNT(*) FROM chat_history
+               GROUP BY 1 ON CONFLICT DO NOTHING''',
+            '''INSERT INTO daily_stats (day, metric, dimension, count)
+               SELECT to_char(asked_at, 'YYYY-MM-DD'), 'unknowns', '', COUNT(*) FROM unknown_questions
+               GROUP BY 1 ON CONFLICT DO NOTHING''',
+        ],
+    }),
+    (3, 'Saved counts for popular questions', [
+        '''CREATE TABLE IF NOT EXISTS popular_questions (
+            question_key TEXT PRIMARY KEY,
+            question TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_popular_questions_count ON popular_questions (count)",
+    ]),
+    (4, 'Index for paging all unknown questions by time', [
+        # /api/admin/unknown?filter=all: ORDER BY asked_at DESC, id DESC from a cursor
+        "CREATE INDEX IF NOT EXISTS idx_unknown_asked ON unknown_questions (asked_at)",
+    ]),
+    (5, 'Full-text index over FAQ questions and answers', {
+        'sqlite': [
+            # External-content FTS5 table over faqs, kept in sync by triggers
+            '''CREATE VIRTUAL TABLE IF NOT EXISTS faqs_fts USING fts5(
+                question, answer, content='faqs', content_rowid='id', tokenize='porter unicode61'
+            )''',
+            '''CREATE TRIGGER IF NOT EXISTS faqs_fts_insert AFTER INSERT ON faqs BEGIN
+                INSERT INTO faqs_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer);
+            END''',
+            '''CREATE TRIGGER IF NOT EXISTS faqs_fts_delete AFTER DELETE ON faqs BEGIN
+                INSERT INTO faqs_fts (faqs_fts, rowid, question, answer)
+                VALUES ('delete', old.id, old.question, old.answer);
+            END''',
+            '''CREATE TRIGGER IF NOT EXISTS faqs_fts_update AFTER UPDATE OF question, answer ON faqs BEGIN
+                INSERT INTO faqs_fts (faqs_fts, rowid, question, answer)
+                VALUES ('delete', old.id, old.question, old.answer);
+                INSERT INTO faqs_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer);
+            END''',
+            "INSERT INTO faqs_fts (faqs_fts) VALUES ('rebuild')",
+        ],
+        'postgresql': [
+            # Generated column: recomputed by PostgreSQL on every insert and update
+            '''ALTER TABLE faqs ADD COLUMN IF NOT EXISTS search_vector tsvector
+               GENERATED ALWAYS AS (
+                   setweight(to_tsvector('english', coalesce(question, '')), 'A') ||
+                   setweight(to_tsvector('english', coalesce(answer, '')), 'B')
+               ) STORED''',
+            "CREATE INDEX IF NOT EXISTS idx_faqs_search ON faqs USING GIN (search_vector)",
+        ],
+    }),
+    (6, 'Learned paraphrases', [
+        # Normalized question hash -> FAQ; databases created before this
+        # migration already have the table from init_database()
+        '''CREATE TABLE IF NOT EXISTS paraphrases (
+            question_hash TEXT PRIMARY KEY,
+            question TEXT NOT NULL,
+            faq_id INTEGER NOT NULL,
+            confidence REAL DEFAULT 1.0,
+            source TEXT DEFAULT 'match',
+            hits INTEGER DEFAULT 0,
+            last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Serializes concurrent cold starts running migrations on PostgreSQL
+ADVISORY_LOCK_ID = 7261044
+
+
+def _statements(migration, backend):
+    statements = migration[2]
+    if isinstance(statements, dict):
+        return statements.get(backend, [])
+    return statements
+
+
+def current_version(conn):
+    """Highest applied migration version (0 for a fresh database)"""
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(version) FROM schema_version")
+    row = cur.fetchone()
+    value = row[0] if not isinstance(row, dict) else list(row.values())[0]
+    return value or 0
+
+
+def apply_migrations(conn, backend):
+    """
+    Bring the schema up to date, one transaction per migration
+
+    Args:
+        conn: Open connection with the base tables in place
+        backend: 'sqlite' or 'postgresql'
+
+    Returns:
+        List of versions applied by this call
+    """
+    placeholder = '%s' if backend == 'postgresql' else '?'
+    cur = conn.cursor()
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+    if backend == 'postgresql':
+        # Session-level lock: only one instance migrates at a time
+        cur.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_ID,))
+
+    applied = []
+    try:
+        version = current_version(conn)
+        for migration in MIGRATIONS:
+            number, description = migration[0], migration[1]
+            if number <= version:
+                continue
+            try:
+                for statement in _statements(migration, backend):
+                    cur.execute(statement)
+                cur.execute(
+                    f"INSERT INTO schema_version (version, description) VALUES ({placeholder}, {placeholder})",
+                    (number, description)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                print(f"❌ Migration {number} ({description}) failed")
+                raise
+            applied.append(number)
+            print(f"🗄️ Applied migration {number}: {description}")
+    finally:
+        if backend == 'postgresql':
+            cur.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_ID,))
+            conn.commit()
+
+    return applied
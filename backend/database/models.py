@@ -3,7 +3,8 @@ Database Models
 """
 
 from datetime import datetime
-from .config import get_db_connection, IN_PRODUCTION, execute_query_one, execute_query
+from . import queries
+from .search import search_faqs
 
 class FAQ:
     """FAQ Model Class"""
@@ -19,81 +20,22 @@ class FAQ:
     @staticmethod
     def get_by_id(faq_id):
         """Get FAQ by ID"""
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            from psycopg2.extras import RealDictCursor
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute("SELECT * FROM faqs WHERE id = %s", (faq_id,))
-            faq = cur.fetchone()
-        else:
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM faqs WHERE id = ?", (faq_id,))
-            faq = cur.fetchone()
-
-        conn.close()
-        return dict(faq) if faq else None
+        return queries.fetch_one('faqs.get', (faq_id,))
 
     @staticmethod
     def search_by_question(query):
-        """Search FAQs by question (for matching)"""
-        conn = get_db_connection()
-        search_term = f"%{query}%"
-
-        if IN_PRODUCTION:
-            from psycopg2.extras import RealDictCursor
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(
-                "SELECT * FROM faqs WHERE question ILIKE %s ORDER BY id",
-                (search_term,)
-            )
-            faqs = cur.fetchall()
-        else:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT * FROM faqs WHERE question LIKE ? ORDER BY id",
-                (search_term,)
-            )
-            faqs = cur.fetchall()
-
-        conn.close()
-        return [dict(faq) for faq in faqs]
+        """Search FAQs by question (for matching), best match first"""
+        return search_faqs(query, limit=50, question_only=True)
 
     @staticmethod
     def update_answer(faq_id, new_answer):
         """Update FAQ answer"""
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE faqs SET answer = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-                (new_answer, faq_id)
-            )
-        else:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE faqs SET answer = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (new_answer, faq_id)
-            )
-
-        conn.commit()
-        conn.close()
+        queries.execute('faqs.update_answer', (new_answer, faq_id))
 
     @staticmethod
     def delete(faq_id):
         """Delete FAQ by ID"""
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM faqs WHERE id = %s", (faq_id,))
-        else:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM faqs WHERE id = ?", (faq_id,))
-
-        conn.commit()
-        conn.close()
+        queries.execute('faqs.delete', (faq_id,))
 
 
 class UnknownQuestion:
@@ -109,44 +51,12 @@ class UnknownQuestion:
     @staticmethod
     def mark_as_answered(question_id):
         """Mark unknown question as answered"""
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE unknown_questions SET answered = TRUE WHERE id = %s",
-                (question_id,)
-            )
-        else:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE unknown_questions SET answered = 1 WHERE id = ?",
-                (question_id,)
-            )
-
-        conn.commit()
-        conn.close()
+        queries.execute('unknown.mark_answered', (question_id,))
 
     @staticmethod
     def get_unanswered_count():
         """Get count of unanswered questions"""
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) as count FROM unknown_questions WHERE answered = FALSE")
-            result = cur.fetchone()
-        else:
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) as count FROM unknown_questions WHERE answered = 0")
-            result = cur.fetchone()
-
-        conn.close()
-
-        if IN_PRODUCTION:
-            return result['count'] if result else 0
-        else:
-            return result[0] if result else 0
+        return queries.fetch_value('unknown.count.unanswered', default=0)
 
 
 class ChatHistory:
@@ -155,38 +65,9 @@ class ChatHistory:
     @staticmethod
     def get_session_history(session_id, limit=50):
         """Get chat history for a session"""
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            from psycopg2.extras import RealDictCursor
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(
-                "SELECT * FROM chat_history WHERE session_id = %s ORDER BY timestamp DESC LIMIT %s",
-                (session_id, limit)
-            )
-            history = cur.fetchall()
-        else:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT * FROM chat_history WHERE session_id = ? ORDER BY timestamp DESC LIMIT ?",
-                (session_id, limit)
-            )
-            history = cur.fetchall()
-
-        conn.close()
-        return [dict(h) for h in history]
+        return queries.fetch_all('chat.session', (session_id, limit))
 
     @staticmethod
     def clear_session(session_id):
         """Clear chat history for a session"""
-        conn = get_db_connection()
-
-        if IN_PRODUCTION:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM chat_history WHERE session_id = %s", (session_id,))
-        else:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM chat_history WHERE session_id = ?", (session_id,))
-
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        queries.execute('chat.clear_session', (session_id,))
@@ -0,0 +1,294 @@
+"""
+Connection pooling for both database backends
+
+PostgreSQL connections come from a bounded, thread-safe pool; SQLite
+connections are kept one per thread and reused. Either way callers keep
+the existing pattern:
+
+    conn = get_db_connection()
+    ...
+    conn.close()    # returns the connection instead of closing it
+
+Inside a Flask request every get_db_connection() call shares one checked
+out connection, released when the request's app context tears down.
+"""
+
+import time
+import threading
+
+# Connections idle longer than this are checked with SELECT 1 before reuse
+HEALTH_CHECK_SECONDS = 30
+
+
+class PoolTimeout(Exception):
+    """No connection became free in time"""
+
+
+class PooledConnection:
+    """
+    A checked-out connection; everything but close() goes to the real one
+
+    close() hands the connection back to its pool. A request-scoped handle
+    ignores close(): the request teardown releases it.
+    """
+
+    def __init__(self, pool, raw, scoped=False):
+        self._pool = pool
+        self._raw = raw
+        self._scoped = scoped
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __del__(self):
+        # A handle dropped without close() must not leak its connection
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self):
+        if self._scoped or self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw)
+
+    def __enter__(self):
+        return self._raw.__enter__()
+
+    def __exit__(self, *exc):
+        return self._raw.__exit__(*exc)
+
+
+class _Pool:
+    """Bookkeeping shared by both pools"""
+
+    backend = None
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0, 'waits': 0, 'wait_ms': 0.0, 'timeouts': 0,
+            'created': 0, 'discarded': 0, 'failed_health_checks': 0
+        }
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _new_connection(self):
+        raw = self._connect()
+        self._count('created')
+        return raw
+
+    def _healthy(self, raw, idle_seconds):
+        """Cheap liveness check for a connection about to be reused"""
+        if getattr(raw, 'closed', 0):
+            return False
+        if idle_seconds < HEALTH_CHECK_SECONDS:
+            return True
+        try:
+            cur = raw.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            raw.rollback()
+            return True
+        except Exception:
+            self._count('failed_health_checks')
+            return False
+
+    def _discard(self, raw):
+        self._count('discarded')
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def connect(self, scoped=False):
+        return PooledConnection(self, self.checkout(), scoped=scoped)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['wait_ms'] = round(stats['wait_ms'], 1)
+        stats['backend'] = self.backend
+        stats.update(self._usage())
+        return stats
+
+
+class PostgresPool(_Pool):
+    """At most max_size connections, shared by all threads"""
+
+    backend = 'postgresql'
+
+    def __init__(self, connect, max_size=10, timeout=10.0):
+        super().__init__(connect)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._lock = threading.Condition()
+        self._idle = []         # (connection, returned at)
+        self._open = 0
+
+    def checkout(self):
+        started = time.perf_counter()
+        waited = False
+
+        with self._lock:
+            while True:
+                if self._idle:
+                    raw, returned_at = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    raw = None
+                    break
+
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0 or not self._lock.wait(remaining):
+                    self._count('timeouts')
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+
+        if waited:
+            self._count('waits')
+            self._count('wait_ms', (time.perf_counter() - started) * 1000)
+        self._count('checkouts')
+
+        if raw is not None and not self._healthy(raw, time.time() - returned_at):
+            self._discard(raw)
+            raw = None
+
+        if raw is None:
+            try:
+                raw = self._new_connection()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+
+        return raw
+
+    def release(self, raw):
+        """Return a connection, rolling back anything left uncommitted"""
+        try:
+            raw.rollback()
+            healthy = not raw.closed
+        except Exception:
+            healthy = False
+
+        if not healthy:
+            self._discard(raw)
+
+        with self._lock:
+            if healthy:
+                self._idle.append((raw, time.time()))
+            else:
+                self._open -= 1
+            self._lock.notify()
+
+    def _usage(self):
+        with self._lock:
+            return {'max_size': self.max_size, 'open': self._open,
+                    'idle': len(self._idle), 'in_use': self._open - len(self._idle)}
+
+
+class _ThreadConnection:
+    """A thread's SQLite connection; counted out of the pool when the thread ends"""
+
+    def __init__(self, pool, raw):
+        self.pool = pool
+        self.raw = raw
+        self.depth = 0
+        self.returned_at = time.time()
+
+    def __del__(self):
+        self.pool._track(open_delta=-1, in_use_delta=-1 if self.depth else 0)
+
+
+class SQLitePool(_Pool):
+    """
+    One connection per thread, reused across checkouts
+
+    Nested checkouts in a thread share the connection; it is only rolled
+    back once the outermost one is released.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, connect):
+        super().__init__(connect)
+        self._local = threading.local()
+        self._open = 0
+        self._in_use = 0
+
+    def checkout(self):
+        self._count('checkouts')
+
+        held = getattr(self._local, 'held', None)
+        if held is not None and held.depth == 0 \
+                and not self._healthy(held.raw, time.time() - held.returned_at):
+            self._discard(held.raw)
+            held = self._local.held = None
+
+        if held is None:
+            held = self._local.held = _ThreadConnection(self, self._new_connection())
+            self._track(open_delta=1)
+
+        if held.depth == 0:
+            self._track(in_use_delta=1)
+        held.depth += 1
+        return held.raw
+
+    def release(self, raw):
+        held = getattr(self._local, 'held', None)
+        if held is None or held.raw is not raw:
+            # Released from another thread; nothing of ours to keep
+            return
+
+        held.depth -= 1
+        if held.depth == 0:
+            try:
+                raw.rollback()
+            except Exception:
+                pass
+            held.returned_at = time.time()
+            self._track(in_use_delta=-1)
+
+    def _track(self, open_delta=0, in_use_delta=0):
+        with self._stats_lock:
+            self._open += open_delta
+            self._in_use += in_use_delta
+
+    def _usage(self):
+        with self._stats_lock:
+            return {'max_size': None, 'open': self._open, 'in_use': self._in_use,
+                    'idle': self._open - self._in_use}
+
+
+def request_connection(pool, key='db_connection'):
+    """
+    The connection of the current Flask request, checked out on first use,
+    or None outside a request
+    """
+    from flask import g, has_app_context
+
+    if not has_app_context():
+        return None
+
+    handle = g.get(key)
+    if handle is None:
+        handle = pool.connect(scoped=True)
+        setattr(g, key, handle)
+    return handle
+
+
+def release_request_connection(pool, key='db_connection'):
+    """Flask teardown: give the request's connection back to the pool"""
+    from flask import g
+
+    handle = g.pop(key, None)
+    if handle is not None:
+        pool.release(handle._raw)
@@ -0,0 +1,315 @@
+"""
+Named queries for both database backends
+
+Every query the app runs is registered here once, by name, in portable
+SQL with ? placeholders. The SQLite and PostgreSQL texts are generated at
+registration (or given explicitly where the dialects differ), so call
+sites no longer branch on IN_PRODUCTION:
+
+    rows = queries.fetch_all('faqs.page', (limit,))
+    queries.execute('faqs.delete', (faq_id,))
+
+On PostgreSQL each query is PREPAREd once per connection and run with
+EXECUTE, so the server parses and plans it once. SQLite gets the same SQL
+text on every call, which sqlite3's per-connection statement cache reuses.
+
+Set DB_PREPARED_STATEMENTS=0 behind a transaction-mode pooler (pgbouncer,
+Supabase/Neon pooled URLs), which does not keep prepared statements.
+"""
+
+import os
+import re
+import json
+import threading
+import weakref
+
+PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', '1') != '0'
+
+_PLACEHOLDER = re.compile(r'\?')
+
+
+class NamedQuery:
+    """One query and its SQL per dialect"""
+
+    def __init__(self, name, sql, postgresql=None, sqlite=None, returning=None):
+        self.name = name
+        self.sqlite = sqlite or sql
+        portable = postgresql or sql
+        if returning:
+            portable += f" RETURNING {returning}"
+        self.returning = returning
+        self.params = len(_PLACEHOLDER.findall(portable))
+        # psycopg2 formats %s client-side; a literal % has to be doubled
+        self.postgresql = _PLACEHOLDER.sub('%s', portable.replace('%', '%%'))
+        self.statement = 'nq_' + re.sub(r'\W', '_', name)
+        counter = iter(range(1, self.params + 1))
+        self.prepare = f"PREPARE {self.statement} AS " + _PLACEHOLDER.sub(lambda _: f"${next(counter)}", portable)
+        self.execute = f"EXECUTE {self.statement}" + (
+            f" ({', '.join(['%s'] * self.params)})" if self.params else '')
+        self.read_only = self.sqlite.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+QUERIES = {}
+
+# Prepared statement names per PostgreSQL connection
+_prepared = weakref.WeakKeyDictionary()
+_stats_lock = threading.Lock()
+_stats = {'executed': 0, 'prepared': 0}
+
+
+def register(name, sql, postgresql=None, sqlite=None, returning=None):
+    """Add a named query; sql uses ? placeholders (never inside string literals)"""
+    if name in QUERIES:
+        raise ValueError(f"Query {name} is already registered")
+    QUERIES[name] = NamedQuery(name, sql, postgresql=postgresql, sqlite=sqlite, returning=returning)
+
+
+def is_postgresql():
+    # Imported here: database.config itself runs queries from this module
+    from database.config import IN_PRODUCTION
+    return IN_PRODUCTION
+
+
+def array(values):
+    """A list parameter: a PostgreSQL array, or JSON for SQLite's json_each()"""
+    return list(values) if is_postgresql() else json.dumps(list(values))
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _run(cur, conn, query, params, many=False):
+    _count('executed')
+    if not is_postgresql():
+        return cur.executemany(query.sqlite, params) if many else cur.execute(query.sqlite, params)
+
+    raw = getattr(conn, '_raw', conn)
+    names = None
+    if PREPARED_STATEMENTS:
+        try:
+            names = _prepared.setdefault(raw, set())
+        except TypeError:
+            names = None
+
+    if names is None:
+        return cur.executemany(query.postgresql, params) if many else cur.execute(query.postgresql, params)
+
+    if query.statement not in names:
+        cur.execute(query.prepare)
+        names.add(query.statement)
+        _count('prepared')
+    return cur.executemany(query.execute, params) if many else cur.execute(query.execute, params)
+
+
+def _rows(cur):
+    columns = [column[0] for column in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+class _Connection:
+    """The caller's connection, or one checked out (and committed, closed) here"""
+
+    def __init__(self, query, conn):
+        self.query = query
+        self.conn = conn
+        self.owned = conn is None
+
+    def __enter__(self):
+        if self.owned:
+            from database.config import get_db_connection, get_read_connection
+            self.conn = get_read_connection() if self.query.read_only else get_db_connection()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.owned:
+            if exc_type is None and not self.query.read_only:
+                self.conn.commit()
+            self.conn.close()
+        return False
+
+
+def fetch_all(name, params=(), conn=None):
+    """All rows as dicts"""
+    query = QUERIES[name]
+    with _Connection(query, conn) as db:
+        cur = db.cursor()
+        _run(cur, db, query, params)
+        return _rows(cur)
+
+
+def fetch_one(name, params=(), conn=None):
+    """First row as a dict, or None"""
+    rows = fetch_all(name, params, conn)
+    return rows[0] if rows else None
+
+
+def fetch_value(name, params=(), conn=None, default=None):
+    """First column of the first row (default when there is none, or it is NULL)"""
+    query = QUERIES[name]
+    with _Connection(query, conn) as db:
+        cur = db.cursor()
+        _run(cur, db, query, params)
+        row = cur.fetchone()
+    return default if row is None or row[0] is None else row[0]
+
+
+def execute(name, params=(), conn=None):
+    """Run a write; commits unless conn is given. Returns the affected row count"""
+    query = QUERIES[name]
+    with _Connection(query, conn) as db:
+        cur = db.cursor()
+        _run(cur, db, query, params)
+        return cur.rowcount
+
+
+def insert(name, params=(), conn=None):
+    """Run an INSERT registered with returning='id'; returns the new id"""
+    query = QUERIES[name]
+    with _Connection(query, conn) as db:
+        cur = db.cursor()
+        _run(cur, db, query, params)
+        return cur.fetchone()[0] if is_postgresql() else cur.lastrowid
+
+
+def execute_many(name, rows, conn=None):
+    """Run a write once per row of parameters in one round of executemany()"""
+    query = QUERIES[name]
+    with _Connection(query, conn) as db:
+        cur = db.cursor()
+        _run(cur, db, query, rows, many=True)
+
+
+def query_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats.update({'registered': len(QUERIES), 'prepared_statements': PREPARED_STATEMENTS})
+    return stats
+
+
+# ===== FAQs =====
+# Named columns, never *: PostgreSQL's faqs also holds the search_vector
+# tsvector (migration 5), and adding a column under a prepared SELECT *
+# fails it with "cached plan must not change result type"
+FAQ_COLUMNS = "id, question, answer, category, created_at, updated_at"
+
+register('faqs.insert', "INSERT INTO faqs (question, answer, category) VALUES (?, ?, ?)", returning='id')
+register('faqs.all', f"SELECT {FAQ_COLUMNS} FROM faqs ORDER BY id")
+register('faqs.get', f"SELECT {FAQ_COLUMNS} FROM faqs WHERE id = ?")
+register('faqs.get_category', "SELECT id, category FROM faqs WHERE id = ?")
+register('faqs.id_by_question', "SELECT id FROM faqs WHERE question = ?")
+register('faqs.update', """
+    UPDATE faqs SET question = COALESCE(?, question), answer = COALESCE(?, answer),
+        category = COALESCE(?, category), updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+""")
+register('faqs.update_answer', "UPDATE faqs SET answer = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?")
+register('faqs.delete', "DELETE FROM faqs WHERE id = ?")
+register('faqs.count', "SELECT COUNT(*) as count FROM faqs")
+register('faqs.count.category', "SELECT COUNT(*) as count FROM faqs WHERE category = ?")
+register('faqs.categories', "SELECT DISTINCT category FROM faqs ORDER BY category")
+register('faqs.category_counts', """
+    SELECT category, COUNT(*) as count FROM faqs GROUP BY category ORDER BY count DESC
+""")
+register('faqs.random_questions', "SELECT question FROM faqs ORDER BY RANDOM() LIMIT ?")
+register('faqs.page', f"SELECT {FAQ_COLUMNS} FROM faqs ORDER BY id DESC LIMIT ?")
+register('faqs.page.after', f"SELECT {FAQ_COLUMNS} FROM faqs WHERE id < ? ORDER BY id DESC LIMIT ?")
+register('faqs.page.category', f"SELECT {FAQ_COLUMNS} FROM faqs WHERE category = ? ORDER BY id DESC LIMIT ?")
+register('faqs.page.category.after',
+         f"SELECT {FAQ_COLUMNS} FROM faqs WHERE category = ? AND id < ? ORDER BY id DESC LIMIT ?")
+# Index rows, optionally only some categories (and/or the uncategorized ones)
+register('faqs.index_rows', "SELECT id, question, answer, category FROM faqs")
+register('faqs.index_rows.categories',
+         "SELECT id, question, answer, category FROM faqs "
+         "WHERE category = ANY(?) OR (? AND (category IS NULL OR category = ''))",
+         sqlite="SELECT id, question, answer, category FROM faqs "
+                "WHERE category IN (SELECT value FROM json_each(?)) OR (? AND (category IS NULL OR category = ''))")
+
+# ===== Unknown questions =====
+register('unknown.insert', "INSERT INTO unknown_questions (question, session_id) VALUES (?, ?)", returning='id')
+register('unknown.get', "SELECT * FROM unknown_questions WHERE id = ?")
+register('unknown.by_status', "SELECT * FROM unknown_questions WHERE answered = ? ORDER BY asked_at DESC")
+register('unknown.mark_answered', "UPDATE unknown_questions SET answered = TRUE WHERE id = ?")
+register('unknown.count.unanswered', "SELECT COUNT(*) as count FROM unknown_questions WHERE answered = FALSE")
+register('unknown.count', "SELECT COUNT(*) as count FROM unknown_questions")
+register('unknown.count.by_status', "SELECT COUNT(*) as count FROM unknown_questions WHERE answered = ?")
+register('unknown.page', "SELECT * FROM unknown_questions ORDER BY asked_at DESC, id DESC LIMIT ?")
+register('unknown.page.after', """
+    SELECT * FROM unknown_questions WHERE (asked_at, id) < (?, ?)
+    ORDER BY asked_at DESC, id DESC LIMIT ?
+""")
+register('unknown.page.by_status', """
+    SELECT * FROM unknown_questions WHERE answered = ?
+    ORDER BY asked_at DESC, id DESC LIMIT ?
+""")
+register('unknown.page.by_status.after', """
+    SELECT * FROM unknown_questions WHERE answered = ? AND (asked_at, id) < (?, ?)
+    ORDER BY asked_at DESC, id DESC LIMIT ?
+""")
+register('unknown.most_common', """
+    SELECT question, COUNT(*) as frequency FROM unknown_questions
+    GROUP BY question ORDER BY frequency DESC LIMIT 10
+""")
+
+# ===== Chat history =====
+register('chat.insert', """
+    INSERT INTO chat_history (session_id, user_message, bot_response, timestamp) VALUES (?, ?, ?, ?)
+""")
+register('chat.session', "SELECT * FROM chat_history WHERE session_id = ? ORDER BY timestamp DESC LIMIT ?")
+register('chat.clear_session', "DELETE FROM chat_history WHERE session_id = ?")
+register('chat.top_messages', """
+    SELECT user_message, COUNT(*) as count FROM chat_history
+    GROUP BY user_message ORDER BY COUNT(*) DESC LIMIT ?
+""")
+
+# ===== Daily rollups (see database/rollups.py) =====
+register('rollups.increment', """
+    INSERT INTO daily_stats (day, metric, dimension, count) VALUES (?, ?, ?, ?)
+    ON CONFLICT (day, metric, dimension) DO UPDATE SET count = daily_stats.count + excluded.count
+""")
+register('rollups.total', "SELECT SUM(count) as count FROM daily_stats WHERE metric = ?")
+register('rollups.on_day', "SELECT count FROM daily_stats WHERE day = ? AND metric = ? AND dimension = ''")
+register('rollups.daily_since', """
+    SELECT day as date, count FROM daily_stats WHERE metric = ? AND day >= ? ORDER BY day
+""")
+register('rollups.breakdown_since', """
+    SELECT metric, dimension, SUM(count) as count FROM daily_stats
+    WHERE metric IN ('match_type', 'category') AND day >= ?
+    GROUP BY metric, dimension ORDER BY count DESC
+""")
+
+# ===== Learned paraphrases (see nlp/paraphrases.py) =====
+register('paraphrases.expire', None,
+         postgresql="DELETE FROM paraphrases WHERE last_used < NOW() - ? * INTERVAL '1 day'",
+         sqlite="DELETE FROM paraphrases WHERE last_used < datetime('now', '-' || ? || ' days')")
+register('paraphrases.recent', """
+    SELECT question_hash, faq_id, confidence, source FROM paraphrases ORDER BY last_used DESC LIMIT ?
+""")
+register('paraphrases.touch', """
+    UPDATE paraphrases SET hits = hits + ?, last_used = CURRENT_TIMESTAMP WHERE question_hash = ?
+""")
+register('paraphrases.upsert', """
+    INSERT INTO paraphrases (question_hash, question, faq_id, confidence, source) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (question_hash) DO UPDATE SET question = excluded.question,
+        faq_id = excluded.faq_id, confidence = excluded.confidence, source = excluded.source,
+        last_used = CURRENT_TIMESTAMP
+    WHERE excluded.source = 'admin' OR paraphrases.source <> 'admin'
+""")
+register('paraphrases.delete', "DELETE FROM paraphrases WHERE question_hash = ?")
+register('paraphrases.delete_faq', "DELETE FROM paraphrases WHERE faq_id = ?")
+register('paraphrases.delete_faq_learned', "DELETE FROM paraphrases WHERE faq_id = ? AND source <> 'admin'")
+
+# ===== Popular questions (see nlp/popular.py) =====
+register('popular.top', "SELECT question_key, question, count FROM popular_questions ORDER BY count DESC LIMIT ?")
+register('popular.add', """
+    INSERT INTO popular_questions (question_key, question, count) VALUES (?, ?, ?)
+    ON CONFLICT (question_key) DO UPDATE SET count = popular_questions.count + excluded.count
+""")
+register('popular.trim', """
+    DELETE FROM popular_questions WHERE question_key NOT IN
+        (SELECT question_key FROM popular_questions ORDER BY count DESC LIMIT ?)
+""")
+
+# ===== Health =====
+register('health.ping', "SELECT 1")
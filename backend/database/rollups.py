@@ -0,0 +1,69 @@
+"""
+Daily rollups for the dashboard
+
+daily_stats holds one counter per (day, metric, dimension), incremented in
+the same transaction as the rows it counts, so the dashboard reads a few
+rows per day instead of scanning chat_history and unknown_questions.
+
+Metrics:
+    chats      - chat_history rows                 (dimension '')
+    unknowns   - unknown_questions rows            (dimension '')
+    match_type - chats by response match_type      (dimension: exact, similar, ...)
+    category   - matched chats by FAQ category     (dimension: category)
+
+Days are UTC 'YYYY-MM-DD', the same clock as the stored timestamps.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+from database import queries
+
+
+def today():
+    return datetime.utcnow().date().isoformat()
+
+
+def days_ago(days):
+    return (datetime.utcnow().date() - timedelta(days=days)).isoformat()
+
+
+def chat_counts(rows):
+    """
+    Counters for a batch of chat log rows
+
+    Args:
+        rows: (session_id, user_message, bot_response, timestamp, match_type, category)
+    """
+    counts = Counter()
+    for row in rows:
+        day = row[3][:10]
+        match_type, category = row[4], row[5]
+        counts[(day, 'chats', '')] += 1
+        if match_type:
+            counts[(day, 'match_type', match_type)] += 1
+        if category:
+            counts[(day, 'category', category)] += 1
+    return counts
+
+
+def increment(conn, counts):
+    """Add counts to daily_stats on an open connection; the caller commits"""
+    if counts:
+        queries.execute_many(
+            'rollups.increment',
+            [(day, metric, dimension, count) for (day, metric, dimension), count in counts.items()],
+            conn
+        )
+
+
+def fill_days(rows, start_day, end_day):
+    """[{date, count}] for every day in the range, zero where rows has none"""
+    counts = {row['date']: row['count'] for row in rows}
+    day = datetime.strptime(start_day, '%Y-%m-%d').date()
+    end = datetime.strptime(end_day, '%Y-%m-%d').date()
+    filled = []
+    while day <= end:
+        filled.append({'date': day.isoformat(), 'count': counts.get(day.isoformat(), 0)})
+        day += timedelta(days=1)
+    return filled
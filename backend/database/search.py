@@ -0,0 +1,96 @@
+"""
+Ranked full-text search over FAQs
+
+SQLite searches the faqs_fts FTS5 table and ranks with bm25(); PostgreSQL
+matches the weighted faqs.search_vector through its GIN index and ranks
+with ts_rank_cd(). Both return `rank` where lower is better, so results
+page the same way on either backend: ORDER BY rank, id with a keyset
+cursor on (rank, id).
+
+Each word of the query must match, as a prefix, so partial words typed
+into the admin search box already find results.
+"""
+
+import re
+
+from database import queries
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+# Relative weight of a match in the question vs the answer (SQLite bm25)
+QUESTION_WEIGHT = 4.0
+ANSWER_WEIGHT = 1.0
+
+_PG_PAGE = """
+    SELECT * FROM (
+        SELECT f.id, f.question, f.answer, f.category, f.created_at, f.updated_at,
+               -ts_rank_cd(f.search_vector, q) AS rank
+        FROM faqs f, to_tsquery('english', ?) q
+        WHERE f.search_vector @@ q {category}
+    ) ranked {after}
+    ORDER BY rank, id LIMIT ?
+"""
+_SQLITE_PAGE = f"""
+    SELECT * FROM (
+        SELECT faqs.id, faqs.question, faqs.answer, faqs.category, faqs.created_at, faqs.updated_at,
+               bm25(faqs_fts, {QUESTION_WEIGHT}, {ANSWER_WEIGHT}) AS rank
+        FROM faqs_fts JOIN faqs ON faqs.id = faqs_fts.rowid
+        WHERE faqs_fts MATCH ? {{category}}
+    ) {{after}}
+    ORDER BY rank, id LIMIT ?
+"""
+
+# One named query per filter combination: search.page[.category][.after]
+for _category in (False, True):
+    for _after in (False, True):
+        queries.register(
+            'search.page' + ('.category' if _category else '') + ('.after' if _after else ''), None,
+            postgresql=_PG_PAGE.format(category='AND f.category = ?' if _category else '',
+                                       after='WHERE (rank, id) > (?, ?)' if _after else ''),
+            sqlite=_SQLITE_PAGE.format(category='AND faqs.category = ?' if _category else '',
+                                       after='WHERE (rank, id) > (?, ?)' if _after else ''))
+
+
+def search_terms(text):
+    """Words of a search string; everything else is dropped"""
+    return _WORD.findall(text.lower())
+
+
+def fts5_query(terms, question_only=False):
+    """MATCH expression: every term as a quoted prefix, optionally in the question column"""
+    expression = ' '.join(f'"{term}"*' for term in terms)
+    return f'question : ({expression})' if question_only else expression
+
+
+def tsquery(terms, question_only=False):
+    """to_tsquery() input: every term as a prefix, optionally only in the question (weight A)"""
+    suffix = ':*A' if question_only else ':*'
+    return ' & '.join(f'{term}{suffix}' for term in terms)
+
+
+def search_faqs(text, category=None, limit=20, after=None, question_only=False):
+    """
+    FAQs matching every word of text, best first
+
+    Args:
+        text: Search string as typed
+        category: Only FAQs in this category
+        limit: Rows to return
+        after: (rank, id) of the last row of the previous page
+        question_only: Match the question, not the answer
+
+    Returns:
+        List of FAQ dicts, each with its `rank`
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    name = 'search.page' + ('.category' if category else '') + ('.after' if after else '')
+    params = [tsquery(terms, question_only) if queries.is_postgresql() else fts5_query(terms, question_only)]
+    if category:
+        params.append(category)
+    if after:
+        params.extend(after)
+    params.append(limit)
+    return queries.fetch_all(name, params)
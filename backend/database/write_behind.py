@@ -0,0 +1,134 @@
+"""
+Write-behind queue for log-style inserts
+
+Requests enqueue rows and return; a background thread writes them with
+executemany() once a batch is full or its oldest row is old enough, so
+many requests share one commit (on SQLite, one fsync) and none of them
+waits on the database. Rows still queued at exit are flushed.
+"""
+
+import time
+import queue
+import atexit
+import threading
+
+# Longest the worker waits on an empty queue before checking for close()
+STOP_POLL_SECONDS = 0.5
+
+
+class WriteBehindQueue:
+    def __init__(self, name, write_rows, batch_size=50, max_age=1.0, max_queue=10000, drop='newest'):
+        """
+        Args:
+            name: Used in log messages
+            write_rows: Function that inserts (and commits) a list of row tuples
+            batch_size: Rows per executemany()
+            max_age: Seconds a row may wait before a partial batch is written
+            max_queue: Rows held before the drop policy applies
+            drop: 'newest' rejects new rows when full, 'oldest' evicts the oldest
+        """
+        self.name = name
+        self.write_rows = write_rows
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.drop = drop
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0,
+            'batches': 0, 'write_ms': 0.0, 'last_batch_size': 0
+        }
+        self._worker = threading.Thread(target=self._run, name=f'write-behind-{name}', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def put(self, row):
+        """Queue one row; never blocks the caller"""
+        try:
+            self._queue.put_nowait((time.monotonic(), row))
+        except queue.Full:
+            if self.drop != 'oldest':
+                self._count('dropped')
+                return False
+            try:
+                self._queue.get_nowait()
+                self._count('dropped')
+                self._queue.put_nowait((time.monotonic(), row))
+            except (queue.Empty, queue.Full):
+                self._count('dropped')
+                return False
+
+        self._count('enqueued')
+        return True
+
+    def _run(self):
+        batch = []
+        oldest = None
+        while not self._stop.is_set():
+            timeout = self.max_age if oldest is None else max(0.0, oldest + self.max_age - time.monotonic())
+            # Wake up now and then so close() is noticed while idle
+            timeout = min(timeout, STOP_POLL_SECONDS)
+            try:
+                queued_at, row = self._queue.get(timeout=timeout)
+                batch.append(row)
+                oldest = queued_at if oldest is None else oldest
+            except queue.Empty:
+                pass
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() - oldest >= self.max_age):
+                self._flush(batch)
+                batch = []
+                oldest = None
+
+        # Stopping: drain whatever is left in full batches
+        while True:
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait()[1])
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch)
+            batch = []
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            self.write_rows(batch)
+            self._count('written', len(batch))
+        except Exception as e:
+            self._count('failed', len(batch))
+            print(f"⚠️ Could not write {len(batch)} {self.name} rows: {e}")
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['write_ms'] += (time.perf_counter() - started) * 1000
+            self._stats['last_batch_size'] = len(batch)
+
+    def close(self, timeout=5.0):
+        """Write out everything still queued, then stop the worker"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            print(f"⚠️ {self.name} writer still busy after {timeout}s, {self._queue.qsize()} rows unwritten")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats.pop('batches')
+        write_ms = stats.pop('write_ms')
+        stats.update({
+            'queued': self._queue.qsize(),
+            'batches': batches,
+            'avg_batch_size': round(stats['written'] / batches, 1) if batches else 0.0,
+            'avg_write_ms': round(write_ms / batches, 3) if batches else 0.0
+        })
+        return stats
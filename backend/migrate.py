@@ -0,0 +1,32 @@
+"""
+Create the tables and apply pending schema migrations
+
+Starting the app only creates the schema when no version is recorded;
+run this after adding a migration or pointing DATABASE_URL at a
+database whose schema is behind.
+
+Usage (from backend/):
+    python migrate.py           # migrate
+    python migrate.py --status  # show the applied and latest versions
+"""
+
+import sys
+
+from database.config import init_database, schema_version
+from database.migrations import LATEST_VERSION
+
+
+def migrate():
+    """Run init_database() unconditionally"""
+    before = schema_version()
+    init_database()
+    print(f"🗄️ Schema version {before} -> {schema_version()} (latest {LATEST_VERSION})")
+
+
+if __name__ == "__main__":
+    if '--status' in sys.argv:
+        version = schema_version()
+        state = 'up to date' if version >= LATEST_VERSION else 'migration needed'
+        print(f"🗄️ Schema version {version} of {LATEST_VERSION}: {state}")
+    else:
+        migrate()
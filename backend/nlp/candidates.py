@@ -0,0 +1,84 @@
+"""
+Cheap first-stage candidate generation from posting lists
+
+Each preprocessed FAQ token maps to the sorted array of FAQs containing it.
+A query only touches the posting lists of its own tokens, so finding the
+FAQs worth re-ranking costs nothing like a full scan of the corpus.
+"""
+
+import numpy as np
+
+
+class CandidateIndex:
+    def __init__(self):
+        """Initialize an empty candidate index"""
+        self.n_docs = 0
+        self.postings = {}   # token -> int32 array of FAQ positions
+        self.idf = {}        # token -> log(N / df), favours rare shared words
+
+    @classmethod
+    def from_processed(cls, processed_docs):
+        """
+        Build posting lists from preprocessed FAQ questions
+
+        Args:
+            processed_docs: Output of preprocessor.process_batch
+        """
+        index = cls()
+        index.n_docs = len(processed_docs)
+
+        lists = {}
+        for position, doc in enumerate(processed_docs):
+            for token in set(doc.split()):
+                lists.setdefault(token, []).append(position)
+
+        for token, positions in lists.items():
+            index.postings[token] = np.array(positions, dtype=np.int32)
+            index.idf[token] = float(np.log(index.n_docs / len(positions))) + 1.0
+
+        return index
+
+    def extended(self, processed_docs):
+        """A new index with more documents appended after the existing ones"""
+        return self.merged(CandidateIndex.from_processed(processed_docs))
+
+    def merged(self, other):
+        """A new index holding this index's documents followed by other's"""
+        index = CandidateIndex()
+        index.n_docs = self.n_docs + other.n_docs
+
+        empty = np.empty(0, dtype=np.int32)
+        for token in set(self.postings) | set(other.postings):
+            positions = np.concatenate([
+                self.postings.get(token, empty),
+                other.postings.get(token, empty) + np.int32(self.n_docs)
+            ])
+            index.postings[token] = positions
+            index.idf[token] = float(np.log(index.n_docs / len(positions))) + 1.0
+
+        return index
+
+    def lookup(self, processed_query, limit=50):
+        """
+        Find the FAQs sharing the most (rare) tokens with the query
+
+        Returns:
+            int array of at most `limit` FAQ positions, unordered
+        """
+        tokens = [token for token in set(processed_query.split()) if token in self.postings]
+        if not tokens:
+            return np.empty(0, dtype=np.int32)
+
+        lists = [self.postings[token] for token in tokens]
+        if len(lists) == 1:
+            positions = lists[0]
+            return positions if len(positions) <= limit else positions[:limit]
+
+        weights = np.repeat([self.idf[token] for token in tokens], [len(p) for p in lists])
+        positions, inverse = np.unique(np.concatenate(lists), return_inverse=True)
+
+        if len(positions) <= limit:
+            return positions
+
+        overlap = np.bincount(inverse, weights=weights)
+        return positions[np.argpartition(-overlap, limit)[:limit]]
@@ -0,0 +1,215 @@
+"""
+Compact in-memory FAQ storage and match results
+
+FAQStore keeps FAQs column by column: ids in an int array, categories as
+codes into a small table, questions as plain strings (every fallback scan
+reads them), and all answers in one UTF-8 buffer indexed by offset. An
+answer is only decoded for the FAQ that is actually returned.
+
+MatchResult replaces the dict copy the matcher used to make of the
+winning FAQ; it still supports match['answer'] and match.get('matched_by')
+so API code does not need to change.
+"""
+
+import numpy as np
+
+
+class FAQStore:
+    """Columnar, read-only FAQ records (one shard's worth)"""
+
+    def __init__(self, ids, questions, category_names, category_codes, answers, answer_offsets):
+        self.ids = ids                          # int64 array
+        self.questions = questions              # list of str
+        self.category_names = category_names    # tuple of distinct categories
+        self.category_codes = category_codes    # int32 array into category_names
+        self._answers = answers                 # all answers, UTF-8 encoded
+        self._answer_offsets = answer_offsets   # int64 array, len(ids) + 1
+        self._positions = None                  # id -> position, built on first use
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a store from FAQ dicts (id, question, answer, category)"""
+        names = {}
+        codes = []
+        encoded = []
+        for row in rows:
+            codes.append(names.setdefault(row.get('category'), len(names)))
+            encoded.append(row['answer'].encode('utf-8'))
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(answer) for answer in encoded], out=offsets[1:])
+
+        return cls(
+            ids=np.array([row['id'] for row in rows], dtype=np.int64),
+            questions=[row['question'] for row in rows],
+            category_names=tuple(names),
+            category_codes=np.array(codes, dtype=np.int32),
+            answers=b''.join(encoded),
+            answer_offsets=offsets
+        )
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __add__(self, other):
+        """A new store with other's FAQs (a store or a list of dicts) after these"""
+        return FAQStore.from_rows(self.rows() + (other.rows() if isinstance(other, FAQStore) else list(other)))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_positions'] = None
+        return state
+
+    def faq_id(self, position):
+        return int(self.ids[position])
+
+    def question(self, position):
+        return self.questions[position]
+
+    def category(self, position):
+        return self.category_names[self.category_codes[position]]
+
+    def answer(self, position):
+        """Decode one answer from the shared buffer"""
+        start, end = self._answer_offsets[position], self._answer_offsets[position + 1]
+        return self._answers[start:end].decode('utf-8')
+
+    def position(self, faq_id):
+        """Position of an FAQ id, or None"""
+        if self._positions is None:
+            self._positions = {int(faq_id): i for i, faq_id in enumerate(self.ids)}
+        return self._positions.get(faq_id)
+
+    def record(self, position):
+        """One FAQ as a plain dict"""
+        return {
+            'id': self.faq_id(position),
+            'question': self.question(position),
+            'answer': self.answer(position),
+            'category': self.category(position)
+        }
+
+    def rows(self):
+        """All FAQs as plain dicts, e.g. to rebuild an index from"""
+        return [self.record(i) for i in range(len(self))]
+
+
+class FAQView:
+    """
+    Several stores (one per shard) addressed as one sequence
+
+    Positions run through the stores in order, so a shard's local position
+    plus its offset is its position here. Nothing is copied.
+    """
+
+    def __init__(self, stores=()):
+        self.stores = list(stores)
+        self.starts = np.cumsum([0] + [len(store) for store in self.stores])
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def _locate(self, position):
+        if len(self.stores) == 1:
+            return self.stores[0], position
+        part = int(np.searchsorted(self.starts, position, side='right')) - 1
+        return self.stores[part], position - int(self.starts[part])
+
+    def faq_id(self, position):
+        store, local = self._locate(position)
+        return store.faq_id(local)
+
+    def question(self, position):
+        store, local = self._locate(position)
+        return store.question(local)
+
+    def category(self, position):
+        store, local = self._locate(position)
+        return store.category(local)
+
+    def answer(self, position):
+        store, local = self._locate(position)
+        return store.answer(local)
+
+    def record(self, position):
+        store, local = self._locate(position)
+        return store.record(local)
+
+    def position(self, faq_id):
+        """Position of an FAQ id, or None"""
+        for start, store in zip(self.starts, self.stores):
+            local = store.position(faq_id)
+            if local is not None:
+                return int(start) + local
+        return None
+
+    def questions(self):
+        """(position, question) for every FAQ"""
+        for start, store in zip(self.starts, self.stores):
+            for local, question in enumerate(store.questions):
+                yield int(start) + local, question
+
+    def rows(self):
+        return [row for store in self.stores for row in store.rows()]
+
+
+class MatchResult:
+    """
+    A matched FAQ plus how it was matched
+
+    The answer is read from the store only when first asked for. Supports
+    the dict-style access (match['answer'], match.get(...)) callers use.
+    """
+
+    __slots__ = ('id', 'question', 'category', 'confidence', 'match_type', 'matched_by',
+                 'all_matches', '_store', '_position', '_answer')
+
+    FIELDS = ('id', 'question', 'answer', 'category', 'confidence', 'match_type', 'matched_by', 'all_matches')
+
+    def __init__(self, store, position, confidence, match_type=None, matched_by=None, all_matches=None):
+        self.id = store.faq_id(position)
+        self.question = store.question(position)
+        self.category = store.category(position)
+        self.confidence = confidence
+        self.match_type = match_type
+        self.matched_by = matched_by
+        self.all_matches = all_matches
+        self._store = store
+        self._position = position
+        self._answer = None
+
+    @property
+    def answer(self):
+        if self._answer is None:
+            self._answer = self._store.answer(self._position)
+        return self._answer
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key in ('match_type', 'matched_by', 'all_matches'):
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS or key == 'answer':
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """Plain dict with only the fields that are set"""
+        return {key: self[key] for key in self.FIELDS if key in self}
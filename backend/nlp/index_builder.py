@@ -0,0 +1,382 @@
+"""
+Index builder - turns FAQ rows into a searchable snapshot
+
+A rebuild (preprocessing + TF-IDF fitting) holds the GIL for most of its
+run, so the matcher can ask for it to happen in a child process. The child
+writes the finished snapshot to a temp file and the serving process simply
+attaches it.
+
+With MATCHER_SHARDING=category the index is partitioned into one shard per
+FAQ category, each fitted on its own, so editing a Fees FAQ only rebuilds
+the Fees shard. The default ('none') keeps a single shard holding every FAQ.
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp.preprocess import preprocessor
+from nlp.spelling import SpellingIndex
+from nlp.candidates import CandidateIndex
+from nlp.router import ShardRouter
+from nlp.faq_store import FAQStore, FAQView
+from nlp.neighbors import NeighborGraph
+from nlp.scoring import create_scorer, create_semantic_scorer, TfidfCosineScorer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds to wait for a child build before giving up on it
+REBUILD_TIMEOUT = int(os.environ.get('INDEX_REBUILD_TIMEOUT', 120))
+
+SHARDING = os.environ.get('MATCHER_SHARDING', 'none').lower()
+ALL_FAQS_SHARD = '*'
+UNCATEGORIZED = 'Uncategorized'
+
+# Shards smaller than this skip the LSA scorer; there is nothing to factorise
+MIN_SEMANTIC_DOCS = 3
+
+
+def shard_key(faq):
+    """Name of the shard an FAQ belongs to"""
+    if SHARDING != 'category':
+        return ALL_FAQS_SHARD
+    return faq.get('category') or UNCATEGORIZED
+
+
+class IndexShard:
+    """One independently built slice of the index"""
+
+    def __init__(self, key, faqs, scorer, semantic=None, candidates=None, neighbors=None,
+                 built_at=None, build_seconds=0.0):
+        self.key = key
+        self.faqs = faqs    # FAQStore
+        self.scorer = scorer
+        self.semantic = semantic
+        self.candidates = candidates
+        self.neighbors = neighbors    # NeighborGraph over this shard's FAQs
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+
+class IndexSnapshot:
+    """Everything the matcher needs to answer a query, built in one go"""
+
+    def __init__(self, shards=None, speller=None, router=None, version=0,
+                 built_at=None, build_seconds=0.0):
+        self.shards = shards or {}
+        self.speller = speller
+        self.router = router
+        self.version = version
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+        # All FAQs, shard after shard, without copying the shards' stores.
+        # Shards are shared between snapshots, so each snapshot keeps its
+        # own shard_key -> first position table
+        self.faqs = FAQView(shard.faqs for shard in self.shards.values())
+        self.offsets = {}
+        for key, start in zip(self.shards, self.faqs.starts):
+            self.offsets[key] = int(start)
+
+    def _single_shard(self):
+        return next(iter(self.shards.values())) if len(self.shards) == 1 else None
+
+    @property
+    def engine(self):
+        shard = next(iter(self.shards.values()), None)
+        return shard.scorer.name if shard else None
+
+    @property
+    def vectorizer(self):
+        shard = self._single_shard()
+        return shard.scorer.vectorizer if shard else None
+
+    @property
+    def faq_vectors(self):
+        shard = self._single_shard()
+        return shard.scorer.matrix if shard else None
+
+    @property
+    def is_fitted(self):
+        return len(self.faqs) > 0
+
+    def locate(self, position):
+        """(shard, local position) of a position in self.faqs"""
+        part = int(np.searchsorted(self.faqs.starts, position, side='right')) - 1
+        shard = list(self.shards.values())[part]
+        return shard, position - self.offsets[shard.key]
+
+    def route(self, processed_query):
+        """Shards worth searching for a query (all of them when unsure)"""
+        keys = self.router.route(processed_query) if self.router else None
+        if keys is None:
+            return list(self.shards.values())
+        return [self.shards[key] for key in keys]
+
+
+def fetch_faq_rows(shard_keys=None):
+    """
+    Load raw FAQ rows from the database
+
+    Args:
+        shard_keys: Only load the FAQs of these category shards
+    """
+    from database import queries
+
+    if shard_keys is None or ALL_FAQS_SHARD in shard_keys:
+        return queries.fetch_all('faqs.index_rows')
+
+    names = list(shard_keys)
+    return queries.fetch_all('faqs.index_rows.categories', (queries.array(names), UNCATEGORIZED in names))
+
+
+def build_shard(key, faqs, engine=None):
+    """
+    Fit one shard on its own FAQs
+
+    Args:
+        key: Shard key
+        faqs: The shard's FAQ dicts (must not be empty)
+        engine: Scoring engine name, MATCHER_ENGINE when None
+
+    Returns:
+        IndexShard
+    """
+    start = time.perf_counter()
+
+    # Preprocess all questions
+    questions = [faq['question'] for faq in faqs]
+    processed_questions = preprocessor.process_batch(questions)
+
+    # Fit the scoring engine (TF-IDF vectors by default)
+    scorer = create_scorer(engine).fit(processed_questions)
+
+    # Optional latent semantic scorer, sharing the TF-IDF fit when there is one
+    semantic = create_semantic_scorer() if len(faqs) >= MIN_SEMANTIC_DOCS else None
+    if semantic is not None:
+        if isinstance(scorer, TfidfCosineScorer):
+            semantic.fit(processed_questions, scorer.vectorizer, scorer.matrix)
+        else:
+            semantic.fit(processed_questions)
+
+    # Posting lists for first-stage candidate generation
+    candidates = CandidateIndex.from_processed(processed_questions)
+
+    # Each FAQ's most similar FAQs, for related-question suggestions
+    neighbors = NeighborGraph.from_matrix(scorer.embeddings if engine == 'lsa' else scorer.matrix)
+
+    return IndexShard(
+        key=key,
+        faqs=FAQStore.from_rows(faqs),
+        scorer=scorer,
+        semantic=semantic,
+        candidates=candidates,
+        neighbors=neighbors,
+        built_at=datetime.now(),
+        build_seconds=time.perf_counter() - start
+    )
+
+
+def extend_shard(shard, new_faqs):
+    """
+    Append FAQs to a shard without refitting it
+
+    Returns:
+        A new IndexShard, or None when the shard's scorer needs a refit
+        (only the hashing engine can append, and LSA never can)
+    """
+    if not hasattr(shard.scorer, 'extended') or shard.semantic is not None:
+        return None
+
+    start = time.perf_counter()
+    processed_questions = preprocessor.process_batch([faq['question'] for faq in new_faqs])
+    scorer = shard.scorer.extended(processed_questions)
+    new_rows = range(len(shard.faqs), len(shard.faqs) + len(new_faqs))
+
+    return IndexShard(
+        key=shard.key,
+        faqs=shard.faqs + new_faqs,
+        scorer=scorer,
+        candidates=shard.candidates.extended(processed_questions),
+        neighbors=shard.neighbors.updated(scorer.matrix, new_rows),
+        built_at=datetime.now(),
+        build_seconds=time.perf_counter() - start
+    )
+
+
+def merge_shards(first, second):
+    """
+    Combine two separately built shards (e.g. from different workers)
+
+    Raises:
+        ValueError: If the shards' scorers cannot be merged without a refit
+    """
+    if not hasattr(first.scorer, 'merged') or first.semantic is not None or second.semantic is not None:
+        raise ValueError(f"Shards built with {first.scorer.name} cannot be merged without a refit")
+
+    start = time.perf_counter()
+    scorer = first.scorer.merged(second.scorer)
+
+    return IndexShard(
+        key=first.key,
+        faqs=first.faqs + second.faqs,
+        scorer=scorer,
+        candidates=first.candidates.merged(second.candidates),
+        neighbors=NeighborGraph.from_matrix(scorer.matrix),
+        built_at=datetime.now(),
+        build_seconds=time.perf_counter() - start
+    )
+
+
+def build_shards(faqs, engine=None):
+    """Group FAQs by shard key and build every shard"""
+    groups = {}
+    for faq in faqs:
+        groups.setdefault(shard_key(faq), []).append(faq)
+
+    return {key: build_shard(key, group, engine) for key, group in sorted(groups.items())}
+
+
+def compose_snapshot(shards, version=0, build_seconds=0.0):
+    """
+    Combine shards into a snapshot, building the corpus-wide parts
+
+    The spelling index and router are cheap compared to fitting a shard,
+    so they are simply rebuilt over all shards.
+    """
+    start = time.perf_counter()
+
+    shards = {key: shards[key] for key in sorted(shards)}
+    questions = [question for shard in shards.values() for question in shard.faqs.questions]
+
+    # Spelling index over the same questions, so it always matches the vocabulary
+    speller = SpellingIndex.from_texts(questions, extra_words=preprocessor.stop_words)
+    router = ShardRouter.from_shards(shards)
+
+    return IndexSnapshot(
+        shards=shards,
+        speller=speller,
+        router=router,
+        version=version,
+        built_at=datetime.now(),
+        build_seconds=build_seconds + time.perf_counter() - start
+    )
+
+
+def build_snapshot(faqs=None, version=0, engine=None):
+    """
+    Build a complete index snapshot
+
+    Args:
+        faqs: List of FAQ dicts, loaded from the database when None
+        version: Version number stamped on the snapshot
+        engine: Scoring engine name, MATCHER_ENGINE when None
+
+    Returns:
+        IndexSnapshot
+    """
+    start = time.perf_counter()
+
+    if faqs is None:
+        faqs = fetch_faq_rows()
+
+    shards = build_shards(faqs, engine)
+    return compose_snapshot(shards, version, time.perf_counter() - start)
+
+
+def build_shard_updates(shard_keys, engine=None):
+    """
+    Rebuild the given shards from the database
+
+    Returns:
+        dict of shard_key -> IndexShard, or None for shards that are now empty
+    """
+    shards = build_shards(fetch_faq_rows(shard_keys), engine)
+    return {key: shards.get(key) for key in shard_keys}
+
+
+def save_snapshot(snapshot, path):
+    """Write a snapshot to disk atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """Read a snapshot written by save_snapshot"""
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def build_in_subprocess(version=0, shard_keys=None, timeout=REBUILD_TIMEOUT):
+    """
+    Build a snapshot (or just some shards) in a child Python process
+
+    The child loads FAQs from the database itself, so nothing but the
+    temp file path crosses the process boundary.
+
+    Returns:
+        IndexSnapshot, or a build_shard_updates dict when shard_keys is given
+
+    Raises:
+        RuntimeError: If the child process fails
+    """
+    fd, path = tempfile.mkstemp(prefix='faq_index_', suffix='.pkl')
+    os.close(fd)
+
+    command = [sys.executable, '-m', 'nlp.index_builder', '--out', path, '--version', str(version)]
+    if shard_keys is not None:
+        command += ['--shards', *shard_keys]
+
+    try:
+        result = subprocess.run(
+            command,
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+
+        if result.returncode != 0:
+            raise RuntimeError(f"index build process exited with {result.returncode}: "
+                               f"{result.stderr.strip()[-500:]}")
+
+        return load_snapshot(path)
+
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Entry point for the child build process
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the FAQ index snapshot')
+    parser.add_argument('--out', required=True, help='Path to write the snapshot to')
+    parser.add_argument('--version', type=int, default=0, help='Version to stamp on the snapshot')
+    parser.add_argument('--shards', nargs='+', help='Only rebuild these shards')
+    args = parser.parse_args()
+
+    # Build through the importable module so the pickle references
+    # nlp.index_builder.IndexSnapshot rather than __main__.IndexSnapshot
+    from nlp import index_builder
+
+    if args.shards:
+        updates = index_builder.build_shard_updates(args.shards)
+        index_builder.save_snapshot(updates, args.out)
+        print(f"✅ Rebuilt shards {', '.join(args.shards)}")
+    else:
+        snapshot = index_builder.build_snapshot(version=args.version)
+        index_builder.save_snapshot(snapshot, args.out)
+        print(f"✅ Built index v{snapshot.version} with {len(snapshot.faqs)} FAQs "
+              f"in {snapshot.build_seconds:.2f}s")
@@ -0,0 +1,169 @@
+"""
+Minimal text vectorizer for the serving path
+
+Fitting needs scikit-learn, but turning one query into a vector only needs
+the fitted vocabulary, IDF weights and stop words. TextVectorizer exports
+those from a fitted TfidfVectorizer/CountVectorizer and reproduces its
+transform() with NumPy/SciPy, so a built index can be loaded and queried
+without importing sklearn at all.
+"""
+
+import re
+import zlib
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class TextVectorizer:
+    """
+    Drop-in replacement for a fitted sklearn vectorizer's transform()
+
+    Only the settings the matcher uses are supported: word analyzer,
+    lowercasing, the default token pattern, a stop-word list, n-grams,
+    and optionally sublinear tf, IDF weighting and L2 normalisation.
+    """
+
+    def __init__(self, vocabulary, idf=None, stop_words=(), ngram_range=(1, 1),
+                 token_pattern=r"(?u)\b\w\w+\b", lowercase=True, sublinear_tf=False, norm=None):
+        self.vocabulary = vocabulary          # term -> column
+        self.idf = idf                        # float64 array, or None for raw counts
+        self.stop_words = frozenset(stop_words)
+        self.ngram_range = tuple(ngram_range)
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self._compiled = re.compile(token_pattern)
+
+    @classmethod
+    def from_sklearn(cls, vectorizer):
+        """Export a fitted TfidfVectorizer or CountVectorizer"""
+        if vectorizer.analyzer != 'word' or vectorizer.preprocessor is not None \
+                or vectorizer.tokenizer is not None or vectorizer.strip_accents is not None:
+            raise ValueError("Only the default word analyzer can be exported")
+
+        idf = getattr(vectorizer, 'idf_', None) if getattr(vectorizer, 'use_idf', False) else None
+
+        return cls(
+            vocabulary={term: int(column) for term, column in vectorizer.vocabulary_.items()},
+            idf=None if idf is None else np.asarray(idf, dtype=np.float64),
+            stop_words=vectorizer.get_stop_words() or (),
+            ngram_range=vectorizer.ngram_range,
+            token_pattern=vectorizer.token_pattern,
+            lowercase=vectorizer.lowercase,
+            sublinear_tf=getattr(vectorizer, 'sublinear_tf', False),
+            norm=getattr(vectorizer, 'norm', None)
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_compiled']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compiled = re.compile(self.token_pattern)
+
+    @property
+    def n_features(self):
+        return len(self.vocabulary)
+
+    def column(self, term):
+        """Column of a term, or None when it is not in the vocabulary"""
+        return self.vocabulary.get(term)
+
+    def analyze(self, text):
+        """Terms of a document, in the same order sklearn's word analyzer yields them"""
+        if self.lowercase:
+            text = text.lower()
+
+        tokens = [token for token in self._compiled.findall(text) if token not in self.stop_words]
+
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            for i in range(len(tokens) - n + 1):
+                terms.append(' '.join(tokens[i:i + n]))
+        return terms
+
+    def transform_one(self, text):
+        """
+        Vectorize one document
+
+        Returns:
+            (columns, values): sorted int32 column indices and float64 weights
+        """
+        counts = {}
+        for term in self.analyze(text):
+            column = self.column(term)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        columns = np.fromiter(sorted(counts), dtype=np.int32, count=len(counts))
+        values = np.array([counts[column] for column in columns], dtype=np.float64)
+
+        if self.sublinear_tf:
+            values = np.log(values) + 1.0
+        if self.idf is not None:
+            values *= self.idf[columns]
+        if self.norm == 'l2':
+            values /= np.sqrt(np.dot(values, values))
+        elif self.norm == 'l1':
+            values /= np.abs(values).sum()
+
+        return columns, values
+
+    def transform(self, raw_documents):
+        """Vectorize documents into a CSR matrix, like sklearn's transform()"""
+        indptr = [0]
+        indices = []
+        data = []
+        for text in raw_documents:
+            columns, values = self.transform_one(text)
+            indices.append(columns)
+            data.append(values)
+            indptr.append(indptr[-1] + len(columns))
+
+        return csr_matrix(
+            (
+                np.concatenate(data) if data else np.empty(0),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                np.array(indptr, dtype=np.int32)
+            ),
+            shape=(len(indptr) - 1, self.n_features)
+        )
+
+
+class HashingTextVectorizer(TextVectorizer):
+    """
+    Vocabulary-free vectorizer: terms are hashed into a fixed feature space
+
+    crc32 is used instead of hash() so that every process (and every
+    worker) maps a term to the same column. There is nothing to fit, so
+    documents can be vectorized one at a time and their rows appended.
+    """
+
+    def __init__(self, n_features=2 ** 18, **kwargs):
+        super().__init__(vocabulary={}, **kwargs)
+        self.hash_features = n_features
+
+    @property
+    def n_features(self):
+        return self.hash_features
+
+    def column(self, term):
+        return zlib.crc32(term.encode('utf-8')) % self.hash_features
+
+    def compatible_with(self, other):
+        """Whether rows produced by the two vectorizers share one feature space"""
+        return (self.hash_features == other.hash_features
+                and self.stop_words == other.stop_words
+                and self.ngram_range == other.ngram_range
+                and self.token_pattern == other.token_pattern
+                and self.lowercase == other.lowercase)
@@ -4,19 +4,26 @@ Advanced FAQ matcher using TF-IDF and cosine similarity
 
 import sys
 import os
+import time
+import threading
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import json
-from datetime import datetime
 import string
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.config import get_db_connection
+from database import queries
 from nlp.preprocess import preprocessor
 from nlp.custom_mappings import get_custom_match
+from nlp.faq_store import MatchResult
+from nlp.paraphrases import ParaphraseTable, LEARN_CONFIDENCE
+from nlp.query_cache import QueryCache
+from nlp.negative_cache import NegativeCache
+from nlp.index_builder import (
+    IndexSnapshot, build_snapshot, build_shard, build_shard_updates, build_in_subprocess,
+    compose_snapshot, extend_shard, shard_key, load_snapshot, SHARDING
+)
 
 
 # ===== STANDALONE FUNCTIONS FOR GREETINGS =====
@@ -194,84 +201,400 @@ def handle_common_questions(user_question):
     return None
 
 
+def warmup_questions(n=None):
+    """
+    Sample questions for warm_up() from data/faqs.json: some FAQ questions,
+    a reworded copy of each, and one question nothing should match
+    """
+    n = n or int(os.environ.get('WARMUP_SAMPLES', 5))
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                        'data', 'faqs.json')
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            faqs = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read warmup questions: {e}")
+        faqs = []
+
+    step = max(1, len(faqs) // n) if faqs else 1
+    questions = []
+    for faq in faqs[::step][:n]:
+        questions.append(faq['question'])
+        words = faq['question'].lower().rstrip('?').split()
+        questions.append(' '.join(words[:-1] or words))
+    questions.append('qwxz plinth vorbel')
+    return questions
+
+
 # ===== FAQ MATCHER CLASS =====
 class FAQMatcher:
     def __init__(self):
         """Initialize the FAQ matcher with optimized parameters"""
-        self.vectorizer = TfidfVectorizer(
-            max_features=2000,
-            stop_words='english',
-            ngram_range=(1, 2),
-            min_df=1,
-            max_df=0.7,
-            sublinear_tf=True,
-            use_idf=True,
-            norm='l2'
-        )
-        self.faqs = []
-        self.faq_vectors = None
-        self.is_fitted = False
-        self.last_update = None
+        # The live index; swapped as a whole so readers never see a half-built one
+        self.index = IndexSnapshot()
+
+        # 'process' rebuilds in a child process, 'inline' in the calling thread.
+        # Serverless instances may be frozen after the response, so rebuild inline there.
+        default_mode = 'inline' if os.environ.get('VERCEL_ENV') else 'process'
+        self.rebuild_mode = os.environ.get('INDEX_REBUILD_MODE', default_mode)
+
+        self._version_lock = threading.Lock()
+        self._next_version = 0
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_thread = None
+        # Shard keys waiting for a rebuild; None means rebuild everything
+        self._rebuild_pending = set()
 
         # Adjusted thresholds for better matching
         self.thresholds = {
             'exact': 0.6,
             'similar': 0.4,
             'low': 0.25,
-            'unknown': 0.0
+            'unknown': 0.0,
+            # Latent semantic rescue for questions sharing no words with the FAQ they mean
+            'semantic': 0.75
         }
 
-        # Load FAQs on initialization
-        self.load_faqs()
+        # LSA cosines run high, so semantic-only matches are reported lower
+        self.semantic_weight = 0.7
 
-    def load_faqs(self):
-        """Load FAQs from database and build vectors"""
-        try:
-            from database.config import get_db_connection, IN_PRODUCTION
+        # Two-stage retrieval: posting-list candidates, then full re-ranking.
+        # Each stage has a latency budget; the re-rank stage skips its optional
+        # scorers once its budget is spent.
+        self.candidate_limit = int(os.environ.get('MATCHER_CANDIDATES', 50))
+        self.stage_budgets = {
+            'candidates': float(os.environ.get('MATCHER_CANDIDATE_BUDGET_MS', 5)) / 1000,
+            'rerank': float(os.environ.get('MATCHER_RERANK_BUDGET_MS', 25)) / 1000,
+        }
+        self._stats_lock = threading.Lock()
+        self.stage_stats = {
+            stage: {'calls': 0, 'over_budget': 0, 'total_ms': 0.0}
+            for stage in self.stage_budgets
+        }
 
-            conn = get_db_connection()
+        # Phrasings answered before, checked before any NLP
+        self.paraphrases = ParaphraseTable()
+        self.paraphrases.load()
 
-            if IN_PRODUCTION:
-                # PostgreSQL version - MUST use cursor
-                from psycopg2.extras import RealDictCursor
-                cur = conn.cursor(cursor_factory=RealDictCursor)
-                cur.execute("SELECT id, question, answer, category FROM faqs")
-                faqs = cur.fetchall()
-            else:
-                # SQLite version - can use connection.execute directly
-                cur = conn.cursor()
-                cur.execute("SELECT id, question, answer, category FROM faqs")
-                faqs = cur.fetchall()
+        # Recent results, reused for near-duplicate questions
+        self.query_cache = QueryCache()
 
-            conn.close()
+        # Questions this index could not answer, so repeats skip matching
+        self.negative_cache = NegativeCache()
 
-            if not faqs:
-                print("⚠️ No FAQs found in database")
-                self.faqs = []
-                return
+        # Set by warm_up(); readiness checks wait for it unless APP_WARMUP=0
+        self.warmup_enabled = os.environ.get('APP_WARMUP', '1') != '0'
+        self.warm = False
+        self.warmup_seconds = None
 
-            self.faqs = [dict(faq) for faq in faqs]
+        # Load FAQs on initialization, from a prebuilt index when one is shipped
+        # (queries then never need scikit-learn, only rebuilds do)
+        snapshot_path = os.environ.get('INDEX_SNAPSHOT_PATH')
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_prebuilt(snapshot_path)
+        else:
+            self.load_faqs()
 
-            # Preprocess all questions
-            questions = [faq['question'] for faq in self.faqs]
-            processed_questions = preprocessor.process_batch(questions)
+    # Views onto the live index, kept for callers that predate snapshots
+    @property
+    def faqs(self):
+        return self.index.faqs
+
+    @property
+    def vectorizer(self):
+        return self.index.vectorizer
+
+    @property
+    def faq_vectors(self):
+        return self.index.faq_vectors
+
+    @property
+    def is_fitted(self):
+        return self.index.is_fitted
+
+    @property
+    def last_update(self):
+        return self.index.built_at
+
+    @property
+    def supports_append(self):
+        """Whether new FAQs can be added to the live index without a refit"""
+        shard = next(iter(self.index.shards.values()), None)
+        return shard is not None and hasattr(shard.scorer, 'extended') and shard.semantic is None
+
+    def _new_version(self):
+        with self._version_lock:
+            self._next_version += 1
+            return self._next_version
+
+    def _attach(self, snapshot):
+        """Make a freshly built snapshot the live index"""
+        with self._version_lock:
+            # A slower build must never replace a newer one
+            if snapshot.version < self.index.version:
+                return False
+            self.index = snapshot
+
+        self._log_attached(snapshot)
+        return True
+
+    def _attach_shards(self, updates, version):
+        """
+        Swap rebuilt shards into the live index
 
-            # Create TF-IDF vectors
-            self.faq_vectors = self.vectorizer.fit_transform(processed_questions)
-            self.is_fitted = True
-            self.last_update = datetime.now()
+        Args:
+            updates: dict of shard_key -> IndexShard (None drops the shard)
+            version: Version stamped on the merged snapshot
+        """
+        build_seconds = sum(shard.build_seconds for shard in updates.values() if shard)
+
+        with self._version_lock:
+            if version < self.index.version:
+                return False
+            shards = dict(self.index.shards)
+            for key, shard in updates.items():
+                if shard is None:
+                    shards.pop(key, None)
+                else:
+                    shards[key] = shard
+            # Composing is quick (speller and router only), so do it under the
+            # lock rather than risk merging onto a stale set of shards
+            snapshot = compose_snapshot(shards, version, build_seconds)
+            self.index = snapshot
+
+        print(f"🧩 Updated shard(s) {', '.join(sorted(updates))}")
+        self._log_attached(snapshot)
+        return True
+
+    def _log_attached(self, snapshot):
+        """Report the index that just went live"""
+        if snapshot.faqs:
+            print(f"✅ Loaded {len(snapshot.faqs)} FAQs and built {snapshot.engine} index "
+                  f"({len(snapshot.shards)} shard(s), v{snapshot.version}, {snapshot.build_seconds:.2f}s)")
+        else:
+            print("⚠️ No FAQs found in database")
 
-            print(f"✅ Loaded {len(self.faqs)} FAQs and built TF-IDF vectors")
+    def load_faqs(self):
+        """Load FAQs from database and build vectors in this thread"""
+        try:
+            self._attach(build_snapshot(version=self._new_version()))
 
         except Exception as e:
             print(f"🔥 Error loading FAQs: {e}")
             import traceback
             traceback.print_exc()
-            self.faqs = []
-            self.is_fitted = False
+
+    def load_prebuilt(self, path):
+        """Attach a snapshot written by `python -m nlp.index_builder --out path`"""
+        try:
+            snapshot = load_snapshot(path)
+            with self._version_lock:
+                self._next_version = max(self._next_version, snapshot.version)
+            self._attach(snapshot)
+
+        except Exception as e:
+            print(f"⚠️ Could not load prebuilt index {path}, building instead: {e}")
+            self.load_faqs()
+
+    def rebuild_now(self, out_of_process=True, shard_keys=None):
+        """
+        Rebuild the index and attach it, blocking until done
+
+        Args:
+            out_of_process: Build in a child process so this process keeps the GIL free
+            shard_keys: Only rebuild these shards (everything when None)
+        """
+        version = self._new_version()
+
+        if out_of_process:
+            try:
+                if shard_keys is None:
+                    return self._attach(build_in_subprocess(version))
+                return self._attach_shards(build_in_subprocess(version, sorted(shard_keys)), version)
+            except Exception as e:
+                print(f"⚠️ Out-of-process index build failed, building inline: {e}")
+
+        if shard_keys is None:
+            return self._attach(build_snapshot(version=version))
+        return self._attach_shards(build_shard_updates(sorted(shard_keys)), version)
+
+    def _shard_keys_for(self, categories):
+        """Shard keys holding the given FAQ categories, None for a full rebuild"""
+        if categories is None or SHARDING != 'category':
+            return None
+        return {shard_key({'category': category}) for category in categories}
+
+    def request_rebuild(self, categories=None):
+        """
+        Schedule an index rebuild after the FAQs changed
+
+        In 'process' mode this returns immediately; requests arriving while a
+        rebuild runs are coalesced into one follow-up rebuild.
+
+        Args:
+            categories: Categories of the FAQs that changed. With category
+                        sharding only their shards are rebuilt.
+        """
+        shard_keys = self._shard_keys_for(categories)
+        if shard_keys is not None and not shard_keys:
+            return
+
+        if self.rebuild_mode != 'process':
+            if shard_keys is None:
+                self.load_faqs()
+            else:
+                try:
+                    self.rebuild_now(out_of_process=False, shard_keys=shard_keys)
+                except Exception as e:
+                    print(f"🔥 Error rebuilding shards: {e}")
+            return
+
+        with self._rebuild_lock:
+            if shard_keys is None or self._rebuild_pending is None:
+                self._rebuild_pending = None
+            else:
+                self._rebuild_pending |= shard_keys
+            if self._rebuild_thread is not None:
+                return
+            self._rebuild_thread = threading.Thread(
+                target=self._rebuild_worker, name='faq-index-rebuild', daemon=True
+            )
+            self._rebuild_thread.start()
+
+    def _rebuild_worker(self):
+        """Background thread that waits on child builds and attaches them"""
+        while True:
+            with self._rebuild_lock:
+                shard_keys = self._rebuild_pending
+                if shard_keys is not None and not shard_keys:
+                    self._rebuild_thread = None
+                    return
+                self._rebuild_pending = set()
+
+            try:
+                self.rebuild_now(out_of_process=True, shard_keys=shard_keys)
+            except Exception as e:
+                print(f"🔥 Error rebuilding index: {e}")
+
+    def _record_stage(self, stage, started):
+        """Record a finished stage's latency and whether it blew its budget"""
+        elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            stats = self.stage_stats[stage]
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed * 1000
+            if elapsed > self.stage_budgets[stage]:
+                stats['over_budget'] += 1
+
+    def _over_budget(self, stage, started):
+        """Check whether a running stage has spent its budget"""
+        return time.perf_counter() - started > self.stage_budgets[stage]
+
+    def get_stage_stats(self):
+        """Per-stage call counts, budget overruns and mean latency"""
+        with self._stats_lock:
+            return {
+                stage: {
+                    'calls': stats['calls'],
+                    'over_budget': stats['over_budget'],
+                    'avg_ms': round(stats['total_ms'] / stats['calls'], 3) if stats['calls'] else 0.0,
+                    'budget_ms': self.stage_budgets[stage] * 1000
+                }
+                for stage, stats in self.stage_stats.items()
+            }
+
+    def _retrieve(self, index, processed_user):
+        """
+        Two-stage retrieval over a snapshot
+
+        Returns:
+            (positions, scores) of the re-ranked candidates, best first,
+            and the time the re-rank stage started
+        """
+        # Stage 1: route to the likely shards, then cheap candidate
+        # generation from their posting lists
+        started = time.perf_counter()
+        shard_candidates = []
+        for shard in index.route(processed_user):
+            local = shard.candidates.lookup(processed_user, self.candidate_limit)
+            if len(local):
+                shard_candidates.append((shard, local))
+        self._record_stage('candidates', started)
+
+        # Stage 2: score only the candidates with each shard's full engine
+        rerank_started = time.perf_counter()
+        if not shard_candidates:
+            return np.empty(0, dtype=np.int32), np.empty(0), rerank_started
+
+        positions = np.concatenate([local + index.offsets[shard.key] for shard, local in shard_candidates])
+        scores = np.concatenate([shard.scorer.score(processed_user, local) for shard, local in shard_candidates])
+        order = np.argsort(scores)[::-1]
+        return positions[order], scores[order], rerank_started
+
     def refresh_if_needed(self):
         """Refresh FAQ vectors if database has changed"""
-        self.load_faqs()
+        self.request_rebuild()
+
+    def warm_up(self, questions):
+        """
+        Run the whole matching pipeline on sample questions, so the first
+        real request does not pay for WordNet loading, the first database
+        connection or the scorers' query buffers
+        """
+        started = time.perf_counter()
+
+        try:
+            queries.fetch_value('health.ping')
+
+            # Inline rebuilds fit in this process, so load scikit-learn now too
+            if self.rebuild_mode == 'inline':
+                from nlp.scoring import create_vectorizer
+                create_vectorizer()
+
+            # Bypass the caches so every stage actually runs and nothing is learned
+            index = self.index
+            for question in questions:
+                match = self._match_uncached(index, question, preprocessor.process(question))
+                if match:
+                    self.get_related(match)
+
+            self.warm = True
+        except Exception as e:
+            print(f"⚠️ Warmup failed: {e}")
+
+        # Warmup latencies would skew the per-stage stats
+        with self._stats_lock:
+            for stats in self.stage_stats.values():
+                stats.update(calls=0, over_budget=0, total_ms=0.0)
+
+        self.warmup_seconds = round(time.perf_counter() - started, 3)
+        print(f"🔥 Warmed up on {len(questions)} questions in {self.warmup_seconds}s")
+
+    def readiness(self):
+        """What a load balancer needs to know before routing traffic here"""
+        index = self.index
+        return {
+            'ready': index.is_fitted and (self.warm or not self.warmup_enabled),
+            'warm': self.warm,
+            'warmup_seconds': self.warmup_seconds,
+            'index_version': index.version,
+            'faq_count': len(index.faqs),
+            'engine': index.engine,
+            'built_at': index.built_at.isoformat() if index.built_at else None,
+            'build_seconds': round(index.build_seconds, 3),
+            'rebuilding': self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+        }
+
+    def known_unknown(self, user_question):
+        """The response this question missed with against the live index, or None"""
+        return self.negative_cache.lookup(user_question, self.index.version)
+
+    def remember_unknown(self, user_question, miss, version):
+        """Remember an unanswered question, unless the index it was matched against is gone"""
+        if version == self.index.version:
+            self.negative_cache.add(user_question, version, miss)
 
     def find_best_match(self, user_question):
         """
@@ -279,62 +602,108 @@ class FAQMatcher:
         Now with custom mappings for common questions
         """
 
+        # Step 0: A phrasing answered before maps straight to its FAQ
+        learned = self._paraphrase_match(user_question)
+        if learned:
+            return learned
+
         # Step 1: Check custom mappings first
         try:
             custom_match = get_custom_match(user_question)
 
             if custom_match:
                 # Find the FAQ with this ID
-                for faq in self.faqs:
-                    if faq['id'] == custom_match['faq_id']:
-                        match = faq.copy()
-                        match['confidence'] = custom_match['confidence']
-                        match['match_type'] = custom_match['match_type']
-                        match['matched_by'] = custom_match['matched_by']
-                        print(f"🎯 Custom match found for: {user_question[:50]}...")
-                        return match
+                faqs = self.faqs
+                position = faqs.position(custom_match['faq_id'])
+                if position is not None:
+                    print(f"🎯 Custom match found for: {user_question[:50]}...")
+                    return MatchResult(
+                        faqs, position,
+                        confidence=custom_match['confidence'],
+                        match_type=custom_match['match_type'],
+                        matched_by=custom_match['matched_by']
+                    )
         except Exception as e:
             print(f"⚠️ Custom mapping check failed: {e}")
 
         # Step 2: If no custom match, proceed with TF-IDF
-        if not self.faqs or not self.is_fitted:
+        if not self.index.is_fitted:
             print("⚠️ No FAQs loaded, attempting to reload...")
             self.load_faqs()
             if not self.faqs:
                 return None
 
+        # Score against one snapshot even if a rebuild is attached mid-query
+        index = self.index
+
+        # Step 3: Reuse the result of a recent near-duplicate question
+        started = time.perf_counter()
+        try:
+            processed_asked = preprocessor.process(user_question)
+            cached = self.query_cache.lookup(index, processed_asked)
+            if cached:
+                return cached
+        except Exception as e:
+            print(f"⚠️ Query cache lookup failed: {e}")
+            processed_asked = None
+
+        match = self._match_uncached(index, user_question, processed_asked)
+
+        if match:
+            self._learn_paraphrase(user_question, match)
+            if processed_asked is not None:
+                self.query_cache.store(index, processed_asked, match, time.perf_counter() - started)
+        return match
+
+    def _match_uncached(self, index, user_question, processed_asked):
+        """
+        Spelling correction, retrieval and re-ranking for one question
+
+        Args:
+            processed_asked: The preprocessed question before spelling correction
+        """
+        asked = user_question
+
+        # Fix typos so misspelled questions still hit the TF-IDF vocabulary
+        user_question = self._correct_spelling(index, user_question)
+
         try:
-            # Preprocess user question
-            processed_user = preprocessor.process(user_question)
+            # Preprocess user question (already done unless spelling changed it)
+            if user_question == asked and processed_asked is not None:
+                processed_user = processed_asked
+            else:
+                processed_user = preprocessor.process(user_question)
 
             # If question is too short, use simpler matching
             if len(processed_user.split()) < 2:
                 return self._handle_short_query(user_question)
 
-            # Transform user question to vector
-            user_vector = self.vectorizer.transform([processed_user])
-
-            # Calculate cosine similarity with all FAQs
-            similarities = cosine_similarity(user_vector, self.faq_vectors).flatten()
+            # Retrieve candidates and re-rank them (TF-IDF cosine by default)
+            ranked, ranked_scores, rerank_started = self._retrieve(index, processed_user)
 
             # Get top matches
-            top_indices = np.argsort(similarities)[::-1][:5]
-            top_scores = similarities[top_indices]
+            top_indices = ranked[:5]
+            top_scores = ranked_scores[:5]
 
             # Get best match
-            best_idx = top_indices[0]
-            best_score = top_scores[0]
+            best_idx = top_indices[0] if len(top_indices) else None
+            best_score = top_scores[0] if len(top_scores) else 0.0
 
-            # If best score is too low, try keyword matching
+            # If best score is too low, try the semantic scorer, then keyword matching
             if best_score < 0.2:
+                if not self._over_budget('rerank', rerank_started):
+                    semantic_match = self._semantic_match(index, processed_user)
+                    if semantic_match:
+                        self._record_stage('rerank', rerank_started)
+                        return semantic_match
+                self._record_stage('rerank', rerank_started)
                 return self._keyword_match(user_question)
 
             # Prepare result
-            best_match = self.faqs[best_idx].copy()
-            best_match['confidence'] = round(float(best_score), 3)
+            best_match = MatchResult(index.faqs, best_idx, confidence=round(float(best_score), 3))
             best_match['all_matches'] = [
                 {
-                    'question': self.faqs[idx]['question'],
+                    'question': index.faqs.question(idx),
                     'confidence': round(float(score), 3)
                 }
                 for idx, score in zip(top_indices[1:4], top_scores[1:4])
@@ -351,8 +720,10 @@ class FAQMatcher:
             else:
                 best_match['match_type'] = 'unknown'
 
-            # Boost with keywords
-            best_match = self._boost_with_keywords(user_question, best_match)
+            # Boost with keywords, unless the re-rank budget is already spent
+            if not self._over_budget('rerank', rerank_started):
+                best_match = self._boost_with_keywords(user_question, best_match)
+            self._record_stage('rerank', rerank_started)
 
             print(f"📊 Best match: '{best_match['question'][:50]}...'")
             print(f"   Confidence: {best_score:.3f} ({best_match['match_type']})")
@@ -363,6 +734,92 @@ class FAQMatcher:
             print(f"🔥 Error in find_best_match: {e}")
             return self._fallback_match(user_question)
 
+    def _paraphrase_match(self, user_question):
+        """The FAQ this exact phrasing was answered with before, if it still exists"""
+        try:
+            learned = self.paraphrases.lookup(user_question)
+            if learned is None:
+                return None
+
+            faq_id, confidence, source = learned
+            faqs = self.faqs
+            position = faqs.position(faq_id)
+            if position is None:
+                # A learned FAQ that left the index was deleted; an admin
+                # answer may just not be indexed yet
+                if source != 'admin':
+                    self.paraphrases.forget(user_question)
+                return None
+
+            print(f"📖 Paraphrase match for: {user_question[:50]}...")
+            return MatchResult(faqs, position, confidence=confidence,
+                               match_type='exact', matched_by='paraphrase')
+        except Exception as e:
+            print(f"⚠️ Paraphrase lookup failed: {e}")
+            return None
+
+    def _learn_paraphrase(self, user_question, match):
+        """Remember a confident match so the next identical phrasing skips NLP"""
+        if match.get('match_type') == 'exact' and match['confidence'] >= LEARN_CONFIDENCE:
+            self.paraphrases.remember(user_question, match['id'], match['confidence'])
+
+    def _correct_spelling(self, index, user_question):
+        """Return the question with misspelled words corrected"""
+        if index.speller is None:
+            return user_question
+
+        try:
+            corrected = index.speller.correct(user_question)
+            if corrected != preprocessor.clean_text(user_question):
+                print(f"✏️ Spelling corrected: '{user_question[:50]}' -> '{corrected[:50]}'")
+                return corrected
+        except Exception as e:
+            print(f"⚠️ Spelling correction failed: {e}")
+
+        return user_question
+
+    def _semantic_match(self, index, processed_user):
+        """
+        Match in the latent semantic space when the lexical engine found nothing
+
+        Scores every FAQ of the routed shards, not just the posting-list
+        candidates: the FAQ a paraphrase means may share none of its words.
+        """
+        try:
+            best_idx = None
+            best_score = 0.0
+            for shard in index.route(processed_user):
+                if shard.semantic is None:
+                    continue
+                scores = shard.semantic.score(processed_user)
+                if not len(scores):
+                    continue
+                best = int(np.argmax(scores))
+                if best_idx is None or scores[best] > best_score:
+                    best_idx = best + index.offsets[shard.key]
+                    best_score = float(scores[best])
+
+            if best_idx is None or best_score < self.thresholds['semantic']:
+                return None
+
+            match = MatchResult(index.faqs, best_idx,
+                                confidence=round(best_score * self.semantic_weight, 3),
+                                matched_by='lsa')
+
+            if match['confidence'] >= self.thresholds['exact']:
+                match['match_type'] = 'exact'
+            elif match['confidence'] >= self.thresholds['similar']:
+                match['match_type'] = 'similar'
+            else:
+                match['match_type'] = 'low'
+
+            print(f"🧭 Semantic match: '{match['question'][:50]}...' ({best_score:.3f})")
+            return match
+
+        except Exception as e:
+            print(f"⚠️ Semantic matching failed: {e}")
+            return None
+
     def _handle_short_query(self, user_question):
         """
         Special handling for very short queries (1-2 words)
@@ -403,16 +860,14 @@ class FAQMatcher:
         }
 
         # Check if query matches any keyword
+        faqs = self.faqs
         for keyword, faq_id in keyword_map.items():
             if keyword in query_lower or query_lower == keyword:
-                for faq in self.faqs:
-                    if faq['id'] == faq_id:
-                        match = faq.copy()
-                        match['confidence'] = 0.85
-                        match['match_type'] = 'keyword'
-                        match['matched_by'] = 'short_query'
-                        print(f"🔑 Keyword match: '{keyword}' -> ID {faq_id}")
-                        return match
+                position = faqs.position(faq_id)
+                if position is not None:
+                    print(f"🔑 Keyword match: '{keyword}' -> ID {faq_id}")
+                    return MatchResult(faqs, position, confidence=0.85,
+                                       match_type='keyword', matched_by='short_query')
 
         return None
 
@@ -428,22 +883,24 @@ class FAQMatcher:
                 return None
 
             best_score = 0
-            best_match = None
+            best_position = None
 
-            for faq in self.faqs:
+            faqs = self.faqs
+            for position, question in faqs.questions():
                 # Count how many keywords appear in FAQ question
-                faq_text = preprocessor.process(faq['question'])
+                faq_text = preprocessor.process(question)
                 matches = sum(1 for keyword in keywords if keyword in faq_text)
 
                 if matches > 0:
                     score = matches / len(keywords)
                     if score > best_score:
                         best_score = score
-                        best_match = faq.copy()
-                        best_match['confidence'] = round(score * 0.7, 3)
-                        best_match['match_type'] = 'keyword'
+                        best_position = position
 
-            return best_match
+            if best_position is None:
+                return None
+            return MatchResult(faqs, best_position, confidence=round(best_score * 0.7, 3),
+                               match_type='keyword')
 
         except Exception as e:
             print(f"🔥 Error in keyword matching: {e}")
@@ -455,23 +912,17 @@ class FAQMatcher:
         """
         try:
             user_lower = user_question.lower()
-            best_score = 0
-            best_match = None
 
-            for faq in self.faqs:
-                faq_lower = faq['question'].lower()
+            faqs = self.faqs
+            for position, question in faqs.questions():
+                faq_lower = question.lower()
 
                 # Check for exact substring matches
                 if user_lower in faq_lower or faq_lower in user_lower:
-                    score = 0.5
-                    if score > best_score:
-                        best_score = score
-                        best_match = faq.copy()
-                        best_match['confidence'] = 0.5
-                        best_match['match_type'] = 'substring'
-                        best_match['matched_by'] = 'fallback'
+                    return MatchResult(faqs, position, confidence=0.5,
+                                       match_type='substring', matched_by='fallback')
 
-            return best_match
+            return None
 
         except Exception as e:
             print(f"🔥 Error in fallback matching: {e}")
@@ -482,22 +933,19 @@ class FAQMatcher:
         Get alternative suggestions for low-confidence matches
         """
         try:
-            if not self.faqs or not self.is_fitted:
+            index = self.index
+            if not index.is_fitted:
                 return []
 
-            processed_user = preprocessor.process(user_question)
-            user_vector = self.vectorizer.transform([processed_user])
-            similarities = cosine_similarity(user_vector, self.faq_vectors).flatten()
-
-            # Get top N indices
-            top_indices = np.argsort(similarities)[::-1][:n]
+            processed_user = preprocessor.process(self._correct_spelling(index, user_question))
+            ranked, ranked_scores, _ = self._retrieve(index, processed_user)
 
             suggestions = []
-            for idx in top_indices:
-                if similarities[idx] > 0.3:
+            for idx, score in zip(ranked[:n], ranked_scores[:n]):
+                if score > 0.3:
                     suggestions.append({
-                        'question': self.faqs[idx]['question'],
-                        'confidence': float(similarities[idx])
+                        'question': index.faqs.question(idx),
+                        'confidence': float(score)
                     })
 
             return suggestions
@@ -506,6 +954,35 @@ class FAQMatcher:
             print(f"🔥 Error getting suggestions: {e}")
             return []
 
+    def get_related(self, match, n=3):
+        """
+        Suggestions for a matched FAQ from the precomputed neighbor graph:
+        the match itself, then the FAQs most similar to it
+        """
+        try:
+            index = self.index
+            position = index.faqs.position(match['id'])
+            if position is None:
+                return []
+
+            shard, local = index.locate(position)
+            if getattr(shard, 'neighbors', None) is None:
+                return self.get_suggestions(match['question'], n=n)
+
+            suggestions = [{'question': match['question'], 'confidence': float(match['confidence'])}]
+            neighbors, scores = shard.neighbors.lookup(local, n - 1)
+            for neighbor, score in zip(neighbors, scores):
+                suggestions.append({
+                    'question': shard.faqs.question(neighbor),
+                    'confidence': float(match['confidence'] * score)
+                })
+
+            return suggestions
+
+        except Exception as e:
+            print(f"🔥 Error getting related questions: {e}")
+            return []
+
     def _boost_with_keywords(self, user_question, base_match):
         """
         Boost confidence score if important keywords match
@@ -538,23 +1015,29 @@ class FAQMatcher:
 
         return base_match
 
-    def add_faq_to_index(self, faq_id, question, answer):
+    def add_faq_to_index(self, faq_id, question, answer, category=None):
         """
-        Add a new FAQ to the index without reloading everything
+        Add a new FAQ to the index without reloading from the database
         """
         try:
-            # Add to faqs list
             new_faq = {
                 'id': faq_id,
                 'question': question,
-                'answer': answer
+                'answer': answer,
+                'category': category
             }
-            self.faqs.append(new_faq)
 
-            # Reprocess all questions
-            questions = [faq['question'] for faq in self.faqs]
-            processed_questions = preprocessor.process_batch(questions)
-            self.faq_vectors = self.vectorizer.fit_transform(processed_questions)
+            version = self._new_version()
+            key = shard_key(new_faq)
+            shard = self.index.shards.get(key)
+
+            # Hashed shards take the FAQ as an extra row; a new category gets
+            # its own one-FAQ shard. The live shards are never mutated in place.
+            updated = build_shard(key, [new_faq]) if shard is None else extend_shard(shard, [new_faq])
+            if updated is not None:
+                self._attach_shards({key: updated}, version)
+            else:
+                self._attach(build_snapshot(self.faqs.rows() + [new_faq], version=version))
 
             print(f"✅ Added FAQ {faq_id} to index")
 
@@ -0,0 +1,127 @@
+"""
+Negative cache for questions the index cannot answer
+
+Repeated unanswerable questions (and spam) otherwise run every matching
+stage, including the keyword and fallback full scans, and log another
+unknown_questions row each time. A Bloom filter answers "never seen" for
+the common case without touching the LRU; the LRU holds the recent
+unknowns with the response fields they were answered with (including the
+row they were logged as), so a hit replies exactly like the first miss.
+Both are only valid for one index version.
+"""
+
+import os
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from nlp.paraphrases import normalize_question
+
+NEGATIVE_CACHE_SIZE = int(os.environ.get('NEGATIVE_CACHE_SIZE', 2048))
+
+# Bloom filter sizing
+BLOOM_CAPACITY = 50000
+BLOOM_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """Fixed-size set membership with false positives but no false negatives"""
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.n_bits = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * math.log(2))))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, key):
+        # Double hashing: h1 + i * h2 stands in for k independent hashes
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def clear(self):
+        self.bits[:] = 0
+
+
+class NegativeCache:
+    def __init__(self, size=NEGATIVE_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter()
+        self._recent = OrderedDict()    # normalized question -> miss response fields
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, version):
+        """Drop everything learned against another index (caller holds the lock)"""
+        if version != self.version:
+            self._bloom.clear()
+            self._recent.clear()
+            self.version = version
+
+    def lookup(self, question, version):
+        """
+        The response fields a question was answered with when it missed, or None
+
+        A hit means the question went unanswered against this same index.
+        """
+        key = normalize_question(question)
+
+        with self._lock:
+            self._check_version(version)
+            if key not in self._bloom:
+                self.misses += 1
+                return None
+
+            miss = self._recent.get(key)
+            if miss is None:
+                # Evicted from the LRU (or a Bloom false positive): match it again
+                self.misses += 1
+                return None
+
+            self._recent.move_to_end(key)
+            self.hits += 1
+            return dict(miss)
+
+    def add(self, question, version, miss):
+        """
+        Remember that a question went unanswered against this index
+
+        Args:
+            miss: The response fields it was answered with, unknown_id included
+        """
+        key = normalize_question(question)
+
+        with self._lock:
+            self._check_version(version)
+            self._bloom.add(key)
+            self._recent[key] = dict(miss)
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.size:
+                self._recent.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._check_version(None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._recent),
+                'size': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+            }
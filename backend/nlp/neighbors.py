@@ -0,0 +1,144 @@
+"""
+Precomputed FAQ-to-FAQ neighbor graph
+
+For every FAQ the index build stores its k most similar FAQs (cosine over
+the shard's document matrix, i.e. a sparse top-k of X @ X.T), so "related
+questions" for a matched FAQ are an array lookup instead of a second
+similarity pass over the index.
+"""
+
+import os
+import numpy as np
+from scipy.sparse import csr_matrix
+
+NEIGHBORS = int(os.environ.get('MATCHER_NEIGHBORS', 5))
+
+# Pairs less similar than this are not worth suggesting
+MIN_NEIGHBOR_SCORE = 0.2
+
+# Cap on the dense similarity block computed at once (cells)
+BLOCK_CELLS = 2 ** 22
+
+
+def normalize_rows(matrix):
+    """L2-normalised copy of the rows of a document matrix (unchanged for TF-IDF rows)"""
+    # Copy: the matrix is the scorer's own, and a same-dtype csr_matrix() shares its data
+    matrix = csr_matrix(matrix, dtype=np.float32, copy=True)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(np.float32)
+    return matrix
+
+
+class NeighborGraph:
+    def __init__(self, neighbors, scores, k):
+        """
+        Args:
+            neighbors: (n, k) int32 FAQ positions, -1 where there are fewer than k
+            scores: (n, k) float32 cosine similarities, best first
+        """
+        self.neighbors = neighbors
+        self.scores = scores
+        self.k = k
+
+    @classmethod
+    def from_matrix(cls, matrix, k=None):
+        """Top-k neighbors of every row of a document matrix"""
+        k = k or NEIGHBORS
+        vectors = normalize_rows(matrix)
+        n_docs = vectors.shape[0]
+
+        neighbors = np.full((n_docs, k), -1, dtype=np.int32)
+        scores = np.zeros((n_docs, k), dtype=np.float32)
+
+        # X @ X.T a block of rows at a time, so memory stays bounded
+        block = max(1, BLOCK_CELLS // max(n_docs, 1))
+        transposed = vectors.T.tocsc()
+        for start in range(0, n_docs, block):
+            rows = np.arange(start, min(start + block, n_docs))
+            similarity = (vectors[rows] @ transposed).toarray()
+            similarity[np.arange(len(rows)), rows] = -1.0
+            neighbors[rows], scores[rows] = cls._top_k(similarity, k)
+
+        return cls(neighbors, scores, k)
+
+    @staticmethod
+    def _top_k(similarity, k):
+        """Best k columns of each row of a dense similarity block"""
+        n_rows, n_cols = similarity.shape
+        neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+        scores = np.zeros((n_rows, k), dtype=np.float32)
+
+        take = min(k, n_cols)
+        if take == 0:
+            return neighbors, scores
+
+        top = np.argpartition(-similarity, take - 1, axis=1)[:, :take]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        keep = top_scores >= MIN_NEIGHBOR_SCORE
+        neighbors[:, :take] = np.where(keep, top, -1)
+        scores[:, :take] = np.where(keep, top_scores, 0.0)
+        return neighbors, scores
+
+    def lookup(self, position, n=None):
+        """(positions, scores) of an FAQ's nearest FAQs, best first"""
+        neighbors = self.neighbors[position]
+        valid = neighbors >= 0
+        if n is not None:
+            valid[n:] = False
+        return neighbors[valid], self.scores[position][valid]
+
+    def updated(self, matrix, rows):
+        """
+        A new graph after the given rows changed or were appended
+
+        Only the changed rows are compared with everything; every other row
+        just has the changed rows merged into (or dropped from) its list.
+        Rows whose list lost a member are recomputed in full.
+        """
+        vectors = normalize_rows(matrix)
+        n_docs = vectors.shape[0]
+        rows = np.asarray(sorted(set(int(row) for row in rows)), dtype=np.int32)
+
+        neighbors = np.full((n_docs, self.k), -1, dtype=np.int32)
+        scores = np.zeros((n_docs, self.k), dtype=np.float32)
+        n_old = min(len(self.neighbors), n_docs)
+        neighbors[:n_old] = self.neighbors[:n_old]
+        scores[:n_old] = self.scores[:n_old]
+
+        # Similarity of every FAQ with the changed ones: (n_docs, len(rows))
+        similarity = (vectors @ vectors[rows].T).toarray()
+        similarity[rows, np.arange(len(rows))] = -1.0
+
+        # Changed rows get fresh lists
+        neighbors[rows], scores[rows] = self._top_k(similarity.T, self.k)
+
+        # A row whose list held a changed FAQ is recomputed in full: that FAQ
+        # may have dropped out, and the next best is unknown
+        stale = np.isin(neighbors, rows).any(axis=1)
+        stale[rows] = False
+        recompute = np.flatnonzero(stale)
+
+        # Every other row merges the changed FAQs into its current list
+        merge = np.ones(n_docs, dtype=bool)
+        merge[rows] = False
+        merge[recompute] = False
+        merge = np.flatnonzero(merge)
+        if len(merge):
+            current = neighbors[merge]
+            candidates = np.concatenate([current, np.broadcast_to(rows, (len(merge), len(rows)))], axis=1)
+            candidate_scores = np.concatenate([np.where(current >= 0, scores[merge], -1.0), similarity[merge]], axis=1)
+            picked, picked_scores = self._top_k(candidate_scores, self.k)
+            neighbors[merge] = np.where(picked >= 0, np.take_along_axis(candidates, np.maximum(picked, 0), axis=1), -1)
+            scores[merge] = picked_scores
+
+        if len(recompute):
+            full = (vectors[recompute] @ vectors.T).toarray()
+            full[np.arange(len(recompute)), recompute] = -1.0
+            neighbors[recompute], scores[recompute] = self._top_k(full, self.k)
+
+        return NeighborGraph(neighbors, scores, self.k)
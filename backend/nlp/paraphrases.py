@@ -0,0 +1,161 @@
+"""
+Learned paraphrase table
+
+Maps the normalized text of a question to the FAQ it was answered with,
+so a phrasing seen before is answered by a dict lookup instead of the NLP
+pipeline. Entries come from admin answers to unknown questions and from
+high-confidence matches; they live in the `paraphrases` table, with an
+in-memory copy of the most recently used ones.
+"""
+
+import os
+import re
+import sys
+import time
+import string
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MAX_ENTRIES = int(os.environ.get('PARAPHRASE_MAX_ENTRIES', 5000))
+MAX_AGE_DAYS = int(os.environ.get('PARAPHRASE_MAX_AGE_DAYS', 90))
+
+# Matches at least this confident are remembered
+LEARN_CONFIDENCE = float(os.environ.get('PARAPHRASE_MIN_CONFIDENCE', 0.8))
+
+# hits and last_used are written back at most this often per entry
+TOUCH_SECONDS = 3600
+
+_PUNCTUATION = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_question(question):
+    """Lowercase, turn punctuation into spaces and collapse whitespace"""
+    return _WHITESPACE.sub(' ', question.lower().translate(_PUNCTUATION)).strip()
+
+
+def question_hash(question):
+    """Key of a question in the paraphrase table"""
+    return hashlib.sha1(normalize_question(question).encode('utf-8')).hexdigest()
+
+
+class ParaphraseTable:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # hash -> {'faq_id', 'confidence', 'source', 'touched', 'pending'}, least recently used first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Drop stale rows, then read the most recently used ones into memory"""
+        from database import queries
+        from database.config import get_db_connection
+
+        try:
+            conn = get_db_connection()
+            queries.execute('paraphrases.expire', (MAX_AGE_DAYS,), conn)
+            rows = queries.fetch_all('paraphrases.recent', (self.max_entries,), conn)
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Could not load paraphrases: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            self._entries.clear()
+            for row in reversed(rows):
+                self._entries[row['question_hash']] = {'faq_id': row['faq_id'], 'confidence': row['confidence'],
+                                                       'source': row['source'], 'touched': now, 'pending': 0}
+
+        print(f"📖 Loaded {len(rows)} learned paraphrases")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, question):
+        """(faq_id, confidence, source) a phrasing was answered with before, or None"""
+        key = question_hash(question)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            entry['pending'] += 1
+
+            now = time.time()
+            touched = 0
+            if now - entry['touched'] > TOUCH_SECONDS:
+                entry['touched'] = now
+                touched, entry['pending'] = entry['pending'], 0
+
+        if touched:
+            self._execute('paraphrases.touch', (touched, key))
+
+        return entry['faq_id'], entry['confidence'], entry['source']
+
+    def remember(self, question, faq_id, confidence=1.0, source='match'):
+        """
+        Map a phrasing to an FAQ
+
+        Admin answers ('admin') are never overwritten by learned matches.
+        """
+        key = question_hash(question)
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing['source'] == 'admin' and source != 'admin':
+                return
+            self._entries[key] = {'faq_id': int(faq_id), 'confidence': float(confidence),
+                                  'source': source, 'touched': time.time(), 'pending': 0}
+            self._entries.move_to_end(key)
+
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+
+        self._execute(
+            'paraphrases.upsert',
+            (key, normalize_question(question), int(faq_id), float(confidence), source)
+        )
+        for old_key in evicted:
+            self._execute('paraphrases.delete', (old_key,))
+
+    def forget(self, question):
+        """Drop one phrasing, e.g. when its FAQ no longer exists"""
+        key = question_hash(question)
+        with self._lock:
+            self._entries.pop(key, None)
+        self._execute('paraphrases.delete', (key,))
+
+    def forget_faq(self, faq_id, learned_only=False):
+        """Drop the phrasings mapped to an FAQ (only learned ones if learned_only)"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items()
+                        if entry['faq_id'] == faq_id and not (learned_only and entry['source'] == 'admin')]:
+                del self._entries[key]
+
+        self._execute('paraphrases.delete_faq_learned' if learned_only else 'paraphrases.delete_faq', (int(faq_id),))
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def _execute(self, name, params):
+        """Run one named write, logging instead of raising (the table is only a shortcut)"""
+        from database import queries
+
+        try:
+            queries.execute(name, params)
+        except Exception as e:
+            print(f"⚠️ Could not update paraphrases: {e}")
@@ -0,0 +1,214 @@
+"""
+Popular questions without scanning chat history
+
+A space-saving sketch keeps approximate counts for the most frequent
+normalized questions in a fixed number of counters: a question that is
+not tracked replaces the smallest counter and inherits its count as the
+error bound, so anything asked more often than total / capacity times is
+always present. Chats are counted as they are logged; the counts made
+since the last save are added to the `popular_questions` table every
+PERSIST_SECONDS, which keeps the most frequent `capacity` rows across
+restarts and instances.
+"""
+
+import os
+import sys
+import time
+import heapq
+import atexit
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp.paraphrases import normalize_question
+
+POPULAR_CAPACITY = int(os.environ.get('POPULAR_CAPACITY', 500))
+PERSIST_SECONDS = float(os.environ.get('POPULAR_PERSIST_SECONDS', 60))
+
+
+class SpaceSaving:
+    """Top-k counts of a stream in `capacity` counters (Metwally et al.)"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._counts = {}       # key -> [count, error]
+        self._heap = []         # (count, key); stale entries are skipped on pop
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, key):
+        return key in self._counts
+
+    def add(self, key, n=1, error=0):
+        """Count key n times; returns the key it evicted, if any"""
+        evicted = None
+        entry = self._counts.get(key)
+
+        if entry is not None:
+            entry[0] += n
+        elif len(self._counts) < self.capacity:
+            entry = self._counts[key] = [n, error]
+        else:
+            evicted, floor = self._pop_min()
+            entry = self._counts[key] = [floor + n, floor + error]
+
+        heapq.heappush(self._heap, (entry[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, k) for k, (count, _) in self._counts.items()]
+            heapq.heapify(self._heap)
+        return evicted
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            entry = self._counts.get(key)
+            if entry is not None and entry[0] == count:
+                del self._counts[key]
+                return key, count
+
+    def top(self, k):
+        """[(key, count, error)] for the k largest counts"""
+        return [(key, count, error) for key, (count, error)
+                in heapq.nlargest(k, self._counts.items(), key=lambda item: item[1][0])]
+
+    def clear(self):
+        self._counts.clear()
+        self._heap = []
+
+
+class PopularQuestions:
+    def __init__(self, capacity=POPULAR_CAPACITY, persist_seconds=PERSIST_SECONDS):
+        self.capacity = capacity
+        self.persist_seconds = persist_seconds
+        self._lock = threading.Lock()
+        self._sketch = SpaceSaving(capacity)
+        self._text = {}         # key -> question as first asked
+        self._pending = {}      # key -> count not yet added to the table
+        self._loaded = False
+        self._persisted_at = time.monotonic()
+        self.recorded = 0
+        self.persists = 0
+
+    def load(self):
+        """
+        Read the saved counts into the sketch
+
+        The first time the table is empty, seed it from chat_history once.
+        """
+        from database import queries
+        from database.config import get_db_connection
+
+        seeded = False
+        try:
+            conn = get_db_connection()
+            rows = [(row['question_key'], row['question'], row['count'])
+                    for row in queries.fetch_all('popular.top', (self.capacity,), conn)]
+
+            if not rows:
+                merged = {}
+                for row in queries.fetch_all('chat.top_messages', (self.capacity,), conn):
+                    question, count = row['user_message'], row['count']
+                    key = normalize_question(question)
+                    if key:
+                        previous = merged.get(key, (question, 0))
+                        merged[key] = (previous[0], previous[1] + count)
+                rows = [(key, question, count) for key, (question, count) in merged.items()]
+                seeded = bool(rows)
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Could not load popular questions: {e}")
+            rows = []
+
+        # Merged into (not replacing) anything recorded while this ran
+        with self._lock:
+            for key, question, count in rows:
+                evicted = self._sketch.add(key, count)
+                if evicted is not None and evicted not in self._pending:
+                    self._text.pop(evicted, None)
+                self._text.setdefault(key, question)
+                if seeded:
+                    self._pending[key] = self._pending.get(key, 0) + count
+            self._loaded = True
+
+        if seeded:
+            self.persist()
+        print(f"📈 Loaded {len(rows)} popular questions")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if self._loaded:
+                    return
+                # Mark first so a failed load is not retried on every call
+                self._loaded = True
+            self.load()
+
+    def record(self, questions):
+        """Count logged questions; saves to the table when PERSIST_SECONDS have passed"""
+        self._ensure_loaded()
+
+        with self._lock:
+            for question in questions:
+                key = normalize_question(question)
+                if not key:
+                    continue
+                evicted = self._sketch.add(key)
+                if evicted is not None and evicted not in self._pending:
+                    self._text.pop(evicted, None)
+                self._text.setdefault(key, question)
+                self._pending[key] = self._pending.get(key, 0) + 1
+                self.recorded += 1
+            due = time.monotonic() - self._persisted_at >= self.persist_seconds
+
+        if due:
+            self.persist()
+
+    def top(self, k=10):
+        """[{'user_message', 'frequency'}] for the k most asked questions"""
+        self._ensure_loaded()
+        with self._lock:
+            return [{'user_message': self._text.get(key, key), 'frequency': count}
+                    for key, count, _ in self._sketch.top(k)]
+
+    def persist(self):
+        """Add the pending counts to the table and trim it to the top `capacity` rows"""
+        from database import queries
+        from database.config import get_db_connection
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            rows = [(key, self._text.get(key, key), count) for key, count in pending.items()]
+            # Evicted keys kept their text only until their counts were saved
+            for key in pending:
+                if key not in self._sketch:
+                    self._text.pop(key, None)
+            self._persisted_at = time.monotonic()
+
+        if not rows:
+            return
+
+        try:
+            conn = get_db_connection()
+            queries.execute_many('popular.add', rows, conn)
+            queries.execute('popular.trim', (self.capacity,), conn)
+            conn.commit()
+            conn.close()
+            self.persists += 1
+        except Exception as e:
+            # Keep the counts for the next attempt
+            with self._lock:
+                for key, _, count in rows:
+                    self._pending[key] = self._pending.get(key, 0) + count
+            print(f"⚠️ Could not save popular questions: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {'tracked': len(self._sketch), 'capacity': self.capacity,
+                    'recorded': self.recorded, 'pending': len(self._pending),
+                    'persists': self.persists}
+
+
+popular_questions = PopularQuestions()
+atexit.register(popular_questions.persist)
@@ -0,0 +1,175 @@
+"""
+Near-duplicate query cache
+
+An exact-string cache misses "how much is school fees" vs "how much are
+the school fees?". This one is keyed on the preprocessed query instead:
+first by its token signature (sorted distinct terms), then by cosine
+against a small matrix of recently answered query vectors. Entries
+belong to one index version and are dropped when the index changes.
+"""
+
+import os
+import copy
+import time
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from nlp.inference import HashingTextVectorizer
+from nlp.scoring import score_rows
+
+CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 256))
+
+# Cosine above which a query counts as a near-duplicate of a cached one
+CACHE_THRESHOLD = float(os.environ.get('QUERY_CACHE_THRESHOLD', 0.95))
+
+
+def signature(processed_query):
+    """Order- and repetition-insensitive key of a preprocessed query"""
+    return ' '.join(sorted(set(processed_query.split())))
+
+
+class QueryCache:
+    def __init__(self, size=CACHE_SIZE, threshold=CACHE_THRESHOLD):
+        self.size = size
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # Vectorizer for indexes without a single shared vocabulary
+        self._fallback_vectorizer = HashingTextVectorizer(n_features=2 ** 16)
+        self._stats = {'signature_hits': 0, 'vector_hits': 0, 'misses': 0,
+                       'computed': 0, 'hit_ms': 0.0, 'miss_ms': 0.0, 'saved_ms': 0.0}
+        self._generation = 0    # bumped by every store and reset
+        self._reset(None)
+
+    def _reset(self, version):
+        """Forget every entry (caller holds the lock)"""
+        self.version = version
+        self._next = 0
+        self._slots = {}           # signature -> slot
+        self._entries = [None] * self.size    # slot -> (signature, result, compute_ms)
+        self._rows = [None] * self.size       # slot -> (columns, values)
+        self._matrix = None        # CSR of self._rows, rebuilt after a store
+        self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._reset(self.version)
+
+    def _vectorizer(self, index):
+        return index.vectorizer or self._fallback_vectorizer
+
+    def _vector(self, index, processed_query):
+        """Unit-length sparse vector of a query"""
+        columns, values = self._vectorizer(index).transform_one(processed_query)
+        norm = np.sqrt(np.dot(values, values))
+        return columns, values / norm if norm else values
+
+    def lookup(self, index, processed_query):
+        """A copy of the cached result for this query or a near-duplicate, or None"""
+        started = time.perf_counter()
+        key = signature(processed_query)
+
+        with self._lock:
+            if self.version != index.version:
+                self._reset(index.version)
+
+            slot = self._slots.get(key)
+            entry = self._entries[slot] if slot is not None else None
+            kind = 'signature_hits'
+            generation = self._generation
+            matrix = None
+            if entry is None and self._next:
+                if self._matrix is None:
+                    self._matrix = self._stack(self._vectorizer(index).n_features)
+                matrix = self._matrix
+
+        if matrix is not None:
+            columns, values = self._vector(index, processed_query)
+            if len(columns):
+                scores = score_rows(matrix, columns, values)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    slot, kind = best, 'vector_hits'
+
+        with self._lock:
+            # A vector hit is only valid if no store replaced its slot meanwhile
+            if kind == 'vector_hits' and self._generation == generation:
+                entry = self._entries[slot]
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._stats[kind] += 1
+            self._stats['hit_ms'] += elapsed_ms
+            self._stats['saved_ms'] += max(entry[2] - elapsed_ms, 0.0)
+
+        print(f"⚡ Cached result ({kind.split('_')[0]}) for: {processed_query[:50]}")
+        return copy.copy(entry[1])
+
+    def store(self, index, processed_query, result, compute_seconds):
+        """Cache the result computed for a query"""
+        key = signature(processed_query)
+        columns, values = self._vector(index, processed_query)
+
+        with self._lock:
+            if self.version != index.version:
+                self._reset(index.version)
+
+            compute_ms = compute_seconds * 1000
+            self._stats['computed'] += 1
+            self._stats['miss_ms'] += compute_ms
+
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._next % self.size
+                self._next += 1
+                if self._entries[slot] is not None:
+                    del self._slots[self._entries[slot][0]]
+                self._slots[key] = slot
+
+            self._entries[slot] = (key, copy.copy(result), compute_ms)
+            self._rows[slot] = (columns, values.astype(np.float32))
+            self._matrix = None
+            self._generation += 1
+
+    def _stack(self, n_features):
+        """CSR matrix of the cached query vectors, one row per slot"""
+        indptr = [0]
+        indices = []
+        data = []
+        for row in self._rows:
+            if row is not None:
+                indices.append(row[0])
+                data.append(row[1])
+                indptr.append(indptr[-1] + len(row[0]))
+            else:
+                indptr.append(indptr[-1])
+
+        return csr_matrix(
+            (
+                np.concatenate(data) if data else np.empty(0, dtype=np.float32),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                np.array(indptr, dtype=np.int32)
+            ),
+            shape=(self.size, n_features)
+        )
+
+    def stats(self):
+        """Hit ratio and time saved"""
+        with self._lock:
+            stats = self._stats
+            hits = stats['signature_hits'] + stats['vector_hits']
+            lookups = hits + stats['misses']
+            return {
+                'entries': len(self._slots),
+                'size': self.size,
+                'signature_hits': stats['signature_hits'],
+                'vector_hits': stats['vector_hits'],
+                'misses': stats['misses'],
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+                'avg_hit_ms': round(stats['hit_ms'] / hits, 3) if hits else 0.0,
+                'avg_miss_ms': round(stats['miss_ms'] / stats['computed'], 3) if stats['computed'] else 0.0,
+                'saved_ms': round(stats['saved_ms'], 1)
+            }
@@ -0,0 +1,116 @@
+"""
+Lightweight keyword router for the category-sharded index
+
+The router knows, for every preprocessed token, how many FAQs in each
+shard contain it, plus the hand-written hints in CATEGORY_KEYWORDS. It
+scores shards for a query and picks the few that hold most of the weight,
+or all shards when no shard clearly stands out.
+"""
+
+import math
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp.custom_mappings import CATEGORY_KEYWORDS
+
+# Weight of a CATEGORY_KEYWORDS hint relative to one rare shared token
+HINT_WEIGHT = 1.0
+
+
+class ShardRouter:
+    def __init__(self, min_share=0.5, coverage=0.8, max_shards=3):
+        """
+        Initialize an empty router
+
+        Args:
+            min_share: Top shard's share of the weight needed to route at all
+            coverage: Route to the fewest shards holding this share of the weight
+            max_shards: Never route to more shards than this
+        """
+        self.min_share = min_share
+        self.coverage = coverage
+        self.max_shards = max_shards
+        self.shard_keys = []
+        self.token_shards = {}   # token -> {shard_key: doc frequency}
+        self.token_idf = {}      # token -> idf over the whole corpus
+        self.hints = {}          # keyword -> shard_key
+
+    @classmethod
+    def from_shards(cls, shards, **kwargs):
+        """
+        Build the routing table from the shards' posting lists
+
+        Args:
+            shards: dict of shard_key -> IndexShard
+        """
+        router = cls(**kwargs)
+        router.shard_keys = list(shards)
+
+        n_docs = 0
+        for key, shard in shards.items():
+            n_docs += len(shard.faqs)
+            for token, positions in shard.candidates.postings.items():
+                router.token_shards.setdefault(token, {})[key] = len(positions)
+
+        for token, counts in router.token_shards.items():
+            router.token_idf[token] = math.log(max(n_docs, 1) / sum(counts.values())) + 1.0
+
+        # CATEGORY_KEYWORDS uses its own names ('transport'), shards use the
+        # FAQ categories ('Transportation'); match them by prefix
+        for hint_category, keywords in CATEGORY_KEYWORDS.items():
+            for key in router.shard_keys:
+                if key.lower().startswith(hint_category) or hint_category.startswith(key.lower()):
+                    for keyword in keywords:
+                        router.hints.setdefault(keyword, key)
+
+        return router
+
+    def score(self, processed_query):
+        """Weight of each shard for a preprocessed query"""
+        weights = {}
+        for token in set(processed_query.split()):
+            counts = self.token_shards.get(token)
+            if counts:
+                total = sum(counts.values())
+                idf = self.token_idf[token]
+                for key, count in counts.items():
+                    weights[key] = weights.get(key, 0.0) + idf * count / total
+
+            hinted = self.hints.get(token)
+            if hinted:
+                weights[hinted] = weights.get(hinted, 0.0) + HINT_WEIGHT
+
+        return weights
+
+    def route(self, processed_query):
+        """
+        Pick the shards worth searching
+
+        Returns:
+            List of shard keys, or None when every shard should be searched
+        """
+        if len(self.shard_keys) <= 1:
+            return None
+
+        weights = self.score(processed_query)
+        total = sum(weights.values())
+        if total <= 0:
+            return None
+
+        ranked = sorted(weights.items(), key=lambda item: item[1], reverse=True)
+        if ranked[0][1] / total < self.min_share:
+            return None
+
+        chosen = []
+        covered = 0.0
+        for key, weight in ranked[:self.max_shards]:
+            chosen.append(key)
+            covered += weight
+            if covered / total >= self.coverage:
+                return chosen
+
+        # The top shards do not hold enough of the weight; search everything
+        return None
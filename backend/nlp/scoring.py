@@ -0,0 +1,429 @@
+"""
+Scoring engines for FAQ matching
+
+Each engine is fitted on the preprocessed FAQ questions and scores a
+preprocessed query against all of them. Scores are kept in [0, 1] so the
+matcher's confidence thresholds work for every engine.
+
+The engine is chosen with the MATCHER_ENGINE environment variable:
+    tfidf  - TF-IDF vectors with cosine similarity (default)
+    bm25   - Okapi BM25
+    bm25+  - BM25+ (BM25 with a lower bound on matching terms)
+    hashing - TF-IDF cosine over hashed features; FAQs can be appended and
+              separately built indexes merged without refitting
+
+MATCHER_SEMANTIC=lsa additionally builds a latent semantic (LSA) scorer
+that the matcher consults when the lexical engine finds nothing.
+
+scikit-learn is only imported inside fit(). Fitted scorers keep an exported
+TextVectorizer instead of the sklearn object, so a built index can be
+loaded and queried with NumPy/SciPy alone.
+
+The lexical engines store their weights as float32 CSR with sorted
+indices and write each query into a per-thread scratch vector, so a query
+allocates nothing proportional to the feature space (only the candidate
+rows and their scores).
+"""
+
+import os
+import threading
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+from nlp.inference import TextVectorizer, HashingTextVectorizer
+
+DEFAULT_ENGINE = os.environ.get('MATCHER_ENGINE', 'tfidf')
+SEMANTIC_MODE = os.environ.get('MATCHER_SEMANTIC', '').lower()
+LSA_COMPONENTS = int(os.environ.get('MATCHER_LSA_COMPONENTS', 0))
+HASH_FEATURES = int(os.environ.get('MATCHER_HASH_FEATURES', 2 ** 18))
+
+# Tokenization shared by every engine so they index the same terms
+VECTORIZER_PARAMS = {
+    'max_features': 2000,
+    'stop_words': 'english',
+    'ngram_range': (1, 2),
+    'min_df': 1,
+    'max_df': 0.7,
+}
+
+
+# Below this many documents max_df would prune every term (a one-FAQ shard)
+MIN_DOCS_FOR_MAX_DF = 10
+
+
+class _QueryBuffer(threading.local):
+    """Per-thread dense query vector, reused by every query and left zeroed after each"""
+
+    def __init__(self):
+        self.vector = np.zeros(0, dtype=np.float32)
+
+    def get(self, n_features):
+        if len(self.vector) < n_features:
+            self.vector = np.zeros(n_features, dtype=np.float32)
+        return self.vector[:n_features]
+
+
+_query_buffer = _QueryBuffer()
+
+
+def compact_matrix(matrix):
+    """Store a document-term matrix as float32 CSR with sorted int32 indices"""
+    matrix = matrix.tocsr().astype(np.float32)
+    matrix.sort_indices()
+    matrix.indices = np.ascontiguousarray(matrix.indices, dtype=np.int32)
+    matrix.indptr = np.ascontiguousarray(matrix.indptr, dtype=np.int32)
+    return matrix
+
+
+def score_rows(matrix, columns, weights, candidates=None):
+    """
+    Dot product of a sparse query with every row (or only the candidate rows)
+
+    Only the dense query vector is the reused per-thread buffer. Candidate
+    rows are gathered into a new small CSR and the scores are a new array
+    each call: callers keep them past the next query on the thread.
+
+    Returns:
+        float32 scores
+    """
+    query = _query_buffer.get(matrix.shape[1])
+    query[columns] = weights
+    try:
+        rows = matrix if candidates is None else matrix[candidates]
+        return rows @ query
+    finally:
+        query[columns] = 0.0
+
+
+def vectorizer_params(n_docs=None):
+    """Vectorizer parameters, relaxed for very small corpora"""
+    params = dict(VECTORIZER_PARAMS)
+    if n_docs is not None and n_docs < MIN_DOCS_FOR_MAX_DF:
+        params['max_df'] = 1.0
+    return params
+
+
+def create_vectorizer(n_docs=None):
+    """Create the (sklearn) TF-IDF vectorizer with the matcher's tuned parameters"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(
+        sublinear_tf=True,
+        use_idf=True,
+        norm='l2',
+        **vectorizer_params(n_docs)
+    )
+
+
+class TfidfCosineScorer:
+    """TF-IDF vectors compared with cosine similarity"""
+
+    name = 'tfidf'
+
+    def __init__(self):
+        self.vectorizer = None
+        self.matrix = None    # float32 CSR, L2-normalised rows
+
+    def fit(self, processed_docs):
+        """Fit the vocabulary and build the document matrix"""
+        vectorizer = create_vectorizer(len(processed_docs))
+        self.matrix = compact_matrix(vectorizer.fit_transform(processed_docs))
+        self.vectorizer = TextVectorizer.from_sklearn(vectorizer)
+        return self
+
+    def score(self, processed_query, candidates=None):
+        """Cosine similarity of the query with every FAQ (or only the candidates)"""
+        columns, values = self.vectorizer.transform_one(processed_query)
+        # Rows are already L2-normalised, so the dot product is the cosine
+        return score_rows(self.matrix, columns, values, candidates)
+
+
+class BM25Scorer:
+    """
+    Okapi BM25 over the same terms as the TF-IDF engine
+
+    Per-(document, term) weights only depend on the document, so they are
+    precomputed at fit time and a query is scored with one sparse product.
+    A positive delta gives BM25+.
+
+    Raw BM25 is unbounded, so a score is divided by the document's self-score
+    (its own text as the query): asking an FAQ's question scores 1.0, as it
+    does under cosine, and the matcher's thresholds mean the same thing.
+    """
+
+    name = 'bm25'
+
+    def __init__(self, k1=1.5, b=0.75, delta=0.0):
+        self.k1 = k1
+        self.b = b
+        self.delta = delta
+        self.vectorizer = None
+        self.matrix = None    # float32 CSR of BM25 weights
+        self.idf = None
+        self.doc_lengths = None
+        self.avg_doc_length = 0.0
+        self.self_scores = None    # each document's score against its own text
+
+    def fit(self, processed_docs):
+        """Count terms and precompute the BM25 weight of every posting"""
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        vectorizer = CountVectorizer(**vectorizer_params(len(processed_docs)))
+        counts = vectorizer.fit_transform(processed_docs).tocsr().astype(np.float64)
+        self.vectorizer = TextVectorizer.from_sklearn(vectorizer)
+        counts.sort_indices()
+
+        n_docs, n_terms = counts.shape
+        self.doc_lengths = np.asarray(counts.sum(axis=1)).ravel()
+        self.avg_doc_length = float(self.doc_lengths.mean()) or 1.0
+
+        doc_freq = np.bincount(counts.indices, minlength=n_terms)
+        self.idf = np.log((n_docs - doc_freq + 0.5) / (doc_freq + 0.5) + 1.0)
+
+        # Length normalisation for the row each posting belongs to
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / self.avg_doc_length)
+        row_norm = np.repeat(norm, np.diff(counts.indptr))
+
+        tf = counts.data
+        term_idf = self.idf[counts.indices]
+        weights = term_idf * (tf * (self.k1 + 1) / (tf + row_norm) + self.delta)
+
+        counts.data = tf * weights
+        self_scores = np.asarray(counts.sum(axis=1)).ravel()
+        self_scores[self_scores == 0] = 1.0
+        self.self_scores = self_scores.astype(np.float32)
+
+        counts.data = weights
+        self.matrix = compact_matrix(counts)
+        return self
+
+    def score(self, processed_query, candidates=None):
+        """BM25 score of the query with every FAQ (or only the candidates), relative to each FAQ's self-score"""
+        columns, counts = self.vectorizer.transform_one(processed_query)
+        if len(columns) == 0:
+            return np.zeros(self.matrix.shape[0] if candidates is None else len(candidates), dtype=np.float32)
+
+        raw = score_rows(self.matrix, columns, counts, candidates)
+        self_scores = self.self_scores if candidates is None else self.self_scores[candidates]
+        # A query repeating a document's terms can outscore the document itself
+        return np.minimum(raw / self_scores, 1.0)
+
+
+class HashingTfidfScorer:
+    """
+    TF-IDF cosine over a fixed, hashed feature space
+
+    Rows store sublinear term frequencies only. IDF is derived from document
+    frequency counts, which simply add up, so FAQs can be appended and
+    indexes built on different workers merged without a refit. Because
+    there is no vocabulary, max_features/max_df do not apply here.
+
+    Appending and merging return new scorers; a scorer that is already part
+    of a live snapshot is never modified.
+    """
+
+    name = 'hashing'
+
+    def __init__(self, n_features=None):
+        self.n_features = n_features or HASH_FEATURES
+        self.vectorizer = None
+        self.tf = None                # CSR, sublinear term frequencies
+        self.df_columns = None        # sorted feature columns seen in any FAQ
+        self.df_counts = None         # number of FAQs containing each of them
+        # IDF-weighted, L2-normalised rows over the df_columns only, so
+        # neither it nor the query buffer grows with the hashed feature space
+        self.matrix = None
+
+    @property
+    def n_docs(self):
+        return self.tf.shape[0] if self.tf is not None else 0
+
+    def fit(self, processed_docs):
+        """Hash the FAQs and count document frequencies"""
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+        self.vectorizer = HashingTextVectorizer(
+            n_features=self.n_features,
+            stop_words=ENGLISH_STOP_WORDS,
+            ngram_range=VECTORIZER_PARAMS['ngram_range']
+        )
+        self.tf = self._term_frequencies(processed_docs)
+        self.df_columns, self.df_counts = self._doc_freq(self.tf)
+        self._weigh()
+        return self
+
+    def _term_frequencies(self, processed_docs):
+        tf = self.vectorizer.transform(processed_docs)
+        tf.data = np.log(tf.data) + 1.0
+        return tf
+
+    @staticmethod
+    def _doc_freq(tf):
+        columns, counts = np.unique(tf.indices, return_counts=True)
+        return columns.astype(np.int32), counts.astype(np.int32)
+
+    def _add_doc_freq(self, columns, counts):
+        """Document frequencies of this scorer plus another set of counts"""
+        all_columns = np.concatenate([self.df_columns, columns])
+        merged, inverse = np.unique(all_columns, return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate([self.df_counts, counts]))
+        return merged.astype(np.int32), totals.astype(np.int32)
+
+    def _lookup(self, columns):
+        """Positions of feature columns in df_columns, and which were found"""
+        if not len(self.df_columns):
+            return np.zeros(len(columns), dtype=np.int32), np.zeros(len(columns), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.df_columns, columns), len(self.df_columns) - 1)
+        return positions, self.df_columns[positions] == columns
+
+    def _idf(self, columns, positions, found):
+        """Smoothed IDF (as sklearn computes it) of the given feature columns"""
+        doc_freq = np.zeros(len(columns))
+        doc_freq[found] = self.df_counts[positions[found]]
+        return np.log((1.0 + self.n_docs) / (1.0 + doc_freq)) + 1.0
+
+    def _weigh(self):
+        """Derive the cosine-ready matrix from term and document frequencies"""
+        matrix = self.tf.copy()
+        positions, found = self._lookup(matrix.indices)
+        matrix.data = matrix.data * self._idf(matrix.indices, positions, found)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+
+        # Every document column is in df_columns; renumber into that space
+        compact = csr_matrix((matrix.data, positions, matrix.indptr),
+                             shape=(matrix.shape[0], len(self.df_columns)))
+        self.matrix = compact_matrix(compact)
+
+    def _derived(self, tf, df_columns, df_counts):
+        scorer = HashingTfidfScorer(self.n_features)
+        scorer.vectorizer = self.vectorizer
+        scorer.tf = tf
+        scorer.df_columns = df_columns
+        scorer.df_counts = df_counts
+        scorer._weigh()
+        return scorer
+
+    def extended(self, processed_docs):
+        """A new scorer with more FAQs appended after the existing ones"""
+        rows = self._term_frequencies(processed_docs)
+        return self._derived(vstack([self.tf, rows], format='csr'), *self._add_doc_freq(*self._doc_freq(rows)))
+
+    def merged(self, other):
+        """A new scorer holding this scorer's FAQs followed by other's"""
+        if not isinstance(other, HashingTfidfScorer) or not self.vectorizer.compatible_with(other.vectorizer):
+            raise ValueError("Only hashing scorers with the same feature space can be merged")
+        return self._derived(vstack([self.tf, other.tf], format='csr'),
+                             *self._add_doc_freq(other.df_columns, other.df_counts))
+
+    def score(self, processed_query, candidates=None):
+        """Cosine similarity of the query with every FAQ (or only the candidates)"""
+        columns, counts = self.vectorizer.transform_one(processed_query)
+        if len(columns) == 0:
+            return np.zeros(self.n_docs if candidates is None else len(candidates), dtype=np.float32)
+
+        positions, found = self._lookup(columns)
+        weights = (np.log(counts) + 1.0) * self._idf(columns, positions, found)
+        # Terms no FAQ contains still count towards the query's length
+        weights /= np.sqrt(np.dot(weights, weights))
+        return score_rows(self.matrix, positions[found], weights[found], candidates)
+
+
+class LSAScorer:
+    """
+    Latent semantic scorer: TF-IDF projected onto a truncated SVD basis
+
+    The projection and the document embeddings are stored as contiguous
+    float32 arrays, and the embeddings are normalised up front, so scoring
+    a query is one small dense mat-vec.
+    """
+
+    name = 'lsa'
+
+    def __init__(self, n_components=None):
+        self.n_components = n_components or LSA_COMPONENTS or None
+        self.vectorizer = None
+        self.projection = None    # (n_terms, k) float32
+        self.embeddings = None    # (n_docs, k) float32, unit rows
+        self.norms = None         # embedding norms before normalisation
+
+    def fit(self, processed_docs, vectorizer=None, tfidf_matrix=None):
+        """
+        Fit the SVD basis
+
+        Args:
+            processed_docs: Preprocessed FAQ questions
+            vectorizer, tfidf_matrix: An already fitted TF-IDF engine to reuse
+        """
+        from sklearn.decomposition import TruncatedSVD
+
+        if vectorizer is None or tfidf_matrix is None:
+            fitted = create_vectorizer(len(processed_docs))
+            tfidf_matrix = fitted.fit_transform(processed_docs)
+            vectorizer = TextVectorizer.from_sklearn(fitted)
+
+        n_docs, n_terms = tfidf_matrix.shape
+        # Keep well below the rank so related terms actually get merged
+        k = self.n_components or max(1, n_docs // 2)
+        k = max(1, min(k, 100, n_docs - 1, n_terms - 1))
+
+        svd = TruncatedSVD(n_components=k, random_state=42)
+        embeddings = svd.fit_transform(tfidf_matrix)
+
+        self.vectorizer = vectorizer
+        self.projection = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+        norms = np.linalg.norm(embeddings, axis=1)
+        self.norms = norms.astype(np.float32)
+        norms[norms == 0] = 1.0
+        self.embeddings = np.ascontiguousarray(embeddings / norms[:, None], dtype=np.float32)
+        return self
+
+    @property
+    def matrix(self):
+        return self.embeddings
+
+    def embed(self, processed_query):
+        """Project a query into the latent space (unit length, or zeros)"""
+        columns, values = self.vectorizer.transform_one(processed_query)
+        embedded = values.astype(np.float32) @ self.projection[columns]
+        norm = np.linalg.norm(embedded)
+        return embedded / norm if norm > 0 else embedded
+
+    def score(self, processed_query, candidates=None):
+        """Cosine similarity of the query with every FAQ (or only the candidates) in the latent space"""
+        embeddings = self.embeddings if candidates is None else self.embeddings[candidates]
+        return embeddings @ self.embed(processed_query)
+
+
+def create_semantic_scorer(mode=None):
+    """Create the optional semantic scorer, or None when it is disabled"""
+    mode = SEMANTIC_MODE if mode is None else mode.lower()
+
+    if not mode or mode == 'none':
+        return None
+    if mode == 'lsa':
+        return LSAScorer()
+
+    raise ValueError(f"Unknown semantic mode: {mode}")
+
+
+def create_scorer(engine=None):
+    """Create an unfitted scorer for the configured engine"""
+    engine = (engine or DEFAULT_ENGINE).lower()
+
+    if engine == 'tfidf':
+        return TfidfCosineScorer()
+    if engine == 'bm25':
+        return BM25Scorer()
+    if engine in ('bm25+', 'bm25plus'):
+        scorer = BM25Scorer(delta=1.0)
+        scorer.name = 'bm25+'
+        return scorer
+    if engine == 'hashing':
+        return HashingTfidfScorer()
+    if engine == 'lsa':
+        return LSAScorer()
+
+    raise ValueError(f"Unknown matcher engine: {engine}")
@@ -0,0 +1,181 @@
+"""
+Typo-tolerant spelling correction using a symmetric-delete index
+
+Every vocabulary word is stored under all the strings reachable by deleting
+up to N characters from it. A misspelled query token is corrected by
+generating its own deletes and looking them up, so no edit-distance scan
+over the whole vocabulary is needed.
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp.preprocess import preprocessor
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein plus transpositions)
+
+    Returns max_distance + 1 as soon as the distance is known to exceed it.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return previous[-1]
+
+
+class SpellingIndex:
+    def __init__(self, max_edit_distance=2, min_word_length=4):
+        """
+        Initialize an empty spelling index
+
+        Args:
+            max_edit_distance: Largest number of edits a correction may make
+            min_word_length: Shorter tokens are never corrected
+        """
+        self.max_edit_distance = max_edit_distance
+        self.min_word_length = min_word_length
+        self.words = {}      # word -> frequency
+        self.known = set()   # words that are never corrected, nor corrected to
+        self.deletes = {}    # delete variant -> words producing it
+        self.cache_size = 5000
+        self._cache = {}     # token -> correction (or None)
+
+    @classmethod
+    def from_texts(cls, texts, extra_words=(), **kwargs):
+        """
+        Build an index from raw texts
+
+        Args:
+            texts: Raw strings (FAQ questions) to take the vocabulary from
+            extra_words: Words left alone but never offered as corrections,
+                         e.g. stopwords, which would erase a content word
+        """
+        index = cls(**kwargs)
+        index.known.update(extra_words)
+        for text in texts:
+            for word in preprocessor.clean_text(text).split():
+                index.add_word(word)
+        return index
+
+    def _distance_for(self, word):
+        """Allowed edits grow with word length to keep short words precise"""
+        return 1 if len(word) < 7 else self.max_edit_distance
+
+    @staticmethod
+    def _edits(word, distance):
+        """All strings reachable from word by deleting up to distance characters"""
+        results = {word}
+        frontier = {word}
+        for _ in range(distance):
+            next_frontier = set()
+            for candidate in frontier:
+                if len(candidate) <= 1:
+                    continue
+                for i in range(len(candidate)):
+                    next_frontier.add(candidate[:i] + candidate[i + 1:])
+            results |= next_frontier
+            frontier = next_frontier
+        return results
+
+    def add_word(self, word, count=1):
+        """Add a vocabulary word (or bump its frequency); known words are skipped"""
+        if not word.isalpha() or word in self.known:
+            return
+
+        if word in self.words:
+            self.words[word] += count
+            return
+
+        self._cache.clear()
+        self.words[word] = count
+        for variant in self._edits(word, self.max_edit_distance):
+            self.deletes.setdefault(variant, []).append(word)
+
+    def lookup(self, token):
+        """
+        Find the best correction for a single token
+
+        Returns:
+            The corrected word, or None when the token is known or no
+            vocabulary word is close enough
+        """
+        if (token in self.words or token in self.known
+                or len(token) < self.min_word_length or not token.isalpha()):
+            return None
+
+        if token in self._cache:
+            return self._cache[token]
+
+        max_distance = self._distance_for(token)
+        best_word = None
+        best_key = None
+        checked = set()
+
+        for variant in self._edits(token, max_distance):
+            for word in self.deletes.get(variant, ()):
+                if word in checked:
+                    continue
+                checked.add(word)
+                distance = edit_distance(token, word, max_distance)
+                if distance > max_distance:
+                    continue
+                # Closest first, then most frequent
+                key = (distance, -self.words[word])
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best_word = word
+
+        # Typos repeat a lot, so remember recent answers
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[token] = best_word
+
+        return best_word
+
+    def correct(self, text):
+        """
+        Correct every token of a raw question
+
+        Returns:
+            Cleaned text with misspelled tokens replaced
+        """
+        tokens = preprocessor.clean_text(text).split()
+        corrected = []
+        for token in tokens:
+            replacement = self.lookup(token)
+            corrected.append(replacement or token)
+        return ' '.join(corrected)
+
+
+# For testing
+if __name__ == "__main__":
+    index = SpellingIndex.from_texts([
+        "What are the requirements for Medicine and Surgery?",
+        "Does the school provide hostel accommodation?",
+        "How much are the school fees?",
+    ])
+
+    for text in ["medcine requirments", "acommodation hostle", "school feez"]:
+        print(f"{text} -> {index.correct(text)}")
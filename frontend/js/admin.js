@@ -6,6 +6,10 @@ class AdminDashboard {
         this.token = localStorage.getItem('admin_token');
         this.currentTab = 'overview';
 
+        // Keyset paging: cursors[i] fetches page i + 1 (null is the first page)
+        this.unknownPaging = { filter: 'unanswered', cursors: [null] };
+        this.faqPaging = { search: '', category: '', cursors: [null] };
+
         // DOM Elements
         this.loginSection = document.getElementById('loginSection');
         this.dashboardSection = document.getElementById('dashboardSection');
@@ -281,9 +285,19 @@ class AdminDashboard {
         `).join('');
     }
 
-    async loadUnknownQuestions(page = 1, filter = 'unanswered') {
+    async loadUnknownQuestions(filter = this.unknownPaging.filter) {
+        const paging = this.unknownPaging;
+        if (filter !== paging.filter) {
+            paging.filter = filter;
+            paging.cursors = [null];
+        }
+
         try {
-            const response = await fetch(`${this.apiUrl}/unknown?filter=${filter}&page=${page}&limit=20`, {
+            let url = `${this.apiUrl}/unknown?filter=${filter}&limit=20`;
+            const cursor = paging.cursors[paging.cursors.length - 1];
+            if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+
+            const response = await fetch(url, {
                 headers: {
                     'Authorization': `Bearer ${this.token}`
                 }
@@ -334,7 +348,7 @@ class AdminDashboard {
 
         // Update pagination
         if (pagination) {
-            this.updatePagination(pagination);
+            this.updatePagination('unknownTab', this.unknownPaging, pagination, () => this.loadUnknownQuestions());
         }
     }
 
@@ -407,11 +421,20 @@ class AdminDashboard {
         }
     }
 
-    async loadFAQs(page = 1, search = '', category = '') {
+    async loadFAQs(search = this.faqPaging.search, category = this.faqPaging.category) {
+        const paging = this.faqPaging;
+        if (search !== paging.search || category !== paging.category) {
+            paging.search = search;
+            paging.category = category;
+            paging.cursors = [null];
+        }
+
         try {
-            let url = `${this.apiUrl}/faqs?page=${page}&limit=20`;
+            let url = `${this.apiUrl}/faqs?limit=20`;
             if (search) url += `&search=${encodeURIComponent(search)}`;
             if (category) url += `&category=${encodeURIComponent(category)}`;
+            const cursor = paging.cursors[paging.cursors.length - 1];
+            if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
 
             const response = await fetch(url, {
                 headers: {
@@ -456,6 +479,11 @@ class AdminDashboard {
                 </td>
             </tr>
         `).join('');
+
+        // Update pagination
+        if (pagination) {
+            this.updatePagination('faqsTab', this.faqPaging, pagination, () => this.loadFAQs());
+        }
     }
 
     populateCategoryFilter(categories) {
@@ -574,9 +602,34 @@ class AdminDashboard {
         });
     }
 
-    updatePagination(pagination) {
-        // Implement pagination controls
-        console.log('Pagination:', pagination);
+    updatePagination(tabId, paging, pagination, reload) {
+        const container = document.querySelector(`#${tabId} .pagination`);
+        if (!container) return;
+
+        const [prevBtn, nextBtn] = container.querySelectorAll('.page-btn');
+        const page = paging.cursors.length;
+        // Search results come without a total: just the page number
+        if (pagination.total === null) {
+            container.querySelector('.page-info').textContent = `Page ${page}`;
+        } else {
+            const pages = Math.max(1, Math.ceil(pagination.total / pagination.limit));
+            container.querySelector('.page-info').textContent = `Page ${page} of ${Math.max(page, pages)}`;
+        }
+        prevBtn.disabled = page === 1;
+        nextBtn.disabled = !pagination.has_more;
+
+        prevBtn.onclick = () => {
+            if (paging.cursors.length > 1) {
+                paging.cursors.pop();
+                reload();
+            }
+        };
+        nextBtn.onclick = () => {
+            if (pagination.next_cursor) {
+                paging.cursors.push(pagination.next_cursor);
+                reload();
+            }
+        };
     }
 
     loadAnalytics() {
@@ -613,11 +666,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Search and filter
     document.getElementById('faqSearch')?.addEventListener('input', utils.debounce((e) => {
-        admin.loadFAQs(1, e.target.value, document.getElementById('categoryFilter').value);
+        admin.loadFAQs(e.target.value, document.getElementById('categoryFilter').value);
     }, 500));
 
     document.getElementById('categoryFilter')?.addEventListener('change', (e) => {
-        admin.loadFAQs(1, document.getElementById('faqSearch').value, e.target.value);
+        admin.loadFAQs(document.getElementById('faqSearch').value, e.target.value);
     });
 
     // Unknown questions filter
@@ -625,7 +678,7 @@ document.addEventListener('DOMContentLoaded', () => {
         btn.addEventListener('click', () => {
             document.querySelectorAll('.filter-btn').forEach(b => b.classList.remove('active'));
             btn.classList.add('active');
-            admin.loadUnknownQuestions(1, btn.dataset.filter);
+            admin.loadUnknownQuestions(btn.dataset.filter);
         });
     });
 });